@@ -0,0 +1,23 @@
+"""Search strings for the ngram FULLTEXT indexes (database/migrations/002_app_fulltext.sql)."""
+import re
+from typing import Optional
+
+# The server's ngram_token_size (MySQL default); the indexes hold grams of this length
+NGRAM_TOKEN_SIZE = 2
+
+# Boolean-mode operators; user input is searched as plain terms
+_BOOLEAN_OPERATORS = re.compile(r'[+\-<>()~*"@]+')
+
+
+def boolean_query(query_text: str) -> Optional[str]:
+    """
+    The query as an IN BOOLEAN MODE search string, or None when no term is at
+    least NGRAM_TOKEN_SIZE characters long. Shorter terms (a one-syllable Korean
+    word) have no gram in the index, so only a LIKE scan can find them.
+
+    Boolean mode rather than natural language mode: each term is matched as a
+    phrase of its grams (a substring match, like LIKE), and terms that occur in
+    more than half of the rows are not dropped.
+    """
+    terms = [term for term in _BOOLEAN_OPERATORS.sub(" ", query_text).split() if len(term) >= NGRAM_TOKEN_SIZE]
+    return " ".join(terms) or None
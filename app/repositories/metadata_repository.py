@@ -2,7 +2,9 @@ import os
 import logging
 from typing import Optional, Sequence, Dict, Any, cast, Union
 import mysql.connector
-from mysql.connector import Error
+from mysql.connector import Error, errorcode
+
+from app.repositories.fulltext import boolean_query
 
 logger = logging.getLogger(__name__)
 
@@ -20,6 +22,9 @@ class DatabaseOperationError(Exception):
 class MetadataRepository:
     """MySQL repository with lazy connection initialization."""
 
+    # Set once MySQL reports the FULLTEXT index is missing (migration not applied yet)
+    _fulltext_missing: bool = False
+
     def __init__(self) -> None:
         """Store connection parameters only. No connection created."""
         self.host: str = os.getenv("MYSQL_HOST", "localhost")
@@ -92,11 +97,35 @@ class MetadataRepository:
                 cursor.close()
 
     def search_chunks(self, query_text: str, limit: int = 20) -> Sequence[Dict[str, Any]]:
-        """Search chunks by content."""
+        """
+        Search chunks by content, most relevant first.
+        Uses the ngram FULLTEXT index on chunks.content in boolean mode (see
+        database/migrations/002_app_fulltext.sql and app/repositories/fulltext.py);
+        falls back to a LIKE scan for queries shorter than the ngram size and
+        while that index does not exist.
+        """
         cursor: Optional[Any] = None
         try:
             conn = self._get_connection()
             cursor = conn.cursor(dictionary=True)
+            search = boolean_query(query_text)
+            if search is not None and not MetadataRepository._fulltext_missing:
+                sql = """
+                    SELECT *, MATCH(content) AGAINST (%s IN BOOLEAN MODE) AS relevance
+                    FROM chunks
+                    WHERE MATCH(content) AGAINST (%s IN BOOLEAN MODE)
+                    ORDER BY relevance DESC
+                    LIMIT %s
+                """
+                try:
+                    cursor.execute(sql, (search, search, limit))
+                    return cast(Sequence[Dict[str, Any]], cursor.fetchall())
+                except Error as e:
+                    if e.errno != errorcode.ER_FT_MATCHING_KEY_NOT_FOUND:
+                        raise
+                    MetadataRepository._fulltext_missing = True
+                    logger.warning("FULLTEXT index on chunks.content missing; falling back to LIKE search")
+
             sql = "SELECT * FROM chunks WHERE content LIKE %s LIMIT %s"
             cursor.execute(sql, (f"%{query_text}%", limit))
             results: Sequence[Dict[str, Any]] = cast(Sequence[Dict[str, Any]], cursor.fetchall())
@@ -2,7 +2,9 @@ import os
 import logging
 from typing import Optional, Sequence, Dict, Any, cast, Union
 import mysql.connector
-from mysql.connector import Error
+from mysql.connector import Error, errorcode
+
+from app.repositories.fulltext import boolean_query
 
 logger = logging.getLogger(__name__)
 
@@ -22,6 +24,9 @@ class DatabaseOperationError(Exception):
 class MySQLRepository:
     """Repository for MySQL metadata storage with lazy connection initialization."""
 
+    # Set once MySQL reports the FULLTEXT index is missing (migration not applied yet)
+    _fulltext_missing: bool = False
+
     def __init__(self) -> None:
         """Initialize repository with connection parameters (no connection created yet)."""
         self.host: str = os.getenv("MYSQL_HOST", "localhost")
@@ -98,11 +103,35 @@ class MySQLRepository:
                 cursor.close()
 
     def search_documents(self, query_text: str, limit: int = 10) -> Sequence[Dict[str, Any]]:
-        """Search documents by title or content."""
+        """
+        Search documents by title or content, ranked by full-text relevance.
+        Requires the ngram FULLTEXT index on (title, content) from
+        database/migrations/002_app_fulltext.sql, searched in boolean mode (see
+        app/repositories/fulltext.py); queries shorter than the ngram size, and
+        every query until the index exists, use a LIKE scan.
+        """
         cursor: Optional[Any] = None
         try:
             conn = self._get_connection()
             cursor = conn.cursor(dictionary=True)
+            search = boolean_query(query_text)
+            if search is not None and not MySQLRepository._fulltext_missing:
+                sql = """
+                    SELECT *, MATCH(title, content) AGAINST (%s IN BOOLEAN MODE) AS relevance
+                    FROM documents
+                    WHERE MATCH(title, content) AGAINST (%s IN BOOLEAN MODE)
+                    ORDER BY relevance DESC
+                    LIMIT %s
+                """
+                try:
+                    cursor.execute(sql, (search, search, limit))
+                    return cast(Sequence[Dict[str, Any]], cursor.fetchall())
+                except Error as e:
+                    if e.errno != errorcode.ER_FT_MATCHING_KEY_NOT_FOUND:
+                        raise
+                    MySQLRepository._fulltext_missing = True
+                    logger.warning("FULLTEXT index on documents(title, content) missing; falling back to LIKE search")
+
             sql = """
                 SELECT * FROM documents 
                 WHERE title LIKE %s OR content LIKE %s
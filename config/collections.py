@@ -0,0 +1,64 @@
+# config/collections.py
+
+import re
+from pathlib import Path
+
+DEFAULT_COLLECTION = "default"
+
+PROJECT_ROOT = Path(__file__).resolve().parents[1]
+DOCS_ROOT = PROJECT_ROOT / "docs"
+DATA_ROOT = Path("data")
+
+_COLLECTION_NAME = re.compile(r"^[A-Za-z0-9_-]{1,64}$")
+
+
+def validate_collection_name(collection: str) -> str:
+    """
+    Collection names become directory names and SQL values,
+    so only allow a safe subset of characters.
+    """
+    if not collection or not _COLLECTION_NAME.match(collection):
+        raise ValueError(f"Invalid collection name: {collection!r}")
+    return collection
+
+
+def collection_data_dir(collection: str = DEFAULT_COLLECTION) -> Path:
+    """Directory holding the on-disk indexes of a collection."""
+    validate_collection_name(collection)
+    # The default collection keeps the original single-corpus layout
+    if collection == DEFAULT_COLLECTION:
+        return DATA_ROOT
+    return DATA_ROOT / "collections" / collection
+
+
+def collection_docs_dir(collection: str = DEFAULT_COLLECTION) -> Path:
+    """Directory holding the raw source documents of a collection."""
+    validate_collection_name(collection)
+    if collection == DEFAULT_COLLECTION:
+        return DOCS_ROOT / "pdf_raw"
+    return DOCS_ROOT / "collections" / collection
+
+
+def faiss_index_path(collection: str = DEFAULT_COLLECTION) -> str:
+    return str(collection_data_dir(collection) / "faiss_index.bin")
+
+
+def lexical_index_path(collection: str = DEFAULT_COLLECTION) -> str:
+    return str(collection_data_dir(collection) / "lexical_index.npz")
+
+
+def sparse_index_path(collection: str = DEFAULT_COLLECTION) -> str:
+    return str(collection_data_dir(collection) / "sparse_index.npz")
+
+
+def rerank_tokens_path(collection: str = DEFAULT_COLLECTION) -> str:
+    return str(collection_data_dir(collection) / "rerank_tokens.npz")
+
+
+def list_collections() -> list:
+    """All collections that have a source directory on disk."""
+    names = {DEFAULT_COLLECTION}
+    root = DOCS_ROOT / "collections"
+    if root.exists():
+        names.update(p.name for p in root.iterdir() if p.is_dir() and _COLLECTION_NAME.match(p.name))
+    return sorted(names)
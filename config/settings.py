@@ -1,5 +1,5 @@
 from pydantic_settings import BaseSettings
-from typing import Optional
+from typing import List, Optional
 
 
 class Settings(BaseSettings):
@@ -18,13 +18,75 @@ class Settings(BaseSettings):
     llm_temperature: float = 0.7
     llm_max_tokens: int = 512
     llm_base_url: Optional[str] = None  # e.g., "http://localhost:8000/v1" for local LLM API
+    llm_max_connections: int = 32  # Pooled keep-alive connections to Ollama (concurrent async generations)
+    context_token_budget: int = 1200  # Prompt tokens for retrieved passages (best rerank score first)
+    context_tokenizer: Optional[str] = "Qwen/Qwen2.5-3B-Instruct"  # For token counts; None estimates from characters
+    llm_num_ctx_buckets: List[int] = [2048]  # num_ctx = smallest bucket fitting prompt + answer. One bucket: no model reloads (each num_ctx change drops the KV cache) and 2048 keeps RAM from swapping; more buckets are opt-in, e.g. [1024, 2048, 4096]
+    llm_history_turns: int = 2  # Earlier turns of a session (context + question + answer) resent exactly as sent, so follow-ups see them and Ollama reuses their KV cache; they only fit in what num_ctx leaves after the new turn (none with full contexts in a 2048 bucket; try [4096]); 0 disables
+    llm_history_sessions: int = 256  # Sessions whose turns are kept in memory (LRU)
+    extractive_fast_path: bool = False  # Answer confident factoid lookups with the top chunk's sentence, skipping the LLM
+    extractive_min_confidence: float = 0.9  # Reranker score (0-1) of the top chunk (tune with evaluation/extractive_thresholds.py)
+    extractive_min_margin: float = 0.3  # ...and its lead over the second chunk
+    extractive_max_query_chars: int = 80  # Longer questions are not treated as factoid lookups
+    router_small_model: str = "qwen2.5:0.5b"  # model="auto": short factoid questions with confident, small context
+    router_large_model: str = "qwen2.5:3b"  # model="auto": everything else
+    router_max_query_chars: int = 80
+    router_min_confidence: float = 0.7  # Reranker score (0-1) of the top chunk
+    router_max_context_tokens: int = 800  # Context + question of the new turn; full contexts (~context_token_budget) go large (tune with evaluation/routing_eval.py)
+    context_compression: bool = False  # Keep only the query-relevant sentences of each passage
+    compression_keep_ratio: float = 0.35  # Share of the passage text kept (best sentences by query similarity)
+    compression_cache_entries: int = 20000  # Sentence vectors cached by content; 0 disables
     
     # Embedding
     embedding_model_name: str = "all-MiniLM-L6-v2"
     embedding_dim: int = 384
+    embedding_backend: str = "torch"  # bge-m3 backend: "torch", "onnx" or "onnx_int8" (exported to data/onnx on first use)
     
     # Retrieval
     default_top_k: int = 5
+    lexical_channel: str = "bm25"  # "bm25" or "bge_m3_sparse" (learned weights from the same bge-m3 forward pass)
+    k_retrieve: int = 50  # Candidates taken from each channel before fusion and reranking
+    fusion_method: str = "rrf"  # "rrf" (reciprocal rank) or "weighted" (min-max normalized scores)
+    fusion_vector_weight: float = 0.5  # Dense share of the weighted fusion; lexical gets the rest
+    multi_query: bool = False  # Search original, expanded and Korean/English-translated variants and fuse them all
+    query_batch_window_ms: float = 2.0  # Collect concurrent queries this long for one embedding pass / FAISS search; 0 disables
+    query_batch_max_size: int = 16  # ...or until this many have arrived
+
+    # Reranking
+    reranker_backend: str = "torch"  # "torch", "onnx" or "onnx_int8" (exported to data/onnx on first use)
+    onnx_threads: int = 0  # ONNX Runtime intra-op threads; 0 lets it pick
+    rerank_max_length: int = 512  # Token limit per (query, chunk) pair; longer pairs are truncated
+    rerank_batch_size: int = 32  # Pairs per forward pass (batches are formed from length-sorted pairs)
+    rerank_token_store: bool = True  # Store reranker token ids per chunk at indexing time (rerank_tokens.npz)
+    rerank_scheduler: bool = True  # One worker thread fills each batch with pairs from all concurrent requests
+    rerank_scheduler_window_ms: float = 2.0  # When idle, wait this long for other requests to share the first batch
+
+    # Candidate diversification (before reranking)
+    diversify_candidates: bool = True
+    dedup_threshold: float = 0.95  # Cosine similarity above which a candidate is a near-copy of a better-ranked one
+    mmr_max_candidates: int = 50  # MMR keeps at most this many distinct candidates; 0 = dedup only
+    mmr_lambda: float = 0.7  # Relevance vs. novelty trade-off
+    mmr_doc_penalty: float = 0.05  # Per already-picked chunk of the same document
+    rerank_cache_entries: int = 100000  # (normalized query, chunk hash, model) -> score; 0 disables
+    rerank_cache_path: Optional[str] = "data/rerank_cache.json"  # Persisted on shutdown; empty keeps it in memory
+    rerank_first_stage: str = "none"  # Cascade pruning: "none", "fusion" (fused-score margins) or "cross_encoder"; check recall with evaluation/cascade_recall.py before enabling
+    rerank_first_stage_model: str = "cross-encoder/mmarco-mMiniLMv2-L12-H384-v1"  # Small multilingual model for "cross_encoder"
+    rerank_first_stage_cache_path: Optional[str] = "data/rerank_first_stage_cache.json"  # Its scores, persisted on shutdown; empty keeps them in memory
+    rerank_min_candidates: int = 20  # Never send fewer candidates to the full reranker
+    rerank_max_candidates: int = 50  # ...nor more than this
+    rerank_cascade_margin: float = 0.5  # Keep candidates within this fraction of the best normalized first-stage score
+    rerank_cascade_gap: float = 0.25  # Cut early at the first normalized score drop this large
+
+    # Query embedding cache
+    query_embedding_cache_entries: int = 10000  # (model, normalized query) -> vector; 0 disables
+    query_embedding_cache_path: Optional[str] = "data/query_embedding_cache.npz"  # Snapshot on shutdown; empty keeps it in memory
+
+    # Query expansion
+    query_expansions_dir: Optional[str] = None  # Defaults to config/expansions (*.json / *.tsv)
+    query_expansions_reload_seconds: float = 30.0  # How often to check the dictionaries for changes; negative disables
+
+    # Collections
+    collection_memory_budget_mb: int = 2048  # Resident FAISS/BM25/chunk maps across all loaded collections
 
     class Config:
         env_file = ".env"
@@ -34,6 +34,10 @@ class ChatStore:
                 FOREIGN KEY(session_id) REFERENCES sessions(id) ON DELETE CASCADE
             )
         ''')
+        # Which LLM answered (model="auto" picks one per query); added to existing databases
+        columns = {row[1] for row in cursor.execute('PRAGMA table_info(messages)')}
+        if 'model' not in columns:
+            cursor.execute('ALTER TABLE messages ADD COLUMN model TEXT')
         self.conn.commit()
 
     def create_session(self, session_id: str, title: str, date: str):
@@ -58,19 +62,20 @@ class ChatStore:
         cursor.execute('DELETE FROM sessions WHERE id = ?', (session_id,))
         self.conn.commit()
 
-    def add_message(self, session_id: str, role: str, content: str, sources: List = None, generation_time: float = 0.0):
+    def add_message(self, session_id: str, role: str, content: str, sources: List = None, generation_time: float = 0.0,
+                    model: str = None):
         cursor = self.conn.cursor()
         sources_json = json.dumps(sources) if sources else "[]"
         cursor.execute('''
-            INSERT INTO messages (session_id, role, content, sources, generation_time)
-            VALUES (?, ?, ?, ?, ?)
-        ''', (session_id, role, content, sources_json, generation_time))
+            INSERT INTO messages (session_id, role, content, sources, generation_time, model)
+            VALUES (?, ?, ?, ?, ?, ?)
+        ''', (session_id, role, content, sources_json, generation_time, model))
         self.conn.commit()
 
     def get_messages(self, session_id: str) -> List[Dict]:
         cursor = self.conn.cursor()
         cursor.execute('''
-            SELECT role, content, sources, generation_time 
+            SELECT role, content, sources, generation_time, model
             FROM messages WHERE session_id = ? ORDER BY id ASC
         ''', (session_id,))
         rows = cursor.fetchall()
@@ -78,7 +83,8 @@ class ChatStore:
             "role": r[0],
             "content": r[1],
             "sources": json.loads(r[2]),
-            "generation_time": r[3]
+            "generation_time": r[3],
+            "model": r[4]
         } for r in rows]
 
     def close(self):
@@ -1,5 +1,7 @@
 import mysql.connector
-from typing import Dict, List
+from typing import Dict, List, Optional
+
+from config.collections import DEFAULT_COLLECTION
 
 class MetadataStore:
     def __init__(self):
@@ -12,7 +14,7 @@ class MetadataStore:
         )
         self.cursor = self.conn.cursor(dictionary=True)
 
-    def get_existing_documents(self) -> set:
+    def get_existing_documents(self, collection: str = DEFAULT_COLLECTION) -> set:
         """Returns a set of document names that are already indexed."""
         try:
             # Check if table exists first to avoid crashing on fresh install
@@ -20,7 +22,10 @@ class MetadataStore:
             if not self.cursor.fetchone():
                 return set()
 
-            self.cursor.execute("SELECT DISTINCT document_name FROM document_chunks")
+            self.cursor.execute(
+                "SELECT DISTINCT document_name FROM document_chunks WHERE collection = %s",
+                (collection,)
+            )
             results = self.cursor.fetchall()
             return {row['document_name'] for row in results}
         except Exception as e:
@@ -30,11 +35,12 @@ class MetadataStore:
     def insert_chunk_metadata(self, metadata: Dict):
         query = """
         INSERT INTO document_chunks
-        (chunk_id, vector_id, document_name, page_or_section, chunk_text, chunk_context)
-        VALUES (%s, %s, %s, %s, %s, %s)
+        (chunk_id, collection, vector_id, document_name, page_or_section, chunk_text, chunk_context)
+        VALUES (%s, %s, %s, %s, %s, %s, %s)
         """
         values = (
             metadata["chunk_id"],
+            metadata.get("collection", DEFAULT_COLLECTION),
             metadata["vector_id"],
             metadata["document_name"],
             metadata.get("page_or_section"),
@@ -44,18 +50,45 @@ class MetadataStore:
         self.cursor.execute(query, values)
         self.conn.commit()
 
-    def fetch_by_vector_ids(self, vector_ids: List[int]):
+    def fetch_by_vector_ids(self, vector_ids: List[int], collection: str = DEFAULT_COLLECTION,
+                            document_name: Optional[str] = None):
         if not vector_ids:
             return []
-            
+
         placeholders = ",".join(["%s"] * len(vector_ids))
         query = f"""
         SELECT * FROM document_chunks
-        WHERE vector_id IN ({placeholders})
+        WHERE collection = %s AND vector_id IN ({placeholders})
+        """
+        params = [collection] + list(vector_ids)
+        if document_name:
+            query += " AND document_name = %s"
+            params.append(document_name)
+        self.cursor.execute(query, params)
+        return self.cursor.fetchall()
+
+    def fetch_collection_chunks(self, collection: str = DEFAULT_COLLECTION):
+        """All chunks of a collection, ordered by vector id."""
+        query = """
+        SELECT vector_id, chunk_text, document_name FROM document_chunks
+        WHERE collection = %s ORDER BY vector_id
         """
-        self.cursor.execute(query, vector_ids)
+        self.cursor.execute(query, (collection,))
         return self.cursor.fetchall()
 
+    def delete_document(self, document_name: str, collection: str = DEFAULT_COLLECTION):
+        """Remove every chunk of one document from a collection."""
+        self.cursor.execute(
+            "DELETE FROM document_chunks WHERE collection = %s AND document_name = %s",
+            (collection, document_name)
+        )
+        self.conn.commit()
+
+    def delete_collection(self, collection: str = DEFAULT_COLLECTION):
+        """Remove every chunk of a collection (used before a full re-index)."""
+        self.cursor.execute("DELETE FROM document_chunks WHERE collection = %s", (collection,))
+        self.conn.commit()
+
     def close(self):
         self.cursor.close()
-        self.conn.close()
\ No newline at end of file
+        self.conn.close()
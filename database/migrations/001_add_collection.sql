@@ -0,0 +1,9 @@
+-- Adds collection scoping to an existing document_chunks table.
+-- Existing rows become part of the 'default' collection.
+USE rag_metadata;
+
+ALTER TABLE document_chunks
+    ADD COLUMN collection VARCHAR(64) NOT NULL DEFAULT 'default' AFTER chunk_id,
+    DROP INDEX vector_id,
+    ADD INDEX (collection, vector_id),
+    ADD INDEX (collection, document_name);
@@ -0,0 +1,13 @@
+-- Full-text indexes for the app/ repositories (MYSQL_DATABASE, default rag_db).
+-- Replaces LIKE '%term%' scans in /api/knowledge/search and /documents/search.
+-- The ngram parser tokenizes Korean (and other unsegmented text) into
+-- ngram_token_size-character grams; the server default of 2 suits Korean terms.
+-- Searched IN BOOLEAN MODE (app/repositories/fulltext.py); queries with no term
+-- of ngram_token_size characters still use LIKE, since the index has no shorter grams.
+USE rag_db;
+
+ALTER TABLE chunks
+    ADD FULLTEXT INDEX ft_chunks_content (content) WITH PARSER ngram;
+
+ALTER TABLE documents
+    ADD FULLTEXT INDEX ft_documents_title_content (title, content) WITH PARSER ngram;
@@ -6,11 +6,13 @@ DROP TABLE IF EXISTS document_chunks;
 CREATE TABLE document_chunks (
     id INT AUTO_INCREMENT PRIMARY KEY,
     chunk_id VARCHAR(128) NOT NULL,
+    collection VARCHAR(64) NOT NULL DEFAULT 'default',
     vector_id INT NOT NULL,
     document_name VARCHAR(255) NOT NULL,
     page_or_section VARCHAR(64),
     chunk_text TEXT NOT NULL,
     chunk_context TEXT, -- <--- THIS WAS MISSING
     UNIQUE (chunk_id),
-    INDEX (vector_id)
-);
\ No newline at end of file
+    INDEX (collection, vector_id),
+    INDEX (collection, document_name)
+);
@@ -0,0 +1,82 @@
+# evaluation/cascade_recall.py
+
+import argparse
+import json
+import time
+
+import numpy as np
+
+from config.collections import DEFAULT_COLLECTION
+from evaluation.performance_metrics import PerformanceMetrics
+from retrieval.rerank_cascade import FIRST_STAGES, RerankCascade
+from retrieval.retrieval_pipeline import RetrievalPipeline
+
+
+def _documents(chunks) -> list:
+    """Retrieved document names in rank order, without repeats."""
+    seen, docs = set(), []
+    for chunk in chunks:
+        if chunk["document_name"] not in seen:
+            seen.add(chunk["document_name"])
+            docs.append(chunk["document_name"])
+    return docs
+
+
+def run_benchmark(stages, collection=DEFAULT_COLLECTION, n_queries=None, top_k=10):
+    """
+    recall@top_k of each cascade first stage against full reranking ("none"):
+    document recall on the test queries' relevant_docs, and how many of the full
+    reranker's top_k chunks the pruned cascade still returns.
+    """
+    with open("evaluation/test_queries.json", "r", encoding="utf-8") as f:
+        test_queries = json.load(f)[:n_queries]
+
+    pipeline = RetrievalPipeline(top_k=top_k)
+    retriever = pipeline.get_retriever(collection)
+    reranker = pipeline.collections.reranker
+    # The rerank cache would make every stage after the first look free
+    cache, reranker.cache = reranker.cache, None
+
+    queries = [(item, pipeline.embedder.embed_for_search(item["query"])) for item in test_queries]
+    results = {}
+    try:
+        for stage in ["none"] + [s for s in stages if s != "none"]:
+            retriever.cascade = RerankCascade(reranker, first_stage=stage)
+            rows = []
+            for item, (query_vec, query_sparse) in queries:
+                start = time.perf_counter()
+                chunks = retriever.search(query_vec, item["query"], query_sparse=query_sparse)
+                rows.append({
+                    "chunk_ids": [c["chunk_id"] for c in chunks],
+                    "recall": PerformanceMetrics.recall_at_k(_documents(chunks), set(item["relevant_docs"]), top_k),
+                    "ms": (time.perf_counter() - start) * 1000,
+                })
+            results[stage] = (rows, retriever.cascade.stats())
+    finally:
+        reranker.cache = cache
+
+    full_rows = results["none"][0]
+    print("=" * 60)
+    print(f"RERANK CASCADE RECALL ({len(full_rows)} queries, top_k {top_k})")
+    print("=" * 60)
+    for stage, (rows, stats) in results.items():
+        overlap = np.mean([
+            len(set(r["chunk_ids"]) & set(f["chunk_ids"])) / max(1, len(f["chunk_ids"]))
+            for r, f in zip(rows, full_rows)
+        ])
+        print(f"{stage:>14}: recall@{top_k} {np.mean([r['recall'] for r in rows]):.3f} | "
+              f"top-{top_k} overlap with full reranking {overlap:.1%} | "
+              f"reranked {stats['reranked_avg']:.1f} of {stats['candidates'] / max(1, stats['queries']):.1f} | "
+              f"p50 {np.percentile([r['ms'] for r in rows], 50):.0f} ms")
+    print("=" * 60)
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="recall@top_k of rerank cascade first stages vs full reranking")
+    parser.add_argument("--stages", nargs="+", default=["fusion"], choices=FIRST_STAGES)
+    parser.add_argument("--collection", default=DEFAULT_COLLECTION)
+    parser.add_argument("--queries", type=int, default=None)
+    parser.add_argument("--top-k", type=int, default=10)
+    args = parser.parse_args()
+    run_benchmark(args.stages, args.collection, args.queries, args.top_k)
@@ -0,0 +1,108 @@
+# evaluation/compression_benchmark.py
+
+import argparse
+import json
+import time
+
+import numpy as np
+
+from config.collections import DEFAULT_COLLECTION
+from generation.answer_generation import AnswerGenerator
+from generation.context_compressor import ContextCompressor
+
+
+def _docs(packed) -> set:
+    return {p["document_name"] for p in packed.passages}
+
+
+def run_benchmark(collection=DEFAULT_COLLECTION, n_queries=20, keep_ratio=None, generate=False,
+                  model_name="qwen2.5:3b"):
+    with open("evaluation/test_queries.json", "r", encoding="utf-8") as f:
+        test_queries = json.load(f)[:n_queries]
+
+    generator = AnswerGenerator()
+    embedder = generator.retrieval_pipeline.embedder
+    compressor = ContextCompressor(embedder.embedder, keep_ratio=keep_ratio)
+    packer = generator.packer
+    packer.compressor = compressor
+
+    rows = []
+    for item in test_queries:
+        query, relevant = item["query"], set(item["relevant_docs"])
+        chunks = generator.retrieve(query, collection=collection)
+        if not chunks:
+            continue
+        query_vec = embedder.embed(query)
+
+        full = packer.pack(query, chunks, compress=False)
+        start = time.perf_counter()
+        compressed = packer.pack(query, chunks, query_vec=query_vec, compress=True)
+        compress_ms = (time.perf_counter() - start) * 1000
+
+        row = {
+            "query": query,
+            "full_tokens": full.prompt_tokens,
+            "compressed_tokens": compressed.prompt_tokens,
+            "compress_ms": compress_ms,
+            "full_num_ctx": full.num_ctx,
+            "compressed_num_ctx": compressed.num_ctx,
+            # Relevant documents cited by the full context that survive compression
+            "relevant_in_full": bool(relevant & _docs(full)),
+            "relevant_kept": bool(relevant & _docs(compressed)),
+        }
+
+        if generate:
+            full_answer, full_stats = generator.llm.generate_with_stats(
+                full.prompt, model_name=model_name, num_ctx=full.num_ctx
+            )
+            compressed_answer, compressed_stats = generator.llm.generate_with_stats(
+                compressed.prompt, model_name=model_name, num_ctx=compressed.num_ctx
+            )
+            vectors = embedder.embedder.embed_texts([full_answer, compressed_answer])
+            row.update({
+                "full_prefill_ms": full_stats["prefill_ms"],
+                "compressed_prefill_ms": compressed_stats["prefill_ms"],
+                "full_total_ms": full_stats["total_ms"],
+                "compressed_total_ms": compressed_stats["total_ms"],
+                # Proxy for answer-quality impact: agreement with the uncompressed answer
+                "answer_similarity": float(vectors[0] @ vectors[1]),
+            })
+        rows.append(row)
+        print(f"  {row['full_tokens']:5d} -> {row['compressed_tokens']:5d} tokens | {query[:60]}")
+
+    if not rows:
+        raise SystemExit(f"No results for collection '{collection}'")
+
+    full_tokens = np.array([r["full_tokens"] for r in rows], dtype=np.float64)
+    compressed_tokens = np.array([r["compressed_tokens"] for r in rows], dtype=np.float64)
+    with_relevant = [r for r in rows if r["relevant_in_full"]]
+
+    print("=" * 60)
+    print(f"CONTEXT COMPRESSION BENCHMARK ({len(rows)} queries, keep ratio {compressor.keep_ratio})")
+    print("=" * 60)
+    print(f"Prompt tokens: {full_tokens.mean():.0f} -> {compressed_tokens.mean():.0f} "
+          f"({(full_tokens / compressed_tokens).mean():.2f}x shorter)")
+    print(f"Compression time: p50 {np.percentile([r['compress_ms'] for r in rows], 50):.1f} ms")
+    if with_relevant:
+        kept = sum(r["relevant_kept"] for r in with_relevant) / len(with_relevant)
+        print(f"Relevant document still cited: {kept:.1%} of {len(with_relevant)} queries")
+    if generate:
+        print(f"Prefill: {np.mean([r['full_prefill_ms'] for r in rows]):.0f} ms -> "
+              f"{np.mean([r['compressed_prefill_ms'] for r in rows]):.0f} ms")
+        print(f"Total generation: {np.mean([r['full_total_ms'] for r in rows]):.0f} ms -> "
+              f"{np.mean([r['compressed_total_ms'] for r in rows]):.0f} ms")
+        similarity = np.array([r["answer_similarity"] for r in rows])
+        print(f"Answer similarity to uncompressed: mean {similarity.mean():.3f} | min {similarity.min():.3f}")
+    print("=" * 60)
+    return rows
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Prompt size and answer impact of query-focused context compression")
+    parser.add_argument("--collection", default=DEFAULT_COLLECTION)
+    parser.add_argument("--queries", type=int, default=20)
+    parser.add_argument("--keep-ratio", type=float, default=None)
+    parser.add_argument("--generate", action="store_true", help="Also generate both answers with Ollama")
+    parser.add_argument("--model", default="qwen2.5:3b")
+    args = parser.parse_args()
+    run_benchmark(args.collection, args.queries, args.keep_ratio, args.generate, args.model)
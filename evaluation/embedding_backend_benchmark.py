@@ -0,0 +1,93 @@
+# evaluation/embedding_backend_benchmark.py
+
+import argparse
+import json
+import time
+
+import numpy as np
+
+from config.collections import DEFAULT_COLLECTION
+from database.metadata_store import MetadataStore
+from indexing.embedding_device import EmbeddingService, EMBEDDING_BACKENDS
+
+
+def load_texts(collection: str, n_chunks: int, n_queries: int, seed: int = 0):
+    """A sample of indexed chunks plus the evaluation queries (same inputs for every backend)."""
+    with open("evaluation/test_queries.json", "r", encoding="utf-8") as f:
+        queries = [item["query"] for item in json.load(f)][:n_queries]
+
+    db = MetadataStore()
+    try:
+        texts = [row["chunk_text"] for row in db.fetch_collection_chunks(collection)]
+    finally:
+        db.close()
+    if not texts:
+        raise SystemExit(f"No chunks indexed in collection '{collection}'")
+
+    rng = np.random.default_rng(seed)
+    picks = rng.choice(len(texts), size=min(n_chunks, len(texts)), replace=False)
+    return [texts[i] for i in picks], queries
+
+
+def run_backend(backend: str, chunks, queries):
+    service = EmbeddingService(backend=backend, use_sparse=False)
+    service.embed_query(queries[0])  # warm-up
+
+    start = time.perf_counter()
+    chunk_vecs = service.embed_chunks([{"chunk_text": text} for text in chunks])
+    bulk_seconds = time.perf_counter() - start
+
+    query_vecs, timings = [], []
+    for query in queries:
+        start = time.perf_counter()
+        query_vecs.append(service.embed_query(query))
+        timings.append((time.perf_counter() - start) * 1000)
+    del service
+    return np.asarray(chunk_vecs, dtype=np.float32), np.vstack(query_vecs).astype(np.float32), bulk_seconds, np.array(timings)
+
+
+def neighbour_overlap(ref_queries, ref_chunks, queries, chunks, k: int) -> float:
+    """Share of each query's top-k chunks (by cosine) that both backends agree on."""
+    ref_top = np.argsort(-(ref_queries @ ref_chunks.T), axis=1)[:, :k]
+    top = np.argsort(-(queries @ chunks.T), axis=1)[:, :k]
+    return float(np.mean([len(set(a) & set(b)) / k for a, b in zip(ref_top.tolist(), top.tolist())]))
+
+
+def run_benchmark(backends, collection=DEFAULT_COLLECTION, n_chunks=500, n_queries=50, top_k=10):
+    chunks, queries = load_texts(collection, n_chunks, n_queries)
+    print("=" * 60)
+    print(f"EMBEDDING BACKEND BENCHMARK ({len(chunks)} chunks, {len(queries)} queries)")
+    print("=" * 60)
+
+    results = {}
+    for backend in backends:
+        print(f"\n🧪 {backend}")
+        chunk_vecs, query_vecs, bulk_seconds, timings = run_backend(backend, chunks, queries)
+        results[backend] = (chunk_vecs, query_vecs)
+        print(f"  Bulk: {len(chunks) / bulk_seconds:.1f} chunks/s ({bulk_seconds:.1f}s)")
+        print(f"  Query: p50 {np.percentile(timings, 50):.1f} ms | p95 {np.percentile(timings, 95):.1f} ms")
+
+    reference = backends[0]
+    ref_chunks, ref_queries = results[reference]
+    for backend in backends[1:]:
+        chunk_vecs, query_vecs = results[backend]
+        # Vectors are L2-normalized, so the row-wise dot product is the cosine
+        cosines = np.concatenate([(ref_chunks * chunk_vecs).sum(1), (ref_queries * query_vecs).sum(1)])
+        k = min(top_k, len(chunks))
+        overlap = neighbour_overlap(ref_queries, ref_chunks, query_vecs, chunk_vecs, k)
+        print(f"\n📏 Parity {backend} vs {reference}: cosine mean {cosines.mean():.5f} | "
+              f"min {cosines.min():.5f} | top-{k} neighbour overlap {overlap:.1%}")
+
+    print("=" * 60)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compare bge-m3 embedding backends for parity and throughput")
+    parser.add_argument("--backends", nargs="+", default=list(EMBEDDING_BACKENDS), choices=EMBEDDING_BACKENDS,
+                        help="The first backend is the parity reference")
+    parser.add_argument("--collection", default=DEFAULT_COLLECTION)
+    parser.add_argument("--chunks", type=int, default=500)
+    parser.add_argument("--queries", type=int, default=50)
+    parser.add_argument("--top-k", type=int, default=10)
+    args = parser.parse_args()
+    run_benchmark(args.backends, args.collection, args.chunks, args.queries, args.top_k)
@@ -0,0 +1,86 @@
+# evaluation/extractive_thresholds.py
+
+import argparse
+import json
+import time
+
+import numpy as np
+
+from config.collections import DEFAULT_COLLECTION
+from generation.answer_generation import AnswerGenerator
+
+CONFIDENCES = [0.5, 0.7, 0.8, 0.9, 0.95, 0.98]
+MARGINS = [0.0, 0.1, 0.2, 0.3, 0.5]
+
+
+def run_benchmark(collection=DEFAULT_COLLECTION, target_precision=0.95, all_queries=False):
+    """
+    Coverage (share of queries answered extractively) and precision (share of those
+    whose top chunk comes from a relevant document) over a grid of thresholds,
+    for tuning extractive_min_confidence / extractive_min_margin.
+    """
+    with open("evaluation/test_queries.json", "r", encoding="utf-8") as f:
+        test_queries = json.load(f)
+
+    generator = AnswerGenerator()
+    answerer = generator.extractive
+
+    rows = []
+    for item in test_queries:
+        query = item["query"]
+        if not all_queries and not answerer.is_factoid(query):
+            continue
+        chunks = generator.retrieve(query, collection=collection)
+        if not chunks:
+            continue
+        start = time.perf_counter()
+        confidence, margin = answerer.confidence(chunks)
+        answerer.snippet(query, chunks[0]["chunk_text"])
+        rows.append({
+            "query": query,
+            "confidence": confidence,
+            "margin": margin,
+            "correct": chunks[0]["document_name"] in item["relevant_docs"],
+            "extract_ms": (time.perf_counter() - start) * 1000,
+        })
+
+    if not rows:
+        raise SystemExit("No factoid test queries (use --all to include every query)")
+
+    confidence = np.array([r["confidence"] for r in rows])
+    margin = np.array([r["margin"] for r in rows])
+    correct = np.array([r["correct"] for r in rows])
+
+    print("=" * 60)
+    print(f"EXTRACTIVE FAST-PATH THRESHOLDS ({len(rows)} queries)")
+    print("=" * 60)
+    print(f"{'confidence':>10} {'margin':>7} {'coverage':>9} {'precision':>10}")
+    best = None
+    for min_confidence in CONFIDENCES:
+        for min_margin in MARGINS:
+            taken = (confidence >= min_confidence) & (margin >= min_margin)
+            if not taken.any():
+                continue
+            coverage, precision = taken.mean(), correct[taken].mean()
+            print(f"{min_confidence:>10.2f} {min_margin:>7.2f} {coverage:>9.1%} {precision:>10.1%}")
+            if precision >= target_precision and (best is None or coverage > best[2]):
+                best = (min_confidence, min_margin, coverage, precision)
+    print("-" * 60)
+    print(f"Extraction time: p50 {np.percentile([r['extract_ms'] for r in rows], 50):.2f} ms")
+    if best:
+        print(f"Widest coverage at >= {target_precision:.0%} precision: "
+              f"extractive_min_confidence={best[0]}, extractive_min_margin={best[1]} "
+              f"({best[2]:.1%} of queries, {best[3]:.1%} precise)")
+    else:
+        print(f"No threshold reaches {target_precision:.0%} precision")
+    print("=" * 60)
+    return rows
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Tune the extractive fast-path thresholds on the test queries")
+    parser.add_argument("--collection", default=DEFAULT_COLLECTION)
+    parser.add_argument("--target-precision", type=float, default=0.95)
+    parser.add_argument("--all", action="store_true", help="Include queries that are not factoid lookups")
+    args = parser.parse_args()
+    run_benchmark(args.collection, args.target_precision, args.all)
@@ -0,0 +1,93 @@
+# evaluation/lexical_benchmark.py
+
+import argparse
+import time
+from typing import List
+
+import numpy as np
+
+from retrieval.lexical_index import SparseBM25
+
+
+def make_corpus(n_docs: int, vocab_size: int, doc_len: int, rng: np.random.Generator) -> List[List[str]]:
+    """Synthetic corpus with a Zipf-like term distribution (roughly 600-char chunks)."""
+    vocab = [f"t{i}" for i in range(vocab_size)]
+    term_ids = (rng.zipf(1.3, size=n_docs * doc_len) - 1) % vocab_size
+    lengths = rng.integers(doc_len // 2, doc_len * 3 // 2, size=n_docs)
+    corpus, pos = [], 0
+    for length in lengths:
+        ids = term_ids[pos:pos + length] if pos + length <= len(term_ids) else term_ids[:length]
+        corpus.append([vocab[i] for i in ids])
+        pos += length
+    return corpus
+
+
+def make_queries(n_queries: int, vocab_size: int, rng: np.random.Generator) -> List[List[str]]:
+    queries = []
+    for _ in range(n_queries):
+        ids = (rng.zipf(1.3, size=rng.integers(2, 8)) - 1) % vocab_size
+        queries.append([f"t{i}" for i in ids])
+    return queries
+
+
+def time_queries(search, queries) -> np.ndarray:
+    timings = []
+    for q in queries:
+        start = time.perf_counter()
+        search(q)
+        timings.append(time.perf_counter() - start)
+    return np.array(timings) * 1000
+
+
+def run_benchmark(sizes, n_queries=50, k=50, vocab_size=50000, doc_len=100, baseline_max=100000, seed=0):
+    try:
+        from rank_bm25 import BM25Okapi
+    except ImportError:
+        BM25Okapi = None
+        print("⚠️ rank_bm25 not installed, skipping baseline")
+
+    rng = np.random.default_rng(seed)
+    print("=" * 60)
+    print("LEXICAL SEARCH BENCHMARK (SparseBM25 vs rank_bm25.BM25Okapi)")
+    print("=" * 60)
+
+    for n_docs in sizes:
+        corpus = make_corpus(n_docs, vocab_size, doc_len, rng)
+        queries = make_queries(n_queries, vocab_size, rng)
+        print(f"\n📚 {n_docs:,} chunks, {n_queries} queries, top-{k}")
+
+        start = time.perf_counter()
+        sparse = SparseBM25(corpus)
+        print(f"  SparseBM25 build: {time.perf_counter() - start:.2f}s ({sparse.nbytes() / 1024 / 1024:.1f} MB)")
+        sparse_ms = time_queries(lambda q: sparse.top_k(q, k), queries)
+        print(f"  SparseBM25 query: p50 {np.percentile(sparse_ms, 50):.2f} ms | p95 {np.percentile(sparse_ms, 95):.2f} ms")
+
+        if BM25Okapi is None or n_docs > baseline_max:
+            print("  BM25Okapi: skipped")
+            continue
+
+        start = time.perf_counter()
+        okapi = BM25Okapi(corpus)
+        print(f"  BM25Okapi build: {time.perf_counter() - start:.2f}s")
+        okapi_ms = time_queries(lambda q: np.argsort(okapi.get_scores(q), kind="stable")[::-1][:k], queries)
+        print(f"  BM25Okapi query: p50 {np.percentile(okapi_ms, 50):.2f} ms | p95 {np.percentile(okapi_ms, 95):.2f} ms")
+        print(f"  ⚡ Speedup (p50): {np.percentile(okapi_ms, 50) / np.percentile(sparse_ms, 50):.1f}x")
+
+        identical = all(
+            np.array_equal(np.argsort(okapi.get_scores(q), kind="stable")[::-1][:k], sparse.top_k(q, k))
+            for q in queries
+        )
+        print(f"  Identical rankings: {'✅' if identical else '❌'}")
+
+    print("=" * 60)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark lexical search engines")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10000, 100000, 1000000])
+    parser.add_argument("--queries", type=int, default=50)
+    parser.add_argument("--k", type=int, default=50)
+    parser.add_argument("--baseline-max", type=int, default=100000,
+                        help="Largest corpus to run rank_bm25 on (it is very slow and memory hungry)")
+    args = parser.parse_args()
+    run_benchmark(args.sizes, n_queries=args.queries, k=args.k, baseline_max=args.baseline_max)
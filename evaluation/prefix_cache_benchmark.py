@@ -0,0 +1,94 @@
+# evaluation/prefix_cache_benchmark.py
+
+import argparse
+import json
+
+import numpy as np
+
+from config.collections import DEFAULT_COLLECTION
+from generation.answer_generation import AnswerGenerator
+from generation.prompt_builder import SYSTEM_PROMPT
+
+
+def run_benchmark(collection=DEFAULT_COLLECTION, n_queries=10, model_name="qwen2.5:3b"):
+    """
+    Prefill tokens reported by Ollama (prompt_eval_count, cached prefix excluded) for
+    each test query asked as a new conversation, repeated verbatim, and asked as a
+    follow-up in one running session. Follow-ups should keep the num_ctx of the
+    first question; a changed num_ctx shows up as a model reload (load time).
+    """
+    with open("evaluation/test_queries.json", "r", encoding="utf-8") as f:
+        test_queries = json.load(f)[:n_queries]
+
+    generator = AnswerGenerator()
+    llm, packer = generator.llm, generator.packer
+    session_id = "prefix-cache-benchmark"
+    generator.conversations.clear(session_id)
+
+    retrieved = []
+    for item in test_queries:
+        chunks = generator.retrieve(item["query"], collection=collection)
+        if chunks:
+            retrieved.append((item["query"], chunks))
+
+    rows = []
+    # Each query as a new conversation, then repeated verbatim
+    for query, chunks in retrieved:
+        fresh = packer.pack(query, chunks)
+        _, first = llm.generate_with_stats(fresh.message, model_name=model_name, num_ctx=fresh.num_ctx,
+                                           system=SYSTEM_PROMPT)
+        _, repeat = llm.generate_with_stats(fresh.message, model_name=model_name, num_ctx=fresh.num_ctx,
+                                            system=SYSTEM_PROMPT)
+        rows.append({
+            "query": query,
+            "first_prompt_tokens": fresh.prompt_tokens,
+            "first_num_ctx": fresh.num_ctx,
+            "first_prefill": first["prompt_tokens"],
+            "repeat_prefill": repeat["prompt_tokens"],
+        })
+
+    # All queries as follow-ups in one session (back to back, so the session prefix is still cached)
+    for row, (query, chunks) in zip(rows, retrieved):
+        followed = packer.pack(query, chunks, history=generator.conversations.history(session_id))
+        answer, follow_up = llm.generate_with_stats(followed.message, model_name=model_name,
+                                                    num_ctx=followed.num_ctx, system=SYSTEM_PROMPT,
+                                                    history=followed.history)
+        generator.remember(session_id, followed, answer)
+        row.update({
+            "follow_up_turns": len(followed.history),
+            "follow_up_prompt_tokens": followed.prompt_tokens,
+            "follow_up_num_ctx": followed.num_ctx,
+            "follow_up_prefill": follow_up["prompt_tokens"],
+            "follow_up_load_ms": follow_up["load_ms"],
+        })
+        print(f"  first {row['first_prefill']:5d} | repeat {row['repeat_prefill']:5d} | "
+              f"follow-up {row['follow_up_prefill']:5d} of {followed.prompt_tokens:5d} "
+              f"({row['follow_up_turns']} earlier turns, num_ctx {followed.num_ctx}, "
+              f"load {row['follow_up_load_ms']:.0f} ms) | {query[:50]}")
+
+    if not rows:
+        raise SystemExit(f"No results for collection '{collection}'")
+
+    def mean(key):
+        return np.mean([r[key] for r in rows])
+
+    print("=" * 60)
+    print(f"PREFIX CACHE BENCHMARK ({len(rows)} queries, {model_name})")
+    print("=" * 60)
+    print(f"New conversation: {mean('first_prefill'):.0f} of {mean('first_prompt_tokens'):.0f} prompt tokens prefilled")
+    print(f"Repeated query:   {mean('repeat_prefill'):.0f} prefilled")
+    print(f"Follow-up:        {mean('follow_up_prefill'):.0f} of {mean('follow_up_prompt_tokens'):.0f} prompt tokens prefilled")
+    resized = sum(r["follow_up_num_ctx"] != r["first_num_ctx"] for r in rows)
+    print(f"Follow-ups with a different num_ctx than the first question: {resized} of {len(rows)} "
+          f"(mean load {mean('follow_up_load_ms'):.0f} ms)")
+    print("=" * 60)
+    return rows
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Ollama prefill tokens for new, repeated and follow-up queries")
+    parser.add_argument("--collection", default=DEFAULT_COLLECTION)
+    parser.add_argument("--queries", type=int, default=10)
+    parser.add_argument("--model", default="qwen2.5:3b")
+    args = parser.parse_args()
+    run_benchmark(args.collection, args.queries, args.model)
@@ -0,0 +1,89 @@
+# evaluation/reranker_backend_benchmark.py
+
+import argparse
+import json
+import time
+
+import numpy as np
+
+from config.collections import DEFAULT_COLLECTION
+from database.metadata_store import MetadataStore
+from retrieval.reranker import Reranker, RERANKER_BACKENDS
+
+
+def load_workload(collection: str, n_queries: int, n_candidates: int, seed: int = 0):
+    """Test queries paired with chunks drawn from the collection (same chunks for every backend)."""
+    with open("evaluation/test_queries.json", "r", encoding="utf-8") as f:
+        queries = [item["query"] for item in json.load(f)][:n_queries]
+
+    db = MetadataStore()
+    try:
+        texts = [row["chunk_text"] for row in db.fetch_collection_chunks(collection)]
+    finally:
+        db.close()
+    if not texts:
+        raise SystemExit(f"No chunks indexed in collection '{collection}'")
+
+    rng = np.random.default_rng(seed)
+    workload = []
+    for query in queries:
+        picks = rng.choice(len(texts), size=min(n_candidates, len(texts)), replace=False)
+        workload.append((query, [texts[i] for i in picks]))
+    return workload
+
+
+def run_backend(backend: str, workload, warmup: int = 2):
+    reranker = Reranker(backend=backend, cache_entries=0)
+    for query, texts in workload[:warmup]:
+        reranker.score(query, texts)
+
+    scores, timings = [], []
+    for query, texts in workload:
+        start = time.perf_counter()
+        scores.append(reranker.score(query, texts))
+        timings.append((time.perf_counter() - start) * 1000)
+    del reranker
+    return scores, np.array(timings)
+
+
+def top_k_overlap(reference: np.ndarray, candidate: np.ndarray, k: int) -> float:
+    ref = set(np.argsort(-reference, kind="stable")[:k].tolist())
+    cand = set(np.argsort(-candidate, kind="stable")[:k].tolist())
+    return len(ref & cand) / max(1, min(k, len(reference)))
+
+
+def run_benchmark(backends, collection=DEFAULT_COLLECTION, n_queries=20, n_candidates=50, top_k=10):
+    workload = load_workload(collection, n_queries, n_candidates)
+    print("=" * 60)
+    print(f"RERANKER BACKEND BENCHMARK ({len(workload)} queries x {n_candidates} candidates)")
+    print("=" * 60)
+
+    results = {}
+    for backend in backends:
+        print(f"\n🧪 {backend}")
+        scores, timings = run_backend(backend, workload)
+        results[backend] = scores
+        print(f"  Latency per query: p50 {np.percentile(timings, 50):.1f} ms | "
+              f"p95 {np.percentile(timings, 95):.1f} ms | mean {timings.mean():.1f} ms")
+
+    reference = backends[0]
+    for backend in backends[1:]:
+        diffs = np.concatenate([np.abs(a - b) for a, b in zip(results[reference], results[backend])])
+        overlap = np.mean([top_k_overlap(a, b, top_k) for a, b in zip(results[reference], results[backend])])
+        # Every backend returns sigmoid scores in [0, 1], so the differences are on that scale
+        print(f"\n📏 Parity {backend} vs {reference} (sigmoid scores): max |Δ| {diffs.max():.4f} | "
+              f"mean |Δ| {diffs.mean():.4f} | top-{top_k} overlap {overlap:.1%}")
+
+    print("=" * 60)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compare reranker backends for score parity and latency")
+    parser.add_argument("--backends", nargs="+", default=list(RERANKER_BACKENDS), choices=RERANKER_BACKENDS,
+                        help="The first backend is the parity reference")
+    parser.add_argument("--collection", default=DEFAULT_COLLECTION)
+    parser.add_argument("--queries", type=int, default=20)
+    parser.add_argument("--candidates", type=int, default=50)
+    parser.add_argument("--top-k", type=int, default=10)
+    args = parser.parse_args()
+    run_benchmark(args.backends, args.collection, args.queries, args.candidates, args.top_k)
@@ -0,0 +1,110 @@
+# evaluation/routing_eval.py
+
+import argparse
+import json
+import time
+
+import numpy as np
+
+from config.collections import DEFAULT_COLLECTION
+from generation.answer_generation import AnswerGenerator
+from generation.prompt_builder import SYSTEM_PROMPT
+
+CONTEXT_THRESHOLDS = [400, 600, 800, 1000, 1200, 1400]
+
+
+def run_benchmark(collection=DEFAULT_COLLECTION, n_queries=None, min_similarity=0.85):
+    """
+    Offline check of model="auto": every test query is routed as in production,
+    and each query that passes the query and confidence checks (routed small, or
+    large only for its context size) is answered by both models.
+    Quality proxy: similarity of the two answers (and whether the small answer
+    still names a relevant document); speed: generation time of each.
+    The sweep over router_max_context_tokens shows what each threshold would route small.
+    """
+    with open("evaluation/test_queries.json", "r", encoding="utf-8") as f:
+        test_queries = json.load(f)[:n_queries]
+
+    generator = AnswerGenerator()
+    router, llm = generator.router, generator.llm
+    embedder = generator.retrieval_pipeline.embedder.embedder
+
+    def timed(model_name, packed):
+        start = time.perf_counter()
+        answer = llm.generate(packed.message, model_name=model_name, num_ctx=packed.num_ctx, system=SYSTEM_PROMPT)
+        return answer, time.perf_counter() - start
+
+    rows = []
+    for item in test_queries:
+        query = item["query"]
+        chunks = generator.retrieve(query, collection=collection)
+        if not chunks:
+            continue
+        packed = generator.packer.pack(query, chunks)
+        model_name, reason = router.route(query, chunks, packed.message_tokens)
+        row = {"query": query, "model": model_name, "reason": reason, "context_tokens": packed.message_tokens}
+
+        if reason in ("simple", "large_context"):
+            small_answer, small_s = timed(router.small_model, packed)
+            large_answer, large_s = timed(router.large_model, packed)
+            vectors = embedder.embed_texts([small_answer, large_answer])
+            relevant = [i + 1 for i, p in enumerate(packed.passages) if p["document_name"] in item["relevant_docs"]]
+            row.update({
+                "small_s": small_s,
+                "large_s": large_s,
+                "similarity": float(vectors[0] @ vectors[1]),
+                # A relevant passage is cited as "Document n"
+                "cites_relevant": any(f"Document {n}" in small_answer for n in relevant),
+                "small_answer": small_answer,
+                "large_answer": large_answer,
+            })
+        rows.append(row)
+        print(f"  {model_name:>14} ({reason}, {packed.message_tokens} context tokens) | {query[:60]}")
+
+    if not rows:
+        raise SystemExit(f"No results for collection '{collection}'")
+
+    candidates = [r for r in rows if "similarity" in r]
+    small = [r for r in candidates if r["model"] == router.small_model]
+    print("=" * 60)
+    print(f"MODEL ROUTING EVALUATION ({len(rows)} queries)")
+    print("=" * 60)
+    print(f"Routed to {router.small_model}: {len(small)} of {len(rows)} ({len(small) / len(rows):.1%})")
+    for reason, count in router.stats()["reasons"].items():
+        print(f"  {reason}: {count}")
+    if small:
+        similarity = np.array([r["similarity"] for r in small])
+        print(f"Small vs large answer similarity: mean {similarity.mean():.3f} | min {similarity.min():.3f}")
+        print(f"Small answers citing a relevant document: {np.mean([r['cites_relevant'] for r in small]):.1%}")
+        print(f"Generation time: {np.mean([r['small_s'] for r in small]):.2f}s (small) vs "
+              f"{np.mean([r['large_s'] for r in small]):.2f}s (large)")
+        for r in small:
+            if r["similarity"] < min_similarity:
+                print(f"  ⚠️ Review ({r['similarity']:.3f}): {r['query'][:70]}")
+    if candidates:
+        print("-" * 60)
+        print(f"router_max_context_tokens sweep (current {router.max_context_tokens}):")
+        print(f"{'tokens':>7} {'routed small':>13} {'similarity':>11} {'cites relevant':>15}")
+        for threshold in sorted(set(CONTEXT_THRESHOLDS) | {router.max_context_tokens}):
+            taken = [r for r in candidates if r["context_tokens"] <= threshold]
+            if not taken:
+                print(f"{threshold:>7} {0:>13.1%} {'-':>11} {'-':>15}")
+                continue
+            print(f"{threshold:>7} {len(taken) / len(rows):>13.1%} "
+                  f"{np.mean([r['similarity'] for r in taken]):>11.3f} "
+                  f"{np.mean([r['cites_relevant'] for r in taken]):>15.1%}")
+    print("=" * 60)
+    return rows
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Check that model='auto' routing does not hurt answer quality")
+    parser.add_argument("--collection", default=DEFAULT_COLLECTION)
+    parser.add_argument("--queries", type=int, default=None)
+    parser.add_argument("--min-similarity", type=float, default=0.85, help="Flag small answers below this similarity")
+    parser.add_argument("--output", default=None, help="Write every routed query and both answers to this JSON file")
+    args = parser.parse_args()
+    results = run_benchmark(args.collection, args.queries, args.min_similarity)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(results, f, ensure_ascii=False, indent=2)
@@ -0,0 +1,74 @@
+# generation/aho_corasick.py
+
+from collections import deque
+from typing import Iterable, Iterator, List, Tuple
+
+
+class AhoCorasick:
+    """
+    Multi-pattern substring matcher.
+    The automaton is compiled once; a scan then walks the text a single time,
+    so matching cost depends on the text length (plus the number of hits)
+    rather than on how many patterns the dictionary holds.
+    """
+
+    def __init__(self, patterns: Iterable[str]):
+        self.patterns: List[str] = []
+        # Node 0 is the root. Each node: outgoing transitions, failure link, pattern ids ending here
+        self._goto: List[dict] = [{}]
+        self._fail: List[int] = [0]
+        self._out: List[List[int]] = [[]]
+
+        for pattern in patterns:
+            self._add(pattern)
+        self._link()
+
+    def __len__(self):
+        return len(self.patterns)
+
+    def _add(self, pattern: str):
+        pattern_id = len(self.patterns)
+        self.patterns.append(pattern)
+        if not pattern:
+            return
+
+        node = 0
+        for ch in pattern:
+            nxt = self._goto[node].get(ch)
+            if nxt is None:
+                nxt = len(self._goto)
+                self._goto[node][ch] = nxt
+                self._goto.append({})
+                self._fail.append(0)
+                self._out.append([])
+            node = nxt
+        self._out[node].append(pattern_id)
+
+    def _link(self):
+        """Breadth-first pass setting failure links and merging their outputs."""
+        queue = deque(self._goto[0].values())
+        while queue:
+            node = queue.popleft()
+            for ch, child in self._goto[node].items():
+                queue.append(child)
+                fail = self._fail[node]
+                while fail and ch not in self._goto[fail]:
+                    fail = self._fail[fail]
+                self._fail[child] = self._goto[fail].get(ch, 0)
+                # Patterns that are suffixes of this path also end here
+                self._out[child] = self._out[child] + self._out[self._fail[child]]
+
+    def iter_matches(self, text: str) -> Iterator[Tuple[int, int]]:
+        """Yield (end_position, pattern_id) for every occurrence, overlaps included."""
+        goto, fail, out = self._goto, self._fail, self._out
+        node = 0
+        for pos, ch in enumerate(text):
+            while node and ch not in goto[node]:
+                node = fail[node]
+            node = goto[node].get(ch, 0)
+            for pattern_id in out[node]:
+                yield pos, pattern_id
+
+    def matched_ids(self, text: str) -> List[int]:
+        """Distinct pattern ids found in the text, in pattern (dictionary) order."""
+        return sorted({pattern_id for _, pattern_id in self.iter_matches(text)})
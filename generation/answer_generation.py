@@ -1,9 +1,30 @@
 # generation/answer_generation.py
 
-from generation.llm_builder import LLMBuilder
-from generation.prompt_builder import build_rag_prompt
+import asyncio
+from typing import Dict, List, NamedTuple
+
+from config.collections import DEFAULT_COLLECTION
+from config.settings import settings
+from generation.llm_builder import ERROR_PREFIXES, LLMBuilder
+from generation.context_compressor import ContextCompressor
+from generation.context_packer import MESSAGE_OVERHEAD_TOKENS, ContextPacker, PackedPrompt
+from generation.conversation_cache import ConversationCache, Turn
+from generation.extractive_answer import ExtractiveAnswerer
+from generation.model_router import AUTO_MODEL, ModelRouter
+from generation.prompt_builder import SYSTEM_PROMPT
 from retrieval.retrieval_pipeline import RetrievalPipeline
 
+NO_CONTEXT_ANSWER = "No relevant information found in the selected scope."
+
+
+class PreparedAnswer(NamedTuple):
+    """Everything decided before the LLM call."""
+    query: str
+    packed: PackedPrompt
+    model_name: str
+    sources: List[Dict]
+
+
 class AnswerGenerator:
     def __init__(self, faiss_index_path="data/faiss_index.bin", top_k=10):
         # Set top_k to 10 to maximize Hit Rate
@@ -12,40 +33,218 @@ class AnswerGenerator:
             top_k=top_k
         )
         self.llm = LLMBuilder() 
+        compressor = None
+        if settings.context_compression:
+            # Sentences are embedded with the retrieval model, in the query vector's space
+            compressor = ContextCompressor(self.retrieval_pipeline.embedder.embedder)
+        self.packer = ContextPacker(compressor=compressor)
+        # Turns already sent per chat session, resent verbatim so Ollama can reuse their KV cache
+        self.conversations = ConversationCache()
+        self.extractive = ExtractiveAnswerer()
+        self.router = ModelRouter()
     
-    def generate_answer(self, query: str, model_name: str = "qwen2.5:3b", target_document: str = None):
-        print(f"\n🔍 Query: {query} | Model: {model_name} | Doc: {target_document}\n")
-        
-        retrieval_result = self.retrieval_pipeline.retriever.search(
-            self.retrieval_pipeline.embedder.embed(query), 
+    def retrieve(self, query: str, target_document: str = None, collection: str = DEFAULT_COLLECTION):
+        """Reranked context chunks for the query."""
+        if settings.multi_query:
+            return self.retrieval_pipeline.run(
+                query, target_document=target_document, collection=collection, multi_query=True
+            )["retrieved_chunks"]
+
+        retriever = self.retrieval_pipeline.get_retriever(collection)
+        query_vec, query_sparse = self.retrieval_pipeline.embedder.embed_for_search(query)
+        return retriever.search(
+            query_vec, 
             query,
-            target_document=target_document
+            target_document=target_document,
+            query_sparse=query_sparse
         )
-        
-        if not retrieval_result:
-            return {
-                "query": query,
-                "answer": "No relevant information found in the selected scope.",
-                "sources": []
+
+    @staticmethod
+    def _sources(passages):
+        # One source per prompt passage, so "Document n" is sources[n - 1]
+        return [
+            {
+                "document": passage["document_name"],
+                "chunk_id": passage["chunk_id"],
+                "chunk_ids": passage.get("chunk_ids", [passage["chunk_id"]]),
+                "page_or_section": passage.get("page_or_section", "N/A")
             }
-        
+            for passage in passages
+        ]
+
+    def _pack(self, query: str, retrieval_result, session_id: str = None):
+        query_vec = None
+        if self.packer.compressor is not None:
+            # Already computed (and cached) by retrieval
+            query_vec = self.retrieval_pipeline.embedder.embed(query)
+        packed = self.packer.pack(
+            query, retrieval_result, query_vec=query_vec, history=self.conversations.history(session_id)
+        )
+        print(f"🧠 Packed {len(retrieval_result)} chunks into {len(packed.passages)} passages "
+              f"({packed.prompt_tokens} prompt tokens incl. {len(packed.history)} earlier turns, "
+              f"num_ctx {packed.num_ctx})")
+        return packed
+
+    def remember(self, session_id: str, packed, answer: str):
+        """Record a generated turn, to be resent exactly as sent before the session's next question."""
+        # A failed generation (the stream may end in an error) is not part of the conversation
+        if not session_id or any(prefix in answer for prefix in ERROR_PREFIXES):
+            return
+        tokens = packed.message_tokens + self.packer.counter.count(answer) + MESSAGE_OVERHEAD_TOKENS
+        self.conversations.append(session_id, Turn(packed.message, answer, tokens), sent=len(packed.history))
+
+    def _resolve_model(self, model_name: str, query: str, retrieval_result, packed) -> str:
+        """The model to generate with; "auto" is routed on the query, reranker confidence and context size."""
+        if model_name != AUTO_MODEL:
+            return model_name
+        model_name, reason = self.router.route(query, retrieval_result, packed.message_tokens)
+        print(f"🔀 Routed to {model_name} ({reason})")
+        return model_name
+
+    def _generation_kwargs(self, prepared: PreparedAnswer) -> dict:
+        return {
+            "model_name": prepared.model_name,
+            "num_ctx": prepared.packed.num_ctx,
+            "system": SYSTEM_PROMPT,
+            "history": prepared.packed.history
+        }
+
+    def _extractive_answer(self, query: str, retrieval_result, extractive: bool = None):
+        """
+        The extractive fast-path result (flagged "extractive") when enabled and confident, else None.
+        extractive=None follows settings.extractive_fast_path; False forces the LLM answer.
+        """
+        if not (settings.extractive_fast_path if extractive is None else extractive):
+            return None
+        fast = self.extractive.answer(query, retrieval_result)
+        if fast is None:
+            return None
+        print(f"⚡ Extractive answer (confidence {fast['confidence']}), skipping the LLM")
+        return {
+            "query": query,
+            "answer": fast["answer"],
+            "sources": self._sources([fast["chunk"]]),
+            "extractive": True,
+            "highlight": fast["highlight"],
+            "confidence": fast["confidence"]
+        }
+
+    def _prepare(self, query: str, model_name: str, target_document: str, collection: str,
+                 session_id: str, extractive: bool, stream: bool = False):
+        """
+        The steps shared by every answer variant: retrieval, the no-context and
+        extractive answers, packing and model routing. Returns (result, None) when
+        the answer is already known without the LLM, else (None, PreparedAnswer).
+        CPU-bound throughout, so the async variants run it in a worker thread.
+        """
+        label = "Query (stream)" if stream else "Query"
+        print(f"\n🔍 {label}: {query} | Model: {model_name} | Doc: {target_document} | Collection: {collection}\n")
+
+        retrieval_result = self.retrieve(query, target_document=target_document, collection=collection)
+        if not retrieval_result:
+            return {"query": query, "answer": NO_CONTEXT_ANSWER, "sources": []}, None
         print(f"✅ Retrieved {len(retrieval_result)} chunks for context.")
-        
-        print("🧠 Building prompt...")
-        prompt = build_rag_prompt(query, retrieval_result)
-        
+
+        fast = self._extractive_answer(query, retrieval_result, extractive)
+        if fast is not None:
+            return fast, None
+
+        packed = self._pack(query, retrieval_result, session_id)
+        model_name = self._resolve_model(model_name, query, retrieval_result, packed)
         print(f"🤖 Generating answer with {model_name}...\n")
-        answer = self.llm.generate(prompt, model_name=model_name)
-        
+        return None, PreparedAnswer(query, packed, model_name, self._sources(packed.passages))
+
+    def _finish(self, session_id: str, prepared: PreparedAnswer, answer: str) -> dict:
+        self.remember(session_id, prepared.packed, answer)
         return {
-            "query": query,
+            "query": prepared.query,
             "answer": answer,
-            "sources": [
-                {
-                    "document": chunk["document_name"],
-                    "chunk_id": chunk["chunk_id"],
-                    "page_or_section": chunk.get("page_or_section", "N/A")
-                }
-                for chunk in retrieval_result
-            ]
-        }
\ No newline at end of file
+            "sources": prepared.sources,
+            "model": prepared.model_name
+        }
+
+    @staticmethod
+    def _done(result: dict) -> dict:
+        return {key: value for key, value in result.items() if key != "query"}
+
+    @classmethod
+    def _events(cls, result: dict) -> list:
+        """Stream events of an answer that is complete before streaming starts."""
+        return [
+            ("sources", {"sources": result["sources"]}),
+            ("token", {"text": result["answer"]}),
+            ("done", cls._done(result)),
+        ]
+
+    def generate_answer(self, query: str, model_name: str = "qwen2.5:3b", target_document: str = None,
+                        collection: str = DEFAULT_COLLECTION, session_id: str = None,
+                        extractive: bool = None):
+        result, prepared = self._prepare(query, model_name, target_document, collection, session_id, extractive)
+        if result is not None:
+            return result
+
+        answer = self.llm.generate(prepared.packed.message, **self._generation_kwargs(prepared))
+        return self._finish(session_id, prepared, answer)
+
+    def stream_answer(self, query: str, model_name: str = "qwen2.5:3b", target_document: str = None,
+                      collection: str = DEFAULT_COLLECTION, session_id: str = None,
+                      extractive: bool = None):
+        """
+        Streaming generate_answer: yields ("sources", {...}) as soon as retrieval is done,
+        then ("token", {"text": ...}) as the LLM produces them, and finally ("done", {"answer": ...}).
+        An extractive fast-path answer is sent as a single token; its "done" carries "extractive": True.
+        """
+        result, prepared = self._prepare(
+            query, model_name, target_document, collection, session_id, extractive, stream=True
+        )
+        if result is not None:
+            yield from self._events(result)
+            return
+
+        yield "sources", {"sources": prepared.sources}
+        parts = []
+        for text in self.llm.generate_stream(prepared.packed.message, **self._generation_kwargs(prepared)):
+            parts.append(text)
+            yield "token", {"text": text}
+
+        result = self._finish(session_id, prepared, "".join(parts))
+        yield "done", self._done(result)
+
+    async def agenerate_answer(self, query: str, model_name: str = "qwen2.5:3b", target_document: str = None,
+                               collection: str = DEFAULT_COLLECTION, session_id: str = None,
+                               extractive: bool = None):
+        """
+        Async generate_answer: retrieval and packing (CPU-bound) run in a worker thread,
+        the LLM call is awaited so no thread is held while the model generates.
+        """
+        result, prepared = await asyncio.to_thread(
+            self._prepare, query, model_name, target_document, collection, session_id, extractive
+        )
+        if result is not None:
+            return result
+
+        answer = await self.llm.agenerate(prepared.packed.message, **self._generation_kwargs(prepared))
+        return self._finish(session_id, prepared, answer)
+
+    async def astream_answer(self, query: str, model_name: str = "qwen2.5:3b", target_document: str = None,
+                             collection: str = DEFAULT_COLLECTION, session_id: str = None,
+                             extractive: bool = None):
+        """
+        Async stream_answer (same events).
+        """
+        result, prepared = await asyncio.to_thread(
+            self._prepare, query, model_name, target_document, collection, session_id, extractive, True
+        )
+        if result is not None:
+            for event in self._events(result):
+                yield event
+            return
+
+        yield "sources", {"sources": prepared.sources}
+        parts = []
+        async for text in self.llm.agenerate_stream(prepared.packed.message, **self._generation_kwargs(prepared)):
+            parts.append(text)
+            yield "token", {"text": text}
+
+        result = self._finish(session_id, prepared, "".join(parts))
+        yield "done", self._done(result)
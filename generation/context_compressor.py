@@ -0,0 +1,92 @@
+# generation/context_compressor.py
+
+import hashlib
+import re
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+
+from config.settings import settings
+from retrieval.lru_cache import LRUCache
+
+# Sentence ends (Latin and CJK punctuation) and line breaks
+_SENTENCE_END = re.compile(r"(?<=[.!?。？！])\s+|\n+")
+MIN_SENTENCE_CHARS = 20
+GAP_MARKER = " … "
+
+
+def split_sentences(text: str) -> List[str]:
+    """Sentences of a chunk; fragments shorter than MIN_SENTENCE_CHARS stick to the previous one."""
+    sentences = []
+    for part in _SENTENCE_END.split(text):
+        part = part.strip()
+        if not part:
+            continue
+        if sentences and len(part) < MIN_SENTENCE_CHARS:
+            sentences[-1] = f"{sentences[-1]} {part}"
+        else:
+            sentences.append(part)
+    return sentences
+
+
+class ContextCompressor:
+    """
+    Query-focused extractive compression of the packed passages: every sentence
+    is embedded with the retrieval model and scored against the query vector
+    that retrieval already computed; the best sentences (keep_ratio of the text)
+    are kept in their original order, and passages left empty are dropped.
+    Sentence vectors are cached by content, so recurring chunks cost nothing.
+    """
+
+    def __init__(self, embedder, keep_ratio: Optional[float] = None, cache_entries: Optional[int] = None):
+        self.embedder = embedder
+        self.keep_ratio = settings.compression_keep_ratio if keep_ratio is None else keep_ratio
+        cache_entries = settings.compression_cache_entries if cache_entries is None else cache_entries
+        self.cache = LRUCache(cache_entries) if cache_entries > 0 else None
+
+    def _sentence_vectors(self, sentences: List[str]) -> np.ndarray:
+        keys = [(self.embedder.model_id, hashlib.blake2b(s.encode("utf-8"), digest_size=16).hexdigest())
+                for s in sentences]
+        vectors: List[Optional[np.ndarray]] = [None] * len(sentences)
+        if self.cache is not None:
+            vectors = [self.cache.get(key) for key in keys]
+        missing = [i for i, vec in enumerate(vectors) if vec is None]
+        if missing:
+            fresh = np.asarray(self.embedder.embed_texts([sentences[i] for i in missing]), dtype=np.float32)
+            for i, vec in zip(missing, fresh):
+                vectors[i] = vec
+                if self.cache is not None:
+                    self.cache.put(keys[i], vec)
+        return np.vstack(vectors)
+
+    def compress(self, query_vec: np.ndarray, passages: Sequence[Dict]) -> List[Dict]:
+        """Passages (same order, same citation fields) reduced to their query-relevant sentences."""
+        per_passage = [split_sentences(p["chunk_text"]) for p in passages]
+        sentences = [s for group in per_passage for s in group]
+        if not sentences or self.keep_ratio >= 1.0:
+            return list(passages)
+
+        # Vectors are normalized, so the dot product is the cosine similarity
+        scores = self._sentence_vectors(sentences) @ np.asarray(query_vec, dtype=np.float32).ravel()
+        lengths = np.array([len(s) for s in sentences])
+        order = np.argsort(-scores, kind="stable")
+        # Best sentences until keep_ratio of the characters is covered (always at least one)
+        covered = np.cumsum(lengths[order])
+        n_keep = int(np.searchsorted(covered, self.keep_ratio * lengths.sum())) + 1
+        keep = np.zeros(len(sentences), dtype=bool)
+        keep[order[:n_keep]] = True
+
+        compressed, offset = [], 0
+        for passage, group in zip(passages, per_passage):
+            kept = keep[offset:offset + len(group)]
+            offset += len(group)
+            if not kept.any():
+                continue
+            parts, previous = [], None
+            for i in np.flatnonzero(kept):
+                if previous is not None:
+                    parts.append(" " if i == previous + 1 else GAP_MARKER)
+                parts.append(group[i])
+                previous = i
+            compressed.append({**passage, "chunk_text": "".join(parts)})
+        return compressed
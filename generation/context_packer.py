@@ -0,0 +1,185 @@
+# generation/context_packer.py
+
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from config.settings import settings
+from generation.conversation_cache import Turn
+from generation.prompt_builder import SYSTEM_PROMPT, build_context_message, build_rag_prompt
+
+# Chunks are cut with a 200-char overlap (indexing/text_chunker.py); shorter matches are coincidence
+MIN_OVERLAP_CHARS = 20
+MAX_OVERLAP_CHARS = 300
+# Chat template markers around each message
+MESSAGE_OVERHEAD_TOKENS = 5
+
+
+def _is_hangul(ch: str) -> bool:
+    return "가" <= ch <= "힣"
+
+
+class TokenCounter:
+    """
+    Token counts for prompt budgeting, with the LLM's own tokenizer when it can
+    be loaded (settings.context_tokenizer) and a conservative estimate otherwise.
+    """
+
+    def __init__(self, tokenizer_name: Optional[str] = None):
+        self.tokenizer = None
+        tokenizer_name = settings.context_tokenizer if tokenizer_name is None else tokenizer_name
+        if tokenizer_name:
+            try:
+                from transformers import AutoTokenizer
+                self.tokenizer = AutoTokenizer.from_pretrained(tokenizer_name)
+            except Exception as e:
+                print(f"⚠️ Could not load tokenizer {tokenizer_name!r} ({e}); estimating token counts")
+
+    def count(self, text: str) -> int:
+        if self.tokenizer is not None:
+            return len(self.tokenizer(text, add_special_tokens=False)["input_ids"])
+        # Roughly one token per Hangul syllable and per ~3.5 other characters
+        hangul = sum(1 for ch in text if _is_hangul(ch))
+        return hangul + int((len(text) - hangul) / 3.5) + 1
+
+
+def _overlap(left: str, right: str) -> int:
+    """Length of the longest suffix of left that is a prefix of right (0 below MIN_OVERLAP_CHARS)."""
+    for size in range(min(len(left), len(right), MAX_OVERLAP_CHARS), MIN_OVERLAP_CHARS - 1, -1):
+        if left.endswith(right[:size]):
+            return size
+    return 0
+
+
+def merge_adjacent_chunks(chunks: Sequence[Dict]) -> List[Dict]:
+    """
+    Merge chunks of the same document page that are adjacent (consecutive vector ids)
+    or overlap in text into one passage, so overlapping text is sent to the LLM once.
+    A passage keeps the best member score and lists its members' chunk ids.
+    """
+    groups: Dict[tuple, List[Dict]] = {}
+    for chunk in chunks:
+        groups.setdefault((chunk["document_name"], chunk.get("page_or_section")), []).append(chunk)
+
+    passages = []
+    for members in groups.values():
+        members = sorted(members, key=lambda c: c.get("vector_id", 0))
+        current = None
+        for chunk in members:
+            text = chunk["chunk_text"]
+            if current is not None:
+                overlap = _overlap(current["chunk_text"], text)
+                adjacent = chunk.get("vector_id") == current["_last_vector_id"] + 1
+                if overlap or adjacent:
+                    joiner = "" if overlap else "\n"
+                    current["chunk_text"] += joiner + text[overlap:]
+                    current["chunk_ids"].append(chunk["chunk_id"])
+                    current["_last_vector_id"] = chunk.get("vector_id", -2)
+                    if chunk.get("score", 0.0) > current.get("score", 0.0):
+                        current["score"], current["chunk_id"] = chunk["score"], chunk["chunk_id"]
+                    continue
+                passages.append(current)
+            current = {**chunk, "chunk_ids": [chunk["chunk_id"]], "_last_vector_id": chunk.get("vector_id", -2)}
+        if current is not None:
+            passages.append(current)
+
+    for passage in passages:
+        del passage["_last_vector_id"]
+    return passages
+
+
+def _passage_order(passage: Dict) -> tuple:
+    # Best score first; ties broken by position so equal inputs always give the same prompt
+    return (-passage.get("score", 0.0), passage["document_name"], str(passage.get("page_or_section") or ""),
+            passage.get("vector_id", 0))
+
+
+@dataclass
+class PackedPrompt:
+    prompt: str  # system prompt + message as one string
+    passages: List[Dict]  # in prompt order ("Document 1" first)
+    prompt_tokens: int  # everything sent: system prompt, history and message
+    num_ctx: int
+    message: str = ""  # the new user turn (context + question), sent after SYSTEM_PROMPT
+    message_tokens: int = 0
+    history: List[Tuple[str, str]] = field(default_factory=list)  # earlier (user message, answer) turns sent
+
+
+class ContextPacker:
+    """
+    Builds the RAG prompt under a token budget: adjacent/overlapping chunks are
+    merged, optionally compressed to their query-relevant sentences
+    (generation/context_compressor.py), then added best rerank score first
+    while they fit in context_token_budget, and num_ctx is the smallest of
+    llm_num_ctx_buckets that holds the prompt plus the answer. The default is a
+    single bucket, since Ollama reloads the model whenever num_ctx changes,
+    which also drops its KV cache.
+    Earlier turns of the session go before the new one unchanged when they all
+    fit in the bucket the new turn needs (a follow-up never changes num_ctx);
+    otherwise none are sent, since dropping only the oldest would change the
+    prefix Ollama has cached on every following request.
+    """
+
+    def __init__(self, token_budget: Optional[int] = None, num_ctx_buckets: Optional[Sequence[int]] = None,
+                 counter: Optional[TokenCounter] = None, compressor=None):
+        self.token_budget = settings.context_token_budget if token_budget is None else token_budget
+        self.num_ctx_buckets = sorted(num_ctx_buckets or settings.llm_num_ctx_buckets)
+        self.counter = counter if counter is not None else TokenCounter()
+        self.compressor = compressor
+        self.system_tokens = self.counter.count(SYSTEM_PROMPT) + MESSAGE_OVERHEAD_TOKENS
+
+    def _passage_tokens(self, passage: Dict) -> int:
+        # Header lines ("--- Document n ---", Source, Section) cost a few tokens each
+        return self.counter.count(passage["chunk_text"]) + 16
+
+    def _truncate(self, passage: Dict, budget: int) -> Dict:
+        text = passage["chunk_text"]
+        tokens = self._passage_tokens(passage)
+        keep = max(0, int(len(text) * budget / tokens))
+        return {**passage, "chunk_text": text[:keep]}
+
+    def num_ctx_for(self, prompt_tokens: int, max_tokens: int) -> int:
+        needed = prompt_tokens + max_tokens
+        for bucket in self.num_ctx_buckets:
+            if bucket >= needed:
+                return bucket
+        return self.num_ctx_buckets[-1]
+
+    def pack(self, query: str, chunks: Sequence[Dict], max_tokens: int = 500,
+             query_vec: Optional[np.ndarray] = None, compress: Optional[bool] = None,
+             history: Sequence[Turn] = ()) -> PackedPrompt:
+        passages = sorted(merge_adjacent_chunks(chunks), key=_passage_order)
+        if compress is None:
+            compress = self.compressor is not None
+        if compress and query_vec is not None:
+            passages = self.compressor.compress(query_vec, passages)
+
+        selected, used = [], 0
+        for passage in passages:
+            tokens = self._passage_tokens(passage)
+            if used + tokens <= self.token_budget:
+                selected.append(passage)
+                used += tokens
+            elif not selected:
+                # Even the best passage alone is over budget: keep its beginning
+                selected.append(self._truncate(passage, self.token_budget))
+                used = self.token_budget
+
+        message = build_context_message(query, selected)
+        message_tokens = self.counter.count(message) + MESSAGE_OVERHEAD_TOKENS
+
+        # History only fills the bucket the new turn needs anyway: moving to a larger
+        # num_ctx would make Ollama reload the model. All earlier turns or none, so the
+        # request still starts with the previous one (the conversation cache restarts from here).
+        num_ctx = self.num_ctx_for(self.system_tokens + message_tokens, max_tokens)
+        history = list(history)
+        if sum(turn.tokens for turn in history) > num_ctx - max_tokens - self.system_tokens - message_tokens:
+            history = []
+
+        prompt_tokens = self.system_tokens + sum(turn.tokens for turn in history) + message_tokens
+        return PackedPrompt(
+            build_rag_prompt(query, selected), selected, prompt_tokens, num_ctx,
+            message=message, message_tokens=message_tokens,
+            history=[(turn.user_message, turn.answer) for turn in history]
+        )
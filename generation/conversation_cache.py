@@ -0,0 +1,75 @@
+# generation/conversation_cache.py
+
+import threading
+from typing import List, NamedTuple, Optional
+
+from config.settings import settings
+from retrieval.lru_cache import LRUCache
+
+
+class Turn(NamedTuple):
+    user_message: str  # exactly as sent (context + question), not the bare query
+    answer: str
+    tokens: int  # user_message + answer, with chat template overhead
+
+
+class ConversationCache:
+    """
+    The turns of each session exactly as they were sent to the LLM. A follow-up
+    is sent as [system, earlier turns..., new turn], so when the previous request
+    of the session was [system, earlier turns..., previous turn], everything up
+    to the new turn is a byte-identical prefix and Ollama reuses its KV cache.
+
+    A sliding window would break that prefix on every request once full, so the
+    window restarts instead: after a turn sent without its earlier turns (they
+    did not fit num_ctx) or one that would exceed max_turns, only that turn is
+    kept. The prefix is then lost once per restart, not on every follow-up.
+    Holds the max_sessions most recently used sessions.
+    """
+
+    def __init__(self, max_sessions: Optional[int] = None, max_turns: Optional[int] = None):
+        self.max_turns = settings.llm_history_turns if max_turns is None else max_turns
+        max_sessions = settings.llm_history_sessions if max_sessions is None else max_sessions
+        self.sessions = LRUCache(max_sessions)
+        self._lock = threading.Lock()
+        self.requests = 0
+        self.follow_ups = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_turns > 0 and self.sessions.max_entries > 0
+
+    def history(self, session_id: Optional[str]) -> List[Turn]:
+        if not session_id or not self.enabled:
+            return []
+        turns = list(self.sessions.get(session_id, ()))
+        with self._lock:
+            self.requests += 1
+            self.follow_ups += bool(turns)
+        return turns
+
+    def append(self, session_id: Optional[str], turn: Turn, sent: int):
+        """Record turn, which was sent after the session's last `sent` turns."""
+        if not session_id or not self.enabled:
+            return
+        with self._lock:
+            turns = tuple(self.sessions.get(session_id, ()))
+            turns = (turns[-sent:] if sent else ()) + (turn,)
+            if len(turns) > self.max_turns:
+                turns = (turn,)
+            self.sessions.put(session_id, turns)
+
+    def clear(self, session_id: str):
+        with self._lock:
+            self.sessions.put(session_id, ())
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "enabled": self.enabled,
+                "sessions": len(self.sessions),
+                "max_sessions": self.sessions.max_entries,
+                "max_turns": self.max_turns,
+                "requests": self.requests,
+                "follow_ups": self.follow_ups,
+            }
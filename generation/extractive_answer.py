@@ -0,0 +1,83 @@
+# generation/extractive_answer.py
+
+import re
+from typing import Dict, List, Optional, Sequence
+
+from config.settings import settings
+from generation.context_compressor import split_sentences
+
+# Questions that ask for an explanation, not a fact quoted from one place
+_NON_FACTOID = re.compile(
+    r"\b(why|how (?:do|does|did|can|could|should|would|will|to)|explain|describe|compare|summari[sz]e|discuss"
+    r"|differences?|challenges|impacts?)\b"
+    r"|설명|왜|어떻게|비교|요약|차이|과제|영향|방안",
+    re.IGNORECASE
+)
+_NON_WORD = re.compile(r"[\W_]+", re.UNICODE)
+
+
+def is_factoid_question(query: str) -> bool:
+    """No cue that the question asks for an explanation, comparison or summary."""
+    return not _NON_FACTOID.search(query)
+
+
+def _bigrams(text: str) -> set:
+    # Character bigrams match Korean stems through particles ("송전망의" ~ "송전망")
+    text = _NON_WORD.sub(" ", text.lower())
+    return {text[i:i + 2] for i in range(len(text) - 1) if " " not in text[i:i + 2]}
+
+
+class ExtractiveAnswerer:
+    """
+    Fast path for factoid lookups: when the best reranked chunk is both confidently
+    relevant (reranker score) and clearly ahead of the runner-up,
+    answer with its best-matching sentence instead of waiting on the LLM.
+    Thresholds are tuned with evaluation/extractive_thresholds.py.
+    """
+
+    def __init__(self, min_confidence: Optional[float] = None, min_margin: Optional[float] = None,
+                 max_query_chars: Optional[int] = None):
+        self.min_confidence = settings.extractive_min_confidence if min_confidence is None else min_confidence
+        self.min_margin = settings.extractive_min_margin if min_margin is None else min_margin
+        self.max_query_chars = settings.extractive_max_query_chars if max_query_chars is None else max_query_chars
+
+    def is_factoid(self, query: str) -> bool:
+        return len(query.strip()) <= self.max_query_chars and is_factoid_question(query)
+
+    @staticmethod
+    def confidence(chunks: Sequence[Dict]) -> tuple:
+        """(confidence of the best chunk, its margin over the second), both in [0, 1]."""
+        if not chunks:
+            return 0.0, 0.0
+        # Reranker scores are already sigmoid probabilities
+        best = float(chunks[0]["score"])
+        runner_up = float(chunks[1]["score"]) if len(chunks) > 1 else 0.0
+        return best, best - runner_up
+
+    @staticmethod
+    def snippet(query: str, text: str) -> tuple:
+        """(best sentence with its neighbours, [start, end] of the best sentence in it)."""
+        sentences = split_sentences(text) or [text.strip()]
+        query_grams = _bigrams(query)
+        overlap: List[float] = [len(query_grams & _bigrams(s)) / (len(query_grams) or 1) for s in sentences]
+        best = max(range(len(sentences)), key=overlap.__getitem__)
+
+        before = sentences[best - 1] + " " if best > 0 else ""
+        after = " " + sentences[best + 1] if best + 1 < len(sentences) else ""
+        start = len(before)
+        return f"{before}{sentences[best]}{after}", [start, start + len(sentences[best])]
+
+    def answer(self, query: str, chunks: Sequence[Dict]) -> Optional[Dict]:
+        """
+        {"answer", "highlight", "confidence", "chunk"} when the fast path applies, else None.
+        "highlight" is the [start, end) character range of the answering sentence.
+        """
+        if not chunks or not self.is_factoid(query):
+            return None
+        confidence, margin = self.confidence(chunks)
+        if confidence < self.min_confidence or margin < self.min_margin:
+            return None
+
+        top = chunks[0]
+        quote, highlight = self.snippet(query, top["chunk_text"])
+        return {"answer": quote, "highlight": highlight, "confidence": round(confidence, 4), "chunk": top}
@@ -1,43 +1,227 @@
 # generation/llm_builder.py
 
+import asyncio
+import threading
 import requests
+import httpx
 import json
+from typing import AsyncIterator, Iterator, Optional, Sequence, Tuple
+
+from config.settings import settings
+
+# Answers that are error messages rather than model output
+ERROR_PREFIXES = ("Error connecting to Ollama", "Error from Ollama")
 
 class LLMBuilder:
+    """
+    Ollama client (chat API).
+    Sync calls share a requests.Session and async calls share an httpx.AsyncClient,
+    so connections are kept alive and pooled instead of opened per answer.
+
+    Requests are laid out for Ollama's prefix (KV) cache: the static system prompt
+    first, then the session's earlier turns exactly as they were sent, then the new
+    turn, so only the new turn has to be prefilled. stats() reports the prefill
+    Ollama actually did (prompt_eval_count excludes cached tokens).
+    """
+
     def __init__(self, model_name="qwen2.5:3b", base_url="http://localhost:11434"):
         self.model_name = model_name
         self.base_url = base_url
-        self.api_endpoint = f"{base_url}/api/generate"
-    
-    def generate(self, prompt: str, model_name: str = None, max_tokens=500) -> str:
-        """
-        Generate answer using Ollama
-        """
-        target_model = model_name if model_name else self.model_name
+        self.api_endpoint = f"{base_url}/api/chat"
+        self.session = requests.Session()
+        self._async_client = None
+        self._async_loop = None
+        self._stats_lock = threading.Lock()
+        self._stats = {"requests": 0, "prefill_tokens": 0, "prefill_ms": 0.0}
 
-        payload = {
-            "model": target_model,
-            "prompt": prompt,
-            "stream": False,
-            "keep_alive": "60m", 
+    @staticmethod
+    def _messages(prompt: str, system: Optional[str], history: Sequence[Tuple[str, str]]) -> list:
+        messages = [{"role": "system", "content": system}] if system else []
+        for user_message, answer in history:
+            messages.append({"role": "user", "content": user_message})
+            messages.append({"role": "assistant", "content": answer})
+        messages.append({"role": "user", "content": prompt})
+        return messages
+
+    def _payload(self, prompt: str, model_name: str, max_tokens: int, stream: bool, num_ctx: int = 2048,
+                 system: Optional[str] = None, history: Sequence[Tuple[str, str]] = ()) -> dict:
+        return {
+            "model": model_name if model_name else self.model_name,
+            "messages": self._messages(prompt, system, history),
+            "stream": stream,
+            "keep_alive": "60m",
             "options": {
                 "num_predict": max_tokens,
                 "temperature": 0.7,
-                # OPTIMIZATION: Reduced context window to 2048 to prevent RAM swapping
-                "num_ctx": 2048 
+                # Sized to the packed prompt (generation/context_packer.py); 2048 by default
+                # to prevent RAM swapping
+                "num_ctx": num_ctx
             }
         }
-        
+
+    def _record(self, result: dict):
+        # Ollama omits prompt_eval_count when the whole prompt was cached
+        with self._stats_lock:
+            self._stats["requests"] += 1
+            self._stats["prefill_tokens"] += result.get("prompt_eval_count", 0)
+            self._stats["prefill_ms"] += result.get("prompt_eval_duration", 0) / 1e6
+
+    def stats(self) -> dict:
+        with self._stats_lock:
+            n = self._stats["requests"]
+            return {
+                "requests": n,
+                "prefill_tokens": self._stats["prefill_tokens"],
+                "mean_prefill_tokens": self._stats["prefill_tokens"] / n if n else 0.0,
+                "mean_prefill_ms": self._stats["prefill_ms"] / n if n else 0.0,
+            }
+
+    @staticmethod
+    def _answer(result: dict) -> str:
+        return result.get("message", {}).get("content", "")
+
+    @property
+    def async_client(self) -> httpx.AsyncClient:
+        # A client is bound to the event loop that created it
+        loop = asyncio.get_running_loop()
+        if self._async_client is None or self._async_loop is not loop:
+            self._async_client = httpx.AsyncClient(
+                base_url=self.base_url,
+                # The read timeout applies between chunks, not to the whole answer
+                timeout=httpx.Timeout(120.0, connect=10.0),
+                limits=httpx.Limits(
+                    max_connections=settings.llm_max_connections,
+                    max_keepalive_connections=settings.llm_max_connections
+                )
+            )
+            self._async_loop = loop
+        return self._async_client
+
+    async def aclose(self):
+        if self._async_client is not None:
+            await self._async_client.aclose()
+            self._async_client = None
+        self.session.close()
+
+    def generate(self, prompt: str, model_name: str = None, max_tokens=500, num_ctx: int = 2048,
+                 system: str = None, history: Sequence[Tuple[str, str]] = ()) -> str:
+        """
+        Generate answer using Ollama.
+        history: earlier (user message, answer) turns of the conversation, oldest first.
+        """
+        payload = self._payload(prompt, model_name, max_tokens, stream=False, num_ctx=num_ctx,
+                                system=system, history=history)
+
         try:
-            response = requests.post(
+            response = self.session.post(
                 self.api_endpoint,
                 json=payload,
                 timeout=120
             )
             response.raise_for_status()
-            
+
             result = response.json()
-            return result.get("response", "No response generated")
-            
+            self._record(result)
+            return self._answer(result) or "No response generated"
+
         except requests.exceptions.RequestException as e:
-            return f"Error connecting to Ollama: {str(e)}"
\ No newline at end of file
+            return f"Error connecting to Ollama: {str(e)}"
+
+    def generate_with_stats(self, prompt: str, model_name: str = None, max_tokens=500, num_ctx: int = 2048,
+                            system: str = None, history: Sequence[Tuple[str, str]] = ()):
+        """
+        (answer, Ollama timings) for benchmarks; prompt evaluation is the prefill
+        (prompt_tokens counts only the tokens that were not served from the KV cache).
+        Raises on connection errors instead of returning an error message.
+        """
+        payload = self._payload(prompt, model_name, max_tokens, stream=False, num_ctx=num_ctx,
+                                system=system, history=history)
+        response = self.session.post(self.api_endpoint, json=payload, timeout=120)
+        response.raise_for_status()
+        result = response.json()
+        self._record(result)
+        return self._answer(result), {
+            "prompt_tokens": result.get("prompt_eval_count", 0),
+            "prefill_ms": result.get("prompt_eval_duration", 0) / 1e6,
+            "answer_tokens": result.get("eval_count", 0),
+            "decode_ms": result.get("eval_duration", 0) / 1e6,
+            "total_ms": result.get("total_duration", 0) / 1e6,
+            # Non-trivial when the request (re)loaded the model, e.g. because num_ctx changed
+            "load_ms": result.get("load_duration", 0) / 1e6,
+        }
+
+    def generate_stream(self, prompt: str, model_name: str = None, max_tokens=500, num_ctx: int = 2048,
+                        system: str = None, history: Sequence[Tuple[str, str]] = ()) -> Iterator[str]:
+        """
+        Stream the answer from Ollama piece by piece as it is generated
+        (Ollama sends one JSON object per line until "done").
+        """
+        payload = self._payload(prompt, model_name, max_tokens, stream=True, num_ctx=num_ctx,
+                                system=system, history=history)
+
+        try:
+            # The read timeout applies between chunks, not to the whole answer
+            with self.session.post(self.api_endpoint, json=payload, stream=True, timeout=120) as response:
+                response.raise_for_status()
+                for line in response.iter_lines():
+                    if not line:
+                        continue
+                    chunk = json.loads(line)
+                    if chunk.get("error"):
+                        yield f"Error from Ollama: {chunk['error']}"
+                        return
+                    text = self._answer(chunk)
+                    if text:
+                        yield text
+                    if chunk.get("done"):
+                        self._record(chunk)
+                        return
+
+        except requests.exceptions.RequestException as e:
+            yield f"Error connecting to Ollama: {str(e)}"
+
+    async def agenerate(self, prompt: str, model_name: str = None, max_tokens=500, num_ctx: int = 2048,
+                        system: str = None, history: Sequence[Tuple[str, str]] = ()) -> str:
+        """
+        Async generate(): waits on Ollama without holding a worker thread.
+        """
+        payload = self._payload(prompt, model_name, max_tokens, stream=False, num_ctx=num_ctx,
+                                system=system, history=history)
+
+        try:
+            response = await self.async_client.post("/api/chat", json=payload)
+            response.raise_for_status()
+            result = response.json()
+            self._record(result)
+            return self._answer(result) or "No response generated"
+
+        except httpx.HTTPError as e:
+            return f"Error connecting to Ollama: {str(e)}"
+
+    async def agenerate_stream(self, prompt: str, model_name: str = None, max_tokens=500, num_ctx: int = 2048,
+                               system: str = None, history: Sequence[Tuple[str, str]] = ()) -> AsyncIterator[str]:
+        """
+        Async generate_stream().
+        """
+        payload = self._payload(prompt, model_name, max_tokens, stream=True, num_ctx=num_ctx,
+                                system=system, history=history)
+
+        try:
+            async with self.async_client.stream("POST", "/api/chat", json=payload) as response:
+                response.raise_for_status()
+                async for line in response.aiter_lines():
+                    if not line:
+                        continue
+                    chunk = json.loads(line)
+                    if chunk.get("error"):
+                        yield f"Error from Ollama: {chunk['error']}"
+                        return
+                    text = self._answer(chunk)
+                    if text:
+                        yield text
+                    if chunk.get("done"):
+                        self._record(chunk)
+                        return
+
+        except httpx.HTTPError as e:
+            yield f"Error connecting to Ollama: {str(e)}"
@@ -0,0 +1,67 @@
+# generation/model_router.py
+
+import threading
+from collections import Counter
+from typing import Dict, Optional, Sequence, Tuple
+
+from config.settings import settings
+from generation.extractive_answer import ExtractiveAnswerer, is_factoid_question
+
+AUTO_MODEL = "auto"
+
+
+class ModelRouter:
+    """
+    Picks the LLM for model="auto" from signals that are free once the prompt is
+    packed: the small model answers short factoid questions whose best chunk the
+    reranker is confident about and whose packed context is small (a few
+    passages, not a full context_token_budget); everything else goes to the
+    large model. Check the routing with evaluation/routing_eval.py.
+    """
+
+    def __init__(self, small_model: Optional[str] = None, large_model: Optional[str] = None,
+                 max_query_chars: Optional[int] = None, min_confidence: Optional[float] = None,
+                 max_context_tokens: Optional[int] = None):
+        self.small_model = small_model or settings.router_small_model
+        self.large_model = large_model or settings.router_large_model
+        self.max_query_chars = settings.router_max_query_chars if max_query_chars is None else max_query_chars
+        self.min_confidence = settings.router_min_confidence if min_confidence is None else min_confidence
+        self.max_context_tokens = (
+            settings.router_max_context_tokens if max_context_tokens is None else max_context_tokens
+        )
+        self._lock = threading.Lock()
+        self._models: Counter = Counter()
+        self._reasons: Counter = Counter()
+
+    def route(self, query: str, chunks: Sequence[Dict], context_tokens: int) -> Tuple[str, str]:
+        """
+        (model name, reason) for a question, its reranked chunks and the size of its
+        new turn (context + question; the system prompt and history are the same
+        for either model and are not counted).
+        """
+        confidence, _ = ExtractiveAnswerer.confidence(chunks)
+        if len(query.strip()) > self.max_query_chars:
+            model, reason = self.large_model, "long_query"
+        elif not is_factoid_question(query):
+            model, reason = self.large_model, "open_ended"
+        elif confidence < self.min_confidence:
+            model, reason = self.large_model, "low_confidence"
+        elif context_tokens > self.max_context_tokens:
+            model, reason = self.large_model, "large_context"
+        else:
+            model, reason = self.small_model, "simple"
+
+        with self._lock:
+            self._models[model] += 1
+            self._reasons[reason] += 1
+        return model, reason
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "small_model": self.small_model,
+                "large_model": self.large_model,
+                "routed": sum(self._models.values()),
+                "models": dict(self._models),
+                "reasons": dict(self._reasons),
+            }
@@ -1,8 +1,22 @@
 # generation/prompt_builder.py
 
-def build_rag_prompt(query: str, retrieved_chunks: list) -> str:
+# Static instructions, sent first and byte-identical on every request so the
+# LLM server can reuse their KV cache (never put per-query text in here).
+# CHANGED: Added strict language instruction
+SYSTEM_PROMPT = """You are a helpful AI assistant specializing in power grid and energy systems.
+
+Use ONLY the information provided in the context below to answer the question.
+If the context doesn't contain relevant information, say "I don't have enough information in the provided documents to answer this question."
+
+IMPORTANT INSTRUCTIONS:
+1. Be precise and technical.
+2. Cite which document you're referencing (e.g., "According to Document 1...").
+3. **LANGUAGE:** Answer in the SAME language as the user's question. If the question is in Korean, you MUST answer in Korean."""
+
+
+def build_context_message(query: str, retrieved_chunks: list) -> str:
     """
-    Assemble retrieved context into a single prompt for the LLM.
+    The per-query part of the prompt: retrieved context, then the question.
     """
     context = ""
 
@@ -13,23 +27,17 @@ def build_rag_prompt(query: str, retrieved_chunks: list) -> str:
             context += f"Section: {chunk['page_or_section']}\n"
         context += f"Content:\n{chunk['chunk_text']}\n"
 
-    # CHANGED: Added strict language instruction
-    prompt = f"""You are a helpful AI assistant specializing in power grid and energy systems.
-
-Use ONLY the information provided in the context below to answer the question. 
-If the context doesn't contain relevant information, say "I don't have enough information in the provided documents to answer this question."
-
-IMPORTANT INSTRUCTIONS:
-1. Be precise and technical.
-2. Cite which document you're referencing (e.g., "According to Document 1...").
-3. **LANGUAGE:** Answer in the SAME language as the user's question. If the question is in Korean, you MUST answer in Korean.
-
-CONTEXT:
+    return f"""CONTEXT:
 {context}
 
 QUESTION:
 {query}
 
 ANSWER:"""
-    
-    return prompt
\ No newline at end of file
+
+
+def build_rag_prompt(query: str, retrieved_chunks: list) -> str:
+    """
+    Assemble retrieved context into a single prompt for the LLM.
+    """
+    return f"{SYSTEM_PROMPT}\n\n{build_context_message(query, retrieved_chunks)}"
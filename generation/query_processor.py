@@ -1,83 +1,201 @@
 # generation/query_processor.py
 
+import csv
+import json
+import threading
+import time
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from config.collections import PROJECT_ROOT
+from config.settings import settings
+from generation.aho_corasick import AhoCorasick
+
+EXPANSIONS_DIR = PROJECT_ROOT / "config" / "expansions"
+
+
+def load_expansion_file(path: Path) -> Dict[str, str]:
+    """
+    One dictionary file -> {keyword: "expansion terms"}.
+    .json: {"keyword": "terms ..."} (a list of terms is accepted too)
+    .tsv:  keyword<TAB>terms ...   (blank lines and lines starting with # are skipped)
+    """
+    entries = {}
+    if path.suffix == ".json":
+        with open(path, "r", encoding="utf-8") as f:
+            for keyword, expansion in json.load(f).items():
+                if isinstance(expansion, list):
+                    expansion = " ".join(expansion)
+                entries[keyword] = expansion
+    elif path.suffix == ".tsv":
+        with open(path, "r", encoding="utf-8", newline="") as f:
+            for row in csv.reader(f, delimiter="\t"):
+                if not row or not row[0].strip() or row[0].startswith("#"):
+                    continue
+                entries[row[0].strip()] = " ".join(col.strip() for col in row[1:])
+    return entries
+
+
+def _is_hangul(text: str) -> bool:
+    return any("\uac00" <= ch <= "\ud7a3" for ch in text)
+
+
+class _CompiledDictionary:
+    """Keyword automaton plus the expansion terms of each keyword (same order)."""
+
+    def __init__(self, keyword_map: Dict[str, str]):
+        self.keyword_map = keyword_map
+        # Lowercasing the patterns covers both case-insensitive English and exact Korean matches
+        self.keywords = [keyword.lower() for keyword in keyword_map]
+        self.automaton = AhoCorasick(self.keywords)
+        self.expansions: List[List[str]] = [expansion.split() for expansion in keyword_map.values()]
+        # First expansion term in the other language (Korean <-> English), if the entry has one
+        self.translations: List[Optional[str]] = [
+            next((term for term in terms if _is_hangul(term) != _is_hangul(keyword)), None)
+            for keyword, terms in zip(self.keywords, self.expansions)
+        ]
+
+
 class QueryProcessor:
     """
-    Fast dictionary-based query expansion for power grid domain
-    Falls back to LLM only for complex queries
+    Fast dictionary-based query expansion for power grid domain.
+    Bilingual dictionaries live in config/expansions (*.json / *.tsv) and are
+    compiled into an Aho-Corasick automaton, so a query is scanned once no
+    matter how many terms the dictionaries hold.
     """
-    
-    # Comprehensive bilingual expansions
-    KEYWORD_MAP = {
-        # English technical terms
-        "transformer": "변압기 substation voltage equipment insulating oil",
-        "renewable energy": "재생에너지 신재생 solar wind VRE variable",
-        "HVDC": "직류송전 high voltage direct current transmission VSC LCC BTB",
-        "grid": "전력망 송전망 배전망 power system network transmission distribution",
-        "stability": "안정도 frequency voltage control dynamic",
-        "ESS": "에너지저장 energy storage battery BESS",
-        "inverter": "인버터 converter grid-forming grid-following",
-        "transmission": "송전 송전선로 765kV 345kV line tower conductor",
-        "distribution": "배전 DC AC system network",
-        "generator": "발전 발전기 synchronous turbine power plant",
-        "market": "시장 전력시장 SMP CBP electricity trading",
-        "smart grid": "스마트그리드 지능형전력망 automation SCADA",
-        "nuclear": "원자력 nuclear power plant reactor",
-        "coal": "석탄 coal plant thermal",
-        "curtailment": "출력제한 제약 curtailment limitation",
-        
-        # Korean technical terms
-        "재생에너지": "renewable solar wind VRE 태양광 풍력",
-        "전력망": "grid power system 송전망 배전망 transmission",
-        "변압기": "transformer substation 변전소 voltage",
-        "송전": "transmission line 송전선로 765kV 345kV HVDC",
-        "안정도": "stability frequency voltage control 주파수 전압",
-        "에너지저장": "ESS energy storage battery BESS 배터리",
-        "전력시장": "electricity market SMP CBP trading 거래",
-        "한전": "KEPCO KPX 전력거래소 utility",
-        "스마트그리드": "smart grid automation 자동화 SCADA DAS",
-        "제주": "Jeju island 해남 HVDC interconnection",
-        "동기조상기": "synchronous condenser compensator reactive",
-        "출력제한": "curtailment limitation VRE constraint",
-        "전력수급": "electricity supply demand BPLE planning",
-        
-        # Specific entities
-        "KPX": "전력거래소 Korea Power Exchange market operator KEPCO",
-        "KEPCO": "한전 Korea Electric Power utility transmission",
-        "insulating oil": "절연유 transformer oil dielectric",
-        "PyPSA": "power system analysis toolbox optimization",
-        "765kV": "transmission line 송전선로 ultra high voltage",
-        "CBP": "cost-based pool 비용기반풀 market pricing SMP",
-        "SMP": "system marginal price 계통한계가격 market",
-        "EMSC": "전력시장감시위원회 market monitoring surveillance",
-        "SCADA": "supervisory control 감시제어 automation DAS",
-        "VRE": "variable renewable energy 변동성재생에너지 solar wind",
-        "BPLE": "전력수급기본계획 basic plan electricity supply demand",
-    }
-    
-    def __init__(self):
-        pass  # No LLM needed for fast dictionary expansion
-    
+
+    def __init__(self, expansions_dir: Optional[str] = None, reload_interval: Optional[float] = None):
+        self.expansions_dir = Path(expansions_dir or settings.query_expansions_dir or EXPANSIONS_DIR)
+        self.reload_interval = (settings.query_expansions_reload_seconds
+                                if reload_interval is None else reload_interval)
+
+        self._lock = threading.Lock()
+        self._signature = None
+        self._last_check = 0.0
+        self._compiled = _CompiledDictionary({})
+        self.reload()
+
+    @property
+    def keyword_map(self) -> Dict[str, str]:
+        return self._compiled.keyword_map
+
+    def _dictionary_files(self) -> List[Path]:
+        if not self.expansions_dir.is_dir():
+            return []
+        return sorted(p for p in self.expansions_dir.iterdir() if p.suffix in (".json", ".tsv"))
+
+    @staticmethod
+    def _signature_of(files: List[Path]) -> tuple:
+        signature = []
+        for path in files:
+            stat = path.stat()
+            signature.append((path.name, stat.st_mtime_ns, stat.st_size))
+        return tuple(signature)
+
+    def reload(self) -> int:
+        """
+        Re-read every dictionary file and swap in a freshly compiled automaton.
+        Files are merged in name order; a later file overrides an earlier keyword.
+        Returns the number of keywords loaded.
+        """
+        with self._lock:
+            files = self._dictionary_files()
+            keyword_map = {}
+            for path in files:
+                try:
+                    keyword_map.update(load_expansion_file(path))
+                except (OSError, ValueError) as e:
+                    print(f"⚠️ Skipping expansion dictionary {path.name}: {e}")
+
+            # Build before swapping so concurrent queries keep using the old automaton
+            compiled = _CompiledDictionary(keyword_map)
+            self._compiled = compiled
+            self._signature = self._signature_of(files)
+            self._last_check = time.monotonic()
+
+        print(f"📖 Loaded {len(keyword_map)} expansion keywords from {len(files)} file(s)")
+        return len(keyword_map)
+
+    def _reload_if_changed(self):
+        """Cheap mtime check, at most once per reload_interval seconds."""
+        if self.reload_interval is None or self.reload_interval < 0:
+            return
+        now = time.monotonic()
+        if now - self._last_check < self.reload_interval:
+            return
+        self._last_check = now
+        try:
+            changed = self._signature_of(self._dictionary_files()) != self._signature
+        except OSError:
+            return
+        if changed:
+            self.reload()
+
     def expand_query(self, original_query: str) -> str:
         """
         Fast dictionary-based expansion with bilingual support
         """
-        expanded_terms = set()
+        self._reload_if_changed()
+        compiled = self._compiled
+
+        expanded_terms = {}  # insertion-ordered set, keeps the output deterministic
         query_lower = original_query.lower()
-        
-        # Check each keyword in our dictionary
-        for keyword, expansion in self.KEYWORD_MAP.items():
-            # Match both case-insensitive and exact (for Korean)
-            if keyword.lower() in query_lower or keyword in original_query:
-                # Add expansion terms (max 3 to avoid query bloat)
-                expansion_terms = expansion.split()[:3]
-                for term in expansion_terms:
-                    # Don't add if already in query
-                    if term.lower() not in query_lower and term not in original_query:
-                        expanded_terms.add(term)
-        
+
+        # Every keyword occurring in the query, in dictionary order
+        for keyword_id in compiled.automaton.matched_ids(query_lower):
+            # Add expansion terms (max 3 to avoid query bloat)
+            for term in compiled.expansions[keyword_id][:3]:
+                # Don't add if already in query
+                if term.lower() not in query_lower and term not in original_query:
+                    expanded_terms[term] = None
+
         # Combine original + expansions
         if expanded_terms:
             expanded_query = f"{original_query} {' '.join(list(expanded_terms)[:5])}"  # Limit to 5 new terms
             return expanded_query
-        
-        return original_query
\ No newline at end of file
+
+        return original_query
+
+    def translate_keywords(self, original_query: str) -> Optional[str]:
+        """
+        The query with its dictionary keywords swapped for their Korean/English
+        counterparts ("transformer failure" -> "변압기 failure"), or None if no
+        keyword has one. Longest keywords win; English keywords must be whole words.
+        """
+        self._reload_if_changed()
+        compiled = self._compiled
+        query_lower = original_query.lower()
+        # lower() can change the length of a few characters; then work on the lowered text
+        base = original_query if len(query_lower) == len(original_query) else query_lower
+
+        spans = []
+        for end, keyword_id in compiled.automaton.iter_matches(query_lower):
+            if compiled.translations[keyword_id] is None:
+                continue
+            start = end - len(compiled.keywords[keyword_id]) + 1
+            if not _is_hangul(compiled.keywords[keyword_id]):
+                before = query_lower[start - 1] if start > 0 else " "
+                after = query_lower[end + 1] if end + 1 < len(query_lower) else " "
+                if before.isalnum() or after.isalnum():
+                    continue
+            spans.append((start, end + 1, keyword_id))
+        if not spans:
+            return None
+
+        parts, cursor = [], 0
+        for start, end, keyword_id in sorted(spans, key=lambda span: (span[0], span[0] - span[1])):
+            if start < cursor:
+                continue
+            parts.append(base[cursor:start])
+            parts.append(compiled.translations[keyword_id])
+            cursor = end
+        parts.append(base[cursor:])
+        return "".join(parts)
+
+    def query_variants(self, original_query: str) -> List[str]:
+        """
+        Distinct search variants for multi-query retrieval:
+        the original query, its dictionary expansion and its keyword translation.
+        """
+        variants = [original_query, self.expand_query(original_query), self.translate_keywords(original_query)]
+        return list(dict.fromkeys(v for v in variants if v))
@@ -13,6 +13,9 @@ MODEL_NAME = "qwen2.5:0.5b"
 class ContextGenerator:
     def __init__(self):
         self.headers = {"Content-Type": "application/json"}
+        # One keep-alive connection for all chunks instead of a new TCP connection per call
+        self.session = requests.Session()
+        self.session.headers.update(self.headers)
 
     def generate_context(self, document_text: str, chunk_text: str) -> str:
         """
@@ -47,7 +50,7 @@ class ContextGenerator:
         }
 
         try:
-            response = requests.post(LLM_API_URL, headers=self.headers, data=json.dumps(payload))
+            response = self.session.post(LLM_API_URL, data=json.dumps(payload))
             response.raise_for_status()
             result = response.json()
             return result['response'].strip()
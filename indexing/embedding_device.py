@@ -1,25 +1,132 @@
 # indexing/embedding_device.py
 
+import os
 from sentence_transformers import SentenceTransformer
 import numpy as np
 import torch
+from typing import Dict, List, Optional
+
+from config.settings import settings
+
+EMBEDDING_BACKENDS = ("torch", "onnx", "onnx_int8")
 
 class EmbeddingService:
     """
     Vector Embedding Service
     Forced to CPU for stability on M1 Air (8GB).
+    Runs on PyTorch (sentence-transformers) or ONNX Runtime fp32 / int8
+    (settings.embedding_backend), for both queries and bulk indexing.
     """
 
-    def __init__(self, model_name: str = "BAAI/bge-m3"):
+    def __init__(self, model_name: str = "BAAI/bge-m3", use_sparse: Optional[bool] = None,
+                 backend: Optional[str] = None):
         # FORCE CPU: MPS (GPU) causes swapping/freezing on 8GB RAM for large batches
         self.device = "cpu"
-        print(f"💻 Using CPU for {model_name} (Stable Mode)")
+        self.model_name = model_name
+        self.backend = backend or settings.embedding_backend
+        if self.backend not in EMBEDDING_BACKENDS:
+            raise ValueError(f"Unknown embedding backend: {self.backend!r} (expected one of {EMBEDDING_BACKENDS})")
+        # Quantized vectors differ slightly, so caches keep backends apart
+        self.model_id = model_name if self.backend == "torch" else f"{model_name}@{self.backend}"
+
+        if self.backend == "torch":
+            print(f"💻 Using CPU for {model_name} (Stable Mode)")
+            self.model = SentenceTransformer(
+                model_name,
+                trust_remote_code=True,
+                device=self.device
+            )
+            self.onnx_encoder = None
+            self.tokenizer = self.model.tokenizer
+            self.dim = self.model.get_sentence_embedding_dimension()
+        else:
+            from indexing.onnx_embedder import OnnxEncoder
+            self.model = None
+            self.onnx_encoder = OnnxEncoder(model_name, quantize=self.backend == "onnx_int8")
+            self.tokenizer = self.onnx_encoder.tokenizer
+            self.dim = self.onnx_encoder.dim
+
+        if use_sparse is None:
+            use_sparse = settings.lexical_channel == "bge_m3_sparse"
+        self.use_sparse = use_sparse
+        if self.use_sparse:
+            self._load_sparse_head(model_name)
+
+    def _load_sparse_head(self, model_name: str):
+        """
+        bge-m3 ships a 1-unit linear layer (sparse_linear.pt) that turns the
+        last hidden states into per-token lexical weights. Applying it to the
+        token embeddings we already compute gives dense + sparse outputs from
+        one forward pass.
+        """
+        if os.path.isdir(model_name):
+            path = os.path.join(model_name, "sparse_linear.pt")
+        else:
+            from huggingface_hub import hf_hub_download
+            path = hf_hub_download(model_name, "sparse_linear.pt")
+
+        state = torch.load(path, map_location=self.device)
+        # Kept as NumPy so the torch and ONNX backends share one implementation
+        self._sparse_weight = state["weight"].float().numpy().reshape(-1)
+        self._sparse_bias = float(state["bias"].float().numpy().reshape(-1)[0])
+
+        tokenizer = self.tokenizer
+        self._unused_token_ids = np.array([
+            tid for tid in (tokenizer.cls_token_id, tokenizer.eos_token_id,
+                            tokenizer.pad_token_id, tokenizer.unk_token_id)
+            if tid is not None
+        ])
+        print(f"🔤 Sparse lexical weights enabled for {model_name}")
+
+    def _sparse_weights(self, token_ids: np.ndarray, token_embeddings: np.ndarray) -> Dict[int, float]:
+        """{token_id: weight} of one text, max-pooled over repeated tokens (as in FlagEmbedding)."""
+        weights = np.maximum(token_embeddings @ self._sparse_weight + self._sparse_bias, 0)
 
-        self.model = SentenceTransformer(
-            model_name,
-            trust_remote_code=True,
+        keep = (weights > 0) & ~np.isin(token_ids, self._unused_token_ids)
+        token_ids, weights = token_ids[keep], weights[keep]
+        unique_ids, inverse = np.unique(token_ids, return_inverse=True)
+        pooled = np.zeros(len(unique_ids), dtype=np.float32)
+        np.maximum.at(pooled, inverse, weights)
+        return dict(zip(unique_ids.tolist(), pooled.tolist()))
+
+    def _encode(self, texts: List[str], batch_size: int, show_progress_bar: bool) -> np.ndarray:
+        """Normalized dense embeddings (n, dim)."""
+        if self.onnx_encoder is not None:
+            return self.onnx_encoder.encode(texts, batch_size=batch_size, show_progress_bar=show_progress_bar)
+        return np.asarray(self.model.encode(
+            texts,
+            batch_size=batch_size,
+            show_progress_bar=show_progress_bar,
+            normalize_embeddings=True,
+            device=self.device
+        ))
+
+    def _encode_dense_sparse(self, texts: List[str], batch_size: int, show_progress_bar: bool):
+        if self.onnx_encoder is not None:
+            dense, tokens = self.onnx_encoder.encode(
+                texts, batch_size=batch_size, show_progress_bar=show_progress_bar, with_tokens=True
+            )
+            sparse = [self._sparse_weights(ids, embeddings) for ids, embeddings in tokens]
+            return dense, sparse
+
+        outputs = self.model.encode(
+            texts,
+            batch_size=batch_size,
+            show_progress_bar=show_progress_bar,
+            output_value=None,
+            convert_to_numpy=False,
             device=self.device
         )
+        dense = torch.stack([o["sentence_embedding"] for o in outputs]).float()
+        dense = torch.nn.functional.normalize(dense, p=2, dim=1).cpu().numpy()
+        sparse = []
+        for o in outputs:
+            mask = o["attention_mask"].bool()
+            sparse.append(self._sparse_weights(
+                o["input_ids"][mask].cpu().numpy(),
+                o["token_embeddings"][mask].float().cpu().numpy()
+            ))
+        return dense, sparse
 
     def embed_chunks(self, chunks):
         """
@@ -28,24 +135,43 @@ class EmbeddingService:
         texts = [c["chunk_text"] for c in chunks]
 
         # CPU handles smaller batches better
-        embeddings = self.model.encode(
-            texts,
-            batch_size=16, 
-            show_progress_bar=True,
-            normalize_embeddings=True,
-            device=self.device
-        )
+        return self._encode(texts, batch_size=16, show_progress_bar=True)
+
+    def embed_chunks_with_sparse(self, chunks):
+        """
+        Dense embeddings plus bge-m3 lexical weights for indexing.
+        Returns (embeddings, [{token_id: weight}, ...]).
+        """
+        texts = [c["chunk_text"] for c in chunks]
+        return self._encode_dense_sparse(texts, batch_size=16, show_progress_bar=True)
 
-        return np.array(embeddings)
+    def embed_texts(self, texts: List[str], batch_size: int = 32) -> np.ndarray:
+        """
+        Normalized embeddings of short texts such as sentences (no progress bar).
+        """
+        return self._encode(texts, batch_size=batch_size, show_progress_bar=False)
 
     def embed_query(self, query: str):
         """
         Embed user query for retrieval.
         """
-        embedding = self.model.encode(
-            query,
-            normalize_embeddings=True,
-            device=self.device
-        )
-        
-        return embedding
\ No newline at end of file
+        return self.embed_queries([query])[0]
+
+    def embed_query_with_sparse(self, query: str):
+        """
+        Query embedding plus its lexical weights from the same forward pass.
+        """
+        dense, sparse = self.embed_queries_with_sparse([query])
+        return dense[0], sparse[0]
+
+    def embed_queries(self, queries: List[str]) -> np.ndarray:
+        """
+        Embed several queries (e.g. micro-batched from concurrent requests) in one forward pass.
+        """
+        return self._encode(queries, batch_size=len(queries), show_progress_bar=False)
+
+    def embed_queries_with_sparse(self, queries: List[str]):
+        """
+        Batched embed_query_with_sparse: (embeddings, [{token_id: weight}, ...]).
+        """
+        return self._encode_dense_sparse(queries, batch_size=len(queries), show_progress_bar=False)
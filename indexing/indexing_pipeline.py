@@ -3,17 +3,60 @@
 import time
 from pathlib import Path
 
-from indexing.document_loader import load_documents, DATA_DIR 
+import os
+
+from config.collections import (
+    DEFAULT_COLLECTION, collection_docs_dir, faiss_index_path, lexical_index_path, sparse_index_path,
+    rerank_tokens_path
+)
+from config.settings import settings
+from indexing.document_loader import load_documents
 from indexing.text_chunker import chunk_documents
 from indexing.embedding_device import EmbeddingService
 from indexing.vector_indexer import VectorIndexer
 from database.metadata_store import MetadataStore
+from retrieval.lexical_index import LexicalIndex, LearnedSparseIndex
+from retrieval.reranker import DEFAULT_RERANKER_MODEL
+from retrieval.token_store import RerankTokenStore, load_reranker_tokenizer, tokenize_chunks
+
+def _embed(embedder: EmbeddingService, chunks):
+    """Dense embeddings; bge-m3 lexical weights are attached to the chunks in the same pass."""
+    if not embedder.use_sparse:
+        return embedder.embed_chunks(chunks)
+    embeddings, sparse_weights = embedder.embed_chunks_with_sparse(chunks)
+    for chunk, weights in zip(chunks, sparse_weights):
+        chunk["sparse_weights"] = weights
+    return embeddings
+
+def _update_token_store(collection: str, chunks, full_rebuild: bool):
+    """Reranker token ids of new chunks; rebuilt from MySQL if the store is missing or from another model."""
+    if not settings.rerank_token_store:
+        return
+    path = rerank_tokens_path(collection)
+    tokenizer = load_reranker_tokenizer(DEFAULT_RERANKER_MODEL)
 
-def run_indexing():
-    print("🚀 Starting CLEAN Indexing Pipeline (No Context Generation)...\n")
+    store = RerankTokenStore.load(path) if not full_rebuild and os.path.exists(path) else None
+    if store is not None and store.tokenizer_name != DEFAULT_RERANKER_MODEL:
+        store = None
+
+    if store is None:
+        if not full_rebuild:
+            # Missing or stale store: cover the whole collection, not just the new chunks
+            db = MetadataStore()
+            chunks = db.fetch_collection_chunks(collection)
+            db.close()
+        tokenize_chunks(tokenizer, chunks)
+        store = RerankTokenStore.build(chunks, DEFAULT_RERANKER_MODEL)
+    else:
+        tokenize_chunks(tokenizer, chunks)
+        store.add_chunks(chunks)
+    store.save(path)
+
+def run_indexing(collection: str = DEFAULT_COLLECTION):
+    print(f"🚀 Starting CLEAN Indexing Pipeline for '{collection}' (No Context Generation)...\n")
 
     # 1. Load Documents
-    docs = load_documents(DATA_DIR)
+    docs = load_documents(collection_docs_dir(collection))
     print(f"📄 Loaded {len(docs)} pages")
 
     # 2. Chunk Documents
@@ -27,12 +70,12 @@ def run_indexing():
     # 3. Embeddings (CPU/MPS)
     print("\n🧠 Generating embeddings (Raw Text)...")
     embedder = EmbeddingService()
-    embeddings = embedder.embed_chunks(chunks)
+    embeddings = _embed(embedder, chunks)
 
     # 4. Save to FAISS & MySQL
     print("\n💾 Saving to Vector Store & Database...")
     
-    indexer = VectorIndexer(index_path="data/faiss_index.bin")
+    indexer = VectorIndexer(index_path=faiss_index_path(collection))
     # Reset index for clean slate
     import faiss
     indexer.index = faiss.IndexFlatL2(1024) 
@@ -40,11 +83,11 @@ def run_indexing():
 
     for chunk, vid in zip(chunks, vector_ids):
         chunk["vector_id"] = vid
+        chunk["collection"] = collection
 
     db = MetadataStore()
-    # Clear old data
-    db.cursor.execute("TRUNCATE TABLE document_chunks") 
-    db.conn.commit()
+    # Clear old data (this collection only)
+    db.delete_collection(collection)
     
     for chunk in chunks:
         # Pass empty string for context since we aren't using it
@@ -53,7 +96,86 @@ def run_indexing():
     
     db.close()
     indexer.save_index()
+
+    # 5. Lexical index (persisted so the API never rebuilds it from MySQL)
+    LexicalIndex.build(chunks).save(lexical_index_path(collection))
+    if embedder.use_sparse:
+        LearnedSparseIndex.build(chunks).save(sparse_index_path(collection))
+    _update_token_store(collection, chunks, full_rebuild=True)
     print(f"\n✅ INDEXING COMPLETE. ({len(chunks)} chunks)")
 
+def run_incremental_indexing(collection: str = DEFAULT_COLLECTION):
+    """
+    Index only documents that are not in the collection yet.
+    New vectors are appended to the existing FAISS index and the
+    lexical index is updated in place.
+    """
+    db = MetadataStore()
+    existing = db.get_existing_documents(collection)
+
+    docs = load_documents(collection_docs_dir(collection))
+    chunks = [c for c in chunk_documents(docs) if c["document_name"] not in existing]
+    if not chunks:
+        print("✅ Nothing new to index.")
+        db.close()
+        return 0
+
+    print(f"🧩 {len(chunks)} new chunks from {len({c['document_name'] for c in chunks})} documents")
+    embedder = EmbeddingService()
+    embeddings = _embed(embedder, chunks)
+
+    indexer = VectorIndexer(index_path=faiss_index_path(collection))
+    if os.path.exists(indexer.index_path):
+        indexer.load_index()
+    vector_ids = indexer.add_vectors(embeddings)
+
+    for chunk, vid in zip(chunks, vector_ids):
+        chunk["vector_id"] = vid
+        chunk["collection"] = collection
+        chunk['chunk_context'] = ""
+        db.insert_chunk_metadata(chunk)
+
+    lexical_path = lexical_index_path(collection)
+    if os.path.exists(lexical_path):
+        lexical = LexicalIndex.load(lexical_path)
+        lexical.add_chunks(chunks)
+    else:
+        lexical = LexicalIndex.build(db.fetch_collection_chunks(collection))
+
+    db.close()
+    indexer.save_index()
+    lexical.save(lexical_path)
+
+    if embedder.use_sparse:
+        sparse_path = sparse_index_path(collection)
+        if os.path.exists(sparse_path):
+            sparse = LearnedSparseIndex.load(sparse_path)
+            sparse.add_chunks(chunks)
+            sparse.save(sparse_path)
+        else:
+            print("⚠️ No sparse index yet; run a full re-index to build it for existing documents.")
+    _update_token_store(collection, chunks, full_rebuild=False)
+    print(f"✅ INCREMENTAL INDEXING COMPLETE. ({len(chunks)} chunks)")
+    return len(chunks)
+
+def remove_document_from_index(document_name: str, collection: str = DEFAULT_COLLECTION):
+    """
+    Remove a document's chunks from MySQL and the lexical index.
+    Its FAISS vectors stay until the next full re-index; they no longer
+    resolve to metadata, so search drops them.
+    """
+    db = MetadataStore()
+    db.delete_document(document_name, collection)
+    db.close()
+
+    for path, index_cls in ((lexical_index_path(collection), LexicalIndex),
+                            (sparse_index_path(collection), LearnedSparseIndex),
+                            (rerank_tokens_path(collection), RerankTokenStore)):
+        if os.path.exists(path):
+            index = index_cls.load(path)
+            if index.remove_document(document_name):
+                index.save(path)
+
 if __name__ == "__main__":
-    run_indexing()
\ No newline at end of file
+    import sys
+    run_indexing(sys.argv[1] if len(sys.argv) > 1 else DEFAULT_COLLECTION)
\ No newline at end of file
@@ -0,0 +1,83 @@
+# indexing/onnx_embedder.py
+
+from pathlib import Path
+from typing import List, Optional, Tuple
+
+import numpy as np
+from tqdm import tqdm
+
+from indexing.onnx_utils import create_session, ensure_onnx_model, export_onnx
+
+
+def export_encoder(model_name: str, path: Path):
+    """Export the transformer body (last hidden states) of a sentence embedding model."""
+    from transformers import AutoModel, AutoTokenizer
+
+    tokenizer = AutoTokenizer.from_pretrained(model_name)
+    model = AutoModel.from_pretrained(model_name).eval()
+    dummy = tokenizer(["export"], return_tensors="pt")
+    export_onnx(
+        model,
+        {"input_ids": dummy["input_ids"], "attention_mask": dummy["attention_mask"]},
+        ["last_hidden_state"],
+        path,
+        dynamic_axes={
+            "input_ids": {0: "batch", 1: "sequence"},
+            "attention_mask": {0: "batch", 1: "sequence"},
+            "last_hidden_state": {0: "batch", 1: "sequence"},
+        }
+    )
+
+
+class OnnxEncoder:
+    """
+    bge-m3 on ONNX Runtime (fp32 or dynamic int8): CLS pooling + L2
+    normalization, i.e. the same pipeline as the SentenceTransformer model.
+    Texts are batched by token length so each batch is padded only to its
+    own longest text.
+    """
+
+    def __init__(self, model_name: str, quantize: bool = False, max_length: Optional[int] = None):
+        from transformers import AutoTokenizer
+
+        self.model_name = model_name
+        self.tokenizer = AutoTokenizer.from_pretrained(model_name)
+        self.max_length = max_length or self.tokenizer.model_max_length
+
+        path = ensure_onnx_model(model_name, quantize, lambda p: export_encoder(model_name, p))
+        self.session = create_session(path)
+        self.dim = self.session.get_outputs()[0].shape[-1]
+        print(f"⚡ {model_name} using ONNX Runtime ({'int8' if quantize else 'fp32'})")
+
+    def encode(self, texts: List[str], batch_size: int = 16, show_progress_bar: bool = False,
+               with_tokens: bool = False):
+        """
+        Normalized CLS embeddings (n, dim) float32, in input order.
+        With with_tokens, also [(input_ids, token_embeddings)] per text (padding removed),
+        for the bge-m3 sparse head.
+        """
+        features = self.tokenizer(texts, truncation=True, max_length=self.max_length)
+        lengths = np.fromiter((len(ids) for ids in features["input_ids"]), dtype=np.int64, count=len(texts))
+        order = np.argsort(-lengths, kind="stable")
+
+        dense = np.zeros((len(texts), self.dim), dtype=np.float32)
+        tokens: List[Optional[Tuple[np.ndarray, np.ndarray]]] = [None] * len(texts)
+        starts = range(0, len(texts), batch_size)
+        for start in tqdm(starts, desc="Batches", disable=not show_progress_bar):
+            batch = order[start:start + batch_size]
+            padded = self.tokenizer.pad(
+                {"input_ids": [features["input_ids"][i] for i in batch],
+                 "attention_mask": [features["attention_mask"][i] for i in batch]},
+                padding=True,
+                return_tensors="np"
+            )
+            feeds = {name: array.astype(np.int64) for name, array in padded.items()}
+            hidden = self.session.run(["last_hidden_state"], feeds)[0]
+            dense[batch] = hidden[:, 0]
+            if with_tokens:
+                for row, i in enumerate(batch):
+                    n = lengths[i]
+                    tokens[i] = (feeds["input_ids"][row, :n], hidden[row, :n])
+
+        dense /= np.maximum(np.linalg.norm(dense, axis=1, keepdims=True), 1e-12)
+        return (dense, tokens) if with_tokens else dense
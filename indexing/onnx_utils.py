@@ -0,0 +1,93 @@
+# indexing/onnx_utils.py
+
+import os
+import tempfile
+from pathlib import Path
+from typing import Dict, List
+
+from config.collections import DATA_ROOT
+from config.settings import settings
+
+ONNX_ROOT = DATA_ROOT / "onnx"
+
+
+def onnx_model_path(model_name: str, quantize: bool = False) -> Path:
+    """data/onnx/<model>/model.onnx (model_int8.onnx when quantized)."""
+    model_dir = ONNX_ROOT / model_name.replace("/", "__")
+    return model_dir / ("model_int8.onnx" if quantize else "model.onnx")
+
+
+def export_onnx(model, dummy_inputs: Dict, output_names: List[str], path: Path, dynamic_axes: Dict):
+    """
+    Trace a torch module to ONNX. Large models (bge-m3 / bge-reranker-v2-m3
+    are over 2 GB in fp32) get their weights written as external data.
+    """
+    import onnx
+    import torch
+
+    path.parent.mkdir(parents=True, exist_ok=True)
+    # The exporter scatters >2 GB weights over many files, so trace into a scratch dir first
+    with tempfile.TemporaryDirectory(dir=path.parent) as scratch:
+        traced_path = os.path.join(scratch, "traced.onnx")
+        with torch.no_grad():
+            torch.onnx.export(
+                model,
+                tuple(dummy_inputs.values()),
+                traced_path,
+                input_names=list(dummy_inputs.keys()),
+                output_names=output_names,
+                dynamic_axes=dynamic_axes,
+                opset_version=14,
+                do_constant_folding=True
+            )
+
+        # Re-save with all weights in a single external file next to the graph
+        onnx.save_model(
+            onnx.load(traced_path),
+            str(path),
+            save_as_external_data=True,
+            all_tensors_to_one_file=True,
+            location=f"{path.name}.data"
+        )
+
+
+def quantize_int8(source: Path, target: Path):
+    """Dynamic int8 quantization of the MatMul/Gemm weights (activations stay fp32)."""
+    from onnxruntime.quantization import QuantType, quantize_dynamic
+
+    quantize_dynamic(
+        str(source),
+        str(target),
+        weight_type=QuantType.QInt8,
+        use_external_data_format=True
+    )
+
+
+def create_session(path: Path):
+    import onnxruntime as ort
+
+    options = ort.SessionOptions()
+    options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+    if settings.onnx_threads > 0:
+        options.intra_op_num_threads = settings.onnx_threads
+    return ort.InferenceSession(str(path), options, providers=["CPUExecutionProvider"])
+
+
+def ensure_onnx_model(model_name: str, quantize: bool, export_fp32) -> Path:
+    """
+    Path of the ONNX model, exporting (via export_fp32(path)) and quantizing
+    on first use. The fp32 export is kept so the int8 variant can be rebuilt.
+    """
+    fp32_path = onnx_model_path(model_name, quantize=False)
+    if not fp32_path.exists():
+        print(f"📦 Exporting {model_name} to ONNX (one-time)...")
+        export_fp32(fp32_path)
+    if not quantize:
+        return fp32_path
+
+    int8_path = onnx_model_path(model_name, quantize=True)
+    if not int8_path.exists():
+        print(f"📦 Quantizing {model_name} to int8 (one-time)...")
+        quantize_int8(fp32_path, int8_path)
+    return int8_path
+
@@ -10,7 +10,7 @@ VECTOR_DIM = 1024  # bge-m3 dimension
 class VectorIndexer:
     def __init__(self, index_path: str = "data/faiss_index.bin"):
         self.index_path = index_path
-        Path("data").mkdir(exist_ok=True)
+        Path(index_path).parent.mkdir(parents=True, exist_ok=True)
 
         # Create empty FAISS index
         self.index = faiss.IndexFlatL2(VECTOR_DIM)
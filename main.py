@@ -1,14 +1,18 @@
 # main.py
 from fastapi import FastAPI, UploadFile, File, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
 from typing import List, Optional
 import shutil
 import os
+import json
+import asyncio
 import time
 from pathlib import Path
 
-from indexing.indexing_pipeline import run_indexing
+from config.collections import DEFAULT_COLLECTION, collection_docs_dir, list_collections, validate_collection_name
+from indexing.indexing_pipeline import run_indexing, run_incremental_indexing, remove_document_from_index
 from generation.answer_generation import AnswerGenerator
 from database.metadata_store import MetadataStore
 from database.chat_store import ChatStore # <--- NEW
@@ -29,18 +33,30 @@ chat_store = ChatStore() # Initialize SQLite Store
 # --- Data Models ---
 class QueryRequest(BaseModel):
     query: str
-    model: str = "qwen2.5:3b"
+    model: str = "qwen2.5:3b"  # or "auto": routed per query between settings.router_small/large_model
     session_id: str
     target_document: Optional[str] = None # <--- NEW
+    collection: str = DEFAULT_COLLECTION
+    extractive: Optional[bool] = None  # None: settings.extractive_fast_path; False: always generate
 
 class QueryResponse(BaseModel):
     answer: str
     sources: List[dict]
     generation_time: float
+    extractive: bool = False  # Quoted from the top source without the LLM; resend with extractive=False for a full answer
+    highlight: Optional[List[int]] = None  # [start, end) of the answering sentence in answer
+    confidence: Optional[float] = None
+    model: Optional[str] = None  # The model that answered (None when no LLM was used)
 
 class RenameRequest(BaseModel):
     title: str
 
+def _docs_dir(collection: str) -> Path:
+    try:
+        return collection_docs_dir(collection)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
 # --- Routes ---
 
 @app.get("/api/status")
@@ -61,9 +77,46 @@ def get_status():
         "model": "Qwen 2.5 3B (Contextual)"
     }
 
+@app.get("/api/collections")
+def get_collections():
+    return list_collections()
+
+@app.on_event("shutdown")
+def save_caches():
+    generator.retrieval_pipeline.collections.save_caches()
+    generator.retrieval_pipeline.embedder.save_cache()
+
+@app.on_event("shutdown")
+async def close_llm_client():
+    await generator.llm.aclose()
+
+@app.get("/api/metrics")
+def get_metrics():
+    collections = generator.retrieval_pipeline.collections
+    return {
+        "collections": collections.stats(),
+        "rerank_cache": collections.reranker.cache_stats(),
+        "rerank_batching": collections.reranker.batching_stats(),
+        "rerank_scheduler": collections.reranker.scheduler_stats(),
+        "rerank_cascade": collections.cascade.stats(),
+        "query_embedding_cache": generator.retrieval_pipeline.embedder.cache_stats(),
+        "query_batching": {
+            "embedding": generator.retrieval_pipeline.embedder.batching_stats(),
+            "vector_search": collections.vector_batching_stats()
+        },
+        "llm_prefill": generator.llm.stats(),
+        "conversations": generator.conversations.stats(),
+        "model_routing": generator.router.stats()
+    }
+
+@app.post("/api/expansions/reload")
+def reload_expansions():
+    keywords = generator.retrieval_pipeline.query_processor.reload()
+    return {"status": "reloaded", "keywords": keywords}
+
 @app.get("/api/documents")
-def get_documents():
-    upload_dir = Path("docs/pdf_raw")
+def get_documents(collection: str = DEFAULT_COLLECTION):
+    upload_dir = _docs_dir(collection)
     if not upload_dir.exists():
         return []
     
@@ -80,10 +133,15 @@ def get_documents():
     return files
 
 @app.delete("/api/documents/{filename}")
-def delete_document(filename: str):
-    file_path = Path("docs/pdf_raw") / filename
+def delete_document(filename: str, collection: str = DEFAULT_COLLECTION):
+    file_path = _docs_dir(collection) / filename
     if file_path.exists():
         os.remove(file_path)
+        try:
+            remove_document_from_index(filename, collection)
+            generator.retrieval_pipeline.collections.invalidate(collection)
+        except Exception as e:
+            print(f"⚠️ Could not remove {filename} from index: {e}")
         return {"message": "File deleted"}
     raise HTTPException(status_code=404, detail="File not found")
 
@@ -105,6 +163,7 @@ def create_session(data: dict):
 @app.delete("/api/history/{session_id}")
 def delete_session(session_id: str):
     chat_store.delete_session(session_id)
+    generator.conversations.clear(session_id)
     return {"message": "Session deleted"}
 
 @app.patch("/api/history/{session_id}")
@@ -114,44 +173,112 @@ def rename_session(session_id: str, req: RenameRequest):
 
 # --- QUERY ROUTE ---
 
+# Async so that waiting on the LLM does not hold a threadpool worker;
+# retrieval and the SQLite writes still run in worker threads.
 @app.post("/api/query", response_model=QueryResponse)
-def ask_question(request: QueryRequest):
+async def ask_question(request: QueryRequest):
+    try:
+        validate_collection_name(request.collection)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
     try:
         start_time = time.time()
         
         # 1. Save User Message
-        chat_store.add_message(request.session_id, "user", request.query)
+        await asyncio.to_thread(chat_store.add_message, request.session_id, "user", request.query)
         
         # 2. Generate Answer (Pass target_document)
-        result = generator.generate_answer(
+        result = await generator.agenerate_answer(
             request.query, 
             model_name=request.model,
-            target_document=request.target_document
+            target_document=request.target_document,
+            collection=request.collection,
+            session_id=request.session_id,
+            extractive=request.extractive
         )
         
         end_time = time.time()
         duration = round(end_time - start_time, 2)
 
         # 3. Save Bot Message
-        chat_store.add_message(
+        await asyncio.to_thread(
+            chat_store.add_message,
             request.session_id, 
             "assistant", 
             result["answer"], 
             result["sources"], 
-            duration
+            duration,
+            result.get("model")
         )
 
         return {
             "answer": result["answer"],
             "sources": result["sources"],
-            "generation_time": duration
+            "generation_time": duration,
+            "extractive": result.get("extractive", False),
+            "highlight": result.get("highlight"),
+            "confidence": result.get("confidence"),
+            "model": result.get("model")
         }
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.post("/api/query/stream")
+async def ask_question_stream(request: QueryRequest):
+    """
+    Server-Sent Events version of /api/query: a "sources" event right after retrieval,
+    "token" events as the LLM generates, then "done" (the full answer and timings).
+    """
+    try:
+        validate_collection_name(request.collection)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    await asyncio.to_thread(chat_store.add_message, request.session_id, "user", request.query)
+
+    def sse(event: str, data: dict) -> str:
+        return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+    async def events():
+        start_time = time.time()
+        first_token_time = None
+        try:
+            async for event, data in generator.astream_answer(
+                request.query,
+                model_name=request.model,
+                target_document=request.target_document,
+                collection=request.collection,
+                session_id=request.session_id,
+                extractive=request.extractive
+            ):
+                if event == "token" and first_token_time is None:
+                    first_token_time = round(time.time() - start_time, 2)
+                if event == "done":
+                    duration = round(time.time() - start_time, 2)
+                    await asyncio.to_thread(
+                        chat_store.add_message,
+                        request.session_id,
+                        "assistant",
+                        data["answer"],
+                        data["sources"],
+                        duration,
+                        data.get("model")
+                    )
+                    data = {**data, "generation_time": duration, "time_to_first_token": first_token_time}
+                yield sse(event, data)
+        except Exception as e:
+            yield sse("error", {"detail": str(e)})
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
 @app.post("/api/upload")
-async def upload_documents(files: List[UploadFile] = File(...)):
-    upload_dir = Path("docs/pdf_raw")
+async def upload_documents(files: List[UploadFile] = File(...), collection: str = DEFAULT_COLLECTION):
+    upload_dir = _docs_dir(collection)
     upload_dir.mkdir(parents=True, exist_ok=True)
     
     saved_files = []
@@ -164,10 +291,16 @@ async def upload_documents(files: List[UploadFile] = File(...)):
     return {"message": f"Successfully uploaded {len(saved_files)} files", "files": saved_files}
 
 @app.post("/api/reindex")
-def trigger_indexing():
+def trigger_indexing(collection: str = DEFAULT_COLLECTION, incremental: bool = False):
+    _docs_dir(collection)
     try:
-        run_indexing() 
-        return {"message": "Indexing completed successfully"}
+        if incremental:
+            run_incremental_indexing(collection)
+        else:
+            run_indexing(collection)
+        # Next query reloads the rebuilt indexes
+        generator.retrieval_pipeline.collections.invalidate(collection)
+        return {"message": "Indexing completed successfully", "collection": collection}
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -0,0 +1,153 @@
+# retrieval/collection_manager.py
+
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Optional
+
+from config.collections import DEFAULT_COLLECTION, validate_collection_name
+from config.settings import settings
+from retrieval.hybrid_retriever import HybridRetriever
+from retrieval.rerank_cascade import RerankCascade
+from retrieval.reranker import Reranker
+
+
+class CollectionManager:
+    """
+    Lazily loads one HybridRetriever per collection and evicts the
+    least recently used ones once the memory budget is exceeded.
+    The reranker models (and the rerank cascade) are loaded once and shared by all collections.
+    """
+
+    def __init__(self, top_k: int = 10, memory_budget_mb: Optional[int] = None,
+                 reranker: Optional[Reranker] = None):
+        self.top_k = top_k
+        budget_mb = memory_budget_mb if memory_budget_mb is not None else settings.collection_memory_budget_mb
+        self.memory_budget_bytes = int(budget_mb) * 1024 * 1024
+
+        self._reranker = reranker
+        self._cascade: Optional[RerankCascade] = None
+        self._retrievers: "OrderedDict[str, HybridRetriever]" = OrderedDict()
+        self._lock = threading.RLock()
+        self._load_locks: Dict[str, threading.Lock] = {}
+
+        self._stats = {
+            "hits": 0,
+            "loads": 0,
+            "evictions": 0,
+            "load_seconds_total": 0.0,
+            "load_seconds_max": 0.0,
+            "evict_seconds_total": 0.0,
+            "evict_seconds_max": 0.0,
+        }
+
+    @property
+    def reranker(self) -> Reranker:
+        with self._lock:
+            if self._reranker is None:
+                self._reranker = Reranker()
+            return self._reranker
+
+    @property
+    def cascade(self) -> RerankCascade:
+        with self._lock:
+            if self._cascade is None:
+                self._cascade = RerankCascade(self.reranker)
+            return self._cascade
+
+    def get(self, collection: str = DEFAULT_COLLECTION) -> HybridRetriever:
+        """Return the retriever of a collection, loading it on first use."""
+        validate_collection_name(collection)
+
+        with self._lock:
+            retriever = self._retrievers.get(collection)
+            if retriever is not None:
+                self._retrievers.move_to_end(collection)
+                self._stats["hits"] += 1
+                return retriever
+            load_lock = self._load_locks.setdefault(collection, threading.Lock())
+
+        # Load outside the manager lock so other collections keep serving
+        with load_lock:
+            with self._lock:
+                retriever = self._retrievers.get(collection)
+                if retriever is not None:
+                    self._retrievers.move_to_end(collection)
+                    self._stats["hits"] += 1
+                    return retriever
+
+            start = time.perf_counter()
+            retriever = HybridRetriever(
+                top_k=self.top_k,
+                collection=collection,
+                reranker=self.reranker,
+                cascade=self.cascade
+            )
+            elapsed = time.perf_counter() - start
+
+            with self._lock:
+                self._retrievers[collection] = retriever
+                self._stats["loads"] += 1
+                self._stats["load_seconds_total"] += elapsed
+                self._stats["load_seconds_max"] = max(self._stats["load_seconds_max"], elapsed)
+                print(f"📦 Loaded collection '{collection}' in {elapsed:.2f}s "
+                      f"({retriever.memory_bytes() / 1024 / 1024:.1f} MB)")
+                self._enforce_budget(keep=collection)
+
+        return retriever
+
+    def invalidate(self, collection: str = DEFAULT_COLLECTION):
+        """Drop a loaded collection so the next query reloads it (e.g. after re-indexing)."""
+        with self._lock:
+            retriever = self._retrievers.pop(collection, None)
+        if retriever is not None:
+            # Queries already holding it finish first; the connection closes after them
+            retriever.close()
+
+    def loaded_bytes(self) -> int:
+        with self._lock:
+            return sum(r.memory_bytes() for r in self._retrievers.values())
+
+    def vector_batching_stats(self) -> dict:
+        """Micro-batched FAISS search stats of each loaded collection."""
+        with self._lock:
+            return {name: r.vector_batcher.stats() for name, r in self._retrievers.items()}
+
+    def _enforce_budget(self, keep: str):
+        # Never evict the collection that is about to serve a query,
+        # even if it alone is larger than the budget.
+        while self.loaded_bytes() > self.memory_budget_bytes and len(self._retrievers) > 1:
+            victim = next(name for name in self._retrievers if name != keep)
+            start = time.perf_counter()
+            retriever = self._retrievers.pop(victim)
+            size = retriever.memory_bytes()
+            retriever.close()
+            elapsed = time.perf_counter() - start
+
+            self._stats["evictions"] += 1
+            self._stats["evict_seconds_total"] += elapsed
+            self._stats["evict_seconds_max"] = max(self._stats["evict_seconds_max"], elapsed)
+            print(f"♻️ Evicted collection '{victim}' ({size / 1024 / 1024:.1f} MB)")
+
+    def save_caches(self):
+        """Persist the rerank score caches of the models loaded so far (full reranker, cascade first stage)."""
+        with self._lock:
+            models = [self._reranker, self._cascade.first_stage_model if self._cascade is not None else None]
+        for model in models:
+            if model is not None:
+                model.save_cache()
+
+    def stats(self) -> dict:
+        with self._lock:
+            stats = dict(self._stats)
+            loads = stats["loads"]
+            evictions = stats["evictions"]
+            stats["load_seconds_avg"] = stats["load_seconds_total"] / loads if loads else 0.0
+            stats["evict_seconds_avg"] = stats["evict_seconds_total"] / evictions if evictions else 0.0
+            stats["memory_budget_bytes"] = self.memory_budget_bytes
+            stats["loaded"] = [
+                {"collection": name, "memory_bytes": r.memory_bytes()}
+                for name, r in self._retrievers.items()
+            ]
+            stats["loaded_bytes"] = sum(item["memory_bytes"] for item in stats["loaded"])
+            return stats
@@ -0,0 +1,73 @@
+# retrieval/diversify.py
+
+from typing import Optional
+
+import numpy as np
+
+
+def near_duplicate_mask(embeddings: np.ndarray, threshold: float) -> np.ndarray:
+    """
+    Keep-mask over rank-ordered candidates: a candidate is dropped when its
+    cosine similarity to a better-ranked kept candidate exceeds threshold
+    (overlapping chunks, passages repeated across report revisions).
+    Embeddings are expected to be L2-normalized.
+    """
+    n = len(embeddings)
+    keep = np.ones(n, dtype=bool)
+    duplicate_of = np.triu(embeddings @ embeddings.T > threshold, k=1)
+    for i in range(n - 1):
+        if keep[i]:
+            keep[i + 1:] &= ~duplicate_of[i, i + 1:]
+    return keep
+
+
+def mmr_select(embeddings: np.ndarray, relevance: np.ndarray, k: int, lambda_: float,
+               doc_ids: Optional[np.ndarray] = None, doc_penalty: float = 0.0) -> np.ndarray:
+    """
+    Maximal Marginal Relevance: greedily pick k candidates maximizing
+    lambda * relevance - (1 - lambda) * (max similarity to the picks so far)
+    - doc_penalty * (picks already taken from the same document).
+    Returns the picked positions in pick order.
+    """
+    n = len(relevance)
+    k = min(k, n)
+    if k == n:
+        return np.arange(n)
+
+    sims = embeddings @ embeddings.T
+    redundancy = np.zeros(n)
+    available = np.ones(n, dtype=bool)
+    if doc_ids is None:
+        doc_ids = np.zeros(n, dtype=np.int64)
+    doc_counts = np.zeros(int(doc_ids.max()) + 1 if n else 0)
+
+    picks = np.zeros(k, dtype=np.int64)
+    for step in range(k):
+        gain = lambda_ * relevance - (1.0 - lambda_) * redundancy - doc_penalty * doc_counts[doc_ids]
+        gain[~available] = -np.inf
+        best = int(np.argmax(gain))
+        picks[step] = best
+        available[best] = False
+        np.maximum(redundancy, sims[best], out=redundancy)
+        doc_counts[doc_ids[best]] += 1
+    return picks
+
+
+def diversify(embeddings: np.ndarray, fused_scores: np.ndarray, doc_names, dedup_threshold: float,
+              max_candidates: int, lambda_: float, doc_penalty: float) -> np.ndarray:
+    """
+    Positions (in their original, fused order) of the candidates worth reranking:
+    near-duplicates collapsed onto their best-ranked copy, then an MMR pick of
+    at most max_candidates (0 = no limit) spread across documents.
+    """
+    positions = np.flatnonzero(near_duplicate_mask(embeddings, dedup_threshold))
+    if max_candidates <= 0 or len(positions) <= max_candidates:
+        return positions
+
+    scores = np.asarray(fused_scores, dtype=np.float64)[positions]
+    span = scores.max() - scores.min()
+    relevance = (scores - scores.min()) / span if span > 0 else np.ones_like(scores)
+    _, doc_ids = np.unique(np.asarray(doc_names, dtype=object)[positions], return_inverse=True)
+
+    picks = mmr_select(embeddings[positions], relevance, max_candidates, lambda_, doc_ids.ravel(), doc_penalty)
+    return np.sort(positions[picks])
@@ -0,0 +1,70 @@
+# retrieval/fusion.py
+
+from typing import Optional, Sequence, Tuple
+
+import numpy as np
+
+
+def _fuse(ranked_ids: Sequence[np.ndarray], contributions: Sequence[np.ndarray]) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Sum per-list contributions by id.
+    Returns (ids, fused_scores) ordered by score desc; ties keep the order
+    in which ids first appear across the lists (first list first).
+    """
+    ids = np.concatenate([np.asarray(r, dtype=np.int64) for r in ranked_ids])
+    if len(ids) == 0:
+        return ids, np.zeros(0)
+    values = np.concatenate([np.asarray(c, dtype=np.float64) for c in contributions])
+
+    unique_ids, first_seen, inverse = np.unique(ids, return_index=True, return_inverse=True)
+    fused = np.bincount(inverse.ravel(), weights=values, minlength=len(unique_ids))
+    order = np.lexsort((first_seen, -fused))
+    return unique_ids[order], fused[order]
+
+
+def reciprocal_rank_fusion(ranked_ids: Sequence[np.ndarray], k: int = 60,
+                           weights: Optional[Sequence[float]] = None) -> Tuple[np.ndarray, np.ndarray]:
+    """RRF: every list adds weight / (k + rank) to the ids it ranks (rank starts at 1)."""
+    weights = weights if weights is not None else [1.0] * len(ranked_ids)
+    contributions = [
+        w / (k + np.arange(1, len(ids) + 1, dtype=np.float64))
+        for ids, w in zip(ranked_ids, weights)
+    ]
+    return _fuse(ranked_ids, contributions)
+
+
+def _min_max(scores: np.ndarray) -> np.ndarray:
+    scores = np.asarray(scores, dtype=np.float64)
+    if len(scores) == 0:
+        return scores
+    low, high = scores.min(), scores.max()
+    if high == low:
+        return np.ones_like(scores)
+    return (scores - low) / (high - low)
+
+
+def weighted_score_fusion(ranked_ids: Sequence[np.ndarray], scores: Sequence[np.ndarray],
+                          weights: Sequence[float]) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Convex combination of min-max normalized scores (higher = better in every list).
+    An id missing from a list gets 0 from that list.
+    """
+    contributions = [w * _min_max(s) for s, w in zip(scores, weights)]
+    return _fuse(ranked_ids, contributions)
+
+
+def top_k_order(scores: np.ndarray, k: int) -> np.ndarray:
+    """
+    Positions of the k highest scores, best first; ties keep input order
+    (same as a stable sort by score desc, without sorting everything).
+    """
+    scores = np.asarray(scores)
+    if k <= 0 or len(scores) == 0:
+        return np.zeros(0, dtype=np.int64)
+    positions = np.arange(len(scores))
+    if len(scores) > k:
+        part = np.argpartition(-scores, k - 1)[:k]
+        # Keep everything tied with the k-th score so tie order stays exact
+        positions = positions[scores >= scores[part].min()]
+    order = np.lexsort((positions, -scores[positions]))
+    return positions[order][:k]
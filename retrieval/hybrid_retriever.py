@@ -1,134 +1,292 @@
 # retrieval/hybrid_retriever.py
 
+import threading
+from contextlib import contextmanager
+
 import faiss
 import numpy as np
-import torch
-from rank_bm25 import BM25Okapi
+from config.collections import (
+    DEFAULT_COLLECTION, faiss_index_path as default_faiss_index_path, lexical_index_path, sparse_index_path,
+    rerank_tokens_path
+)
+from config.settings import settings
 from database.metadata_store import MetadataStore
-from sentence_transformers import CrossEncoder
+from retrieval.diversify import diversify
+from retrieval.fusion import reciprocal_rank_fusion, weighted_score_fusion, top_k_order
+from retrieval.lexical_index import LexicalIndex, LearnedSparseIndex
+from retrieval.micro_batcher import MicroBatcher
+from retrieval.rerank_cascade import RerankCascade
+from retrieval.reranker import Reranker
+from retrieval.token_store import RerankTokenStore
 from typing import List, Dict, Optional
 import os
 
 class HybridRetriever:
     def __init__(self, 
-                 faiss_index_path="data/faiss_index.bin",
+                 faiss_index_path=None,
                  top_k=10, 
                  rrf_k=60, 
+                 collection=DEFAULT_COLLECTION,
+                 reranker: Optional[Reranker] = None,
+                 cascade: Optional[RerankCascade] = None,
+                 k_retrieve: Optional[int] = None,
                  **kwargs):
         self.metadata_store = MetadataStore()
+        # One MySQL connection and cursor: held for a whole lookup, and close() waits for it
+        self._store_lock = threading.Lock()
+        self._closed = False
+        self.collection = collection
         self.top_k = top_k
         self.rrf_k = rrf_k
+        self.k_retrieve = k_retrieve if k_retrieve is not None else settings.k_retrieve
+
+        if faiss_index_path is None:
+            faiss_index_path = default_faiss_index_path(collection)
         
         if os.path.exists(faiss_index_path):
             self.index = faiss.read_index(faiss_index_path)
         else:
             self.index = None
-            print("⚠️ Warning: FAISS index not found.")
-
-        # --- OPTIMIZATION: USE MPS (GPU) ---
-        device = "cpu"
-        if torch.backends.mps.is_available():
-            device = "mps"
-            print("⚡ Reranker using MPS (Mac GPU) acceleration")
-        elif torch.cuda.is_available():
-            device = "cuda"
-        
-        print("🧠 Loading Reranker Model...")
-        self.reranker = CrossEncoder('BAAI/bge-reranker-v2-m3', default_activation_function=None, device=device)
+            print(f"⚠️ Warning: FAISS index not found for collection '{collection}'.")
+
+        # Share the reranker across collections when one is given
+        self.reranker = reranker if reranker is not None else Reranker()
+        self.cascade = cascade if cascade is not None else RerankCascade(self.reranker)
+
+        # Concurrent queries against this collection share one FAISS search call
+        self.vector_batcher = MicroBatcher(
+            self._search_vectors,
+            max_batch_size=settings.query_batch_max_size,
+            window_ms=settings.query_batch_window_ms
+        )
 
-        self._load_bm25_index()
+        self._load_lexical_index()
+        self._load_token_store()
+        self._memory_bytes = self._estimate_memory_bytes()
     
-    def _load_bm25_index(self):
-        print("📚 Building BM25 index...")
-        query = "SELECT vector_id, chunk_text, document_name FROM document_chunks ORDER BY vector_id"
-        self.metadata_store.cursor.execute(query)
-        all_chunks = self.metadata_store.cursor.fetchall()
-        
-        self.chunk_map = {} 
-        tokenized_corpus = []
-        
-        if not all_chunks:
+    def _load_lexical_index(self):
+        """Open the persisted BM25 index; rebuild it from MySQL only if it was never saved."""
+        self.sparse_index = None
+        if settings.lexical_channel == "bge_m3_sparse":
+            path = sparse_index_path(self.collection)
+            if os.path.exists(path):
+                # Learned weights replace BM25 as the lexical channel, so BM25 is not loaded
+                self.sparse_index = LearnedSparseIndex.load(path)
+                self.bm25 = None
+                print(f"✅ Sparse lexical index loaded with {len(self.sparse_index)} chunks")
+                return
+            print(f"⚠️ No sparse index for '{self.collection}', falling back to BM25 (re-index to build it).")
+
+        path = lexical_index_path(self.collection)
+        if os.path.exists(path):
+            self.bm25 = LexicalIndex.load(path)
+            print(f"✅ BM25 index loaded with {len(self.bm25)} chunks")
+        else:
+            print(f"📚 Building BM25 index for '{self.collection}' from MySQL...")
+            all_chunks = self.metadata_store.fetch_collection_chunks(self.collection)
+            self.bm25 = LexicalIndex.build(all_chunks)
+            if all_chunks:
+                self.bm25.save(path)
+            print(f"✅ BM25 index built with {len(self.bm25)} chunks")
+
+        if len(self.bm25) == 0:
             self.bm25 = None
-            self.vector_ids = []
+
+    def _load_token_store(self):
+        """Pre-tokenized chunk ids for the reranker, if indexing produced them for this reranker model."""
+        self.token_store = None
+        path = rerank_tokens_path(self.collection)
+        if not settings.rerank_token_store or not os.path.exists(path):
+            return
+        store = RerankTokenStore.load(path)
+        if store.tokenizer_name != self.reranker.model_name:
+            print(f"⚠️ Reranker token store was built for {store.tokenizer_name!r}; ignoring it (re-index to rebuild).")
             return
+        self.token_store = store
+        print(f"✅ Reranker token store loaded with {len(store)} chunks")
 
-        for chunk in all_chunks:
-            vector_id = chunk['vector_id']
-            tokens = chunk['chunk_text'].lower().split()
-            tokenized_corpus.append(tokens)
-            
-            self.chunk_map[vector_id] = {
-                'text': chunk['chunk_text'], 
-                'document_name': chunk['document_name']
-            }
-        
-        self.bm25 = BM25Okapi(tokenized_corpus)
-        self.vector_ids = list(self.chunk_map.keys())
-        print(f"✅ BM25 index built with {len(tokenized_corpus)} chunks")
-    
-    def _reciprocal_rank_fusion(self, vector_ranks: Dict[int, int], bm25_ranks: Dict[int, int]) -> List[int]:
-        rrf_scores = {}
-        for vector_id, rank in vector_ranks.items():
-            rrf_scores[vector_id] = 1.0 / (self.rrf_k + rank)
-        for vector_id, rank in bm25_ranks.items():
-            if vector_id in rrf_scores:
-                rrf_scores[vector_id] += 1.0 / (self.rrf_k + rank)
-            else:
-                rrf_scores[vector_id] = 1.0 / (self.rrf_k + rank)
-        sorted_results = sorted(rrf_scores.items(), key=lambda x: x[1], reverse=True)
-        return [vid for vid, _ in sorted_results]
+    @contextmanager
+    def _metadata(self):
+        """
+        The MySQL store, held exclusively for one lookup: concurrent queries (worker
+        threads, the micro-batcher) would otherwise interleave on its single cursor.
+        Reconnected for a lookup that arrives after close(), and closed again after it.
+        """
+        with self._store_lock:
+            if self.metadata_store is None:
+                self.metadata_store = MetadataStore()
+            try:
+                yield self.metadata_store
+            finally:
+                if self._closed:
+                    self._close_store()
+
+    def _close_store(self):
+        if self.metadata_store is not None:
+            self.metadata_store.close()
+            self.metadata_store = None
+
+    def close(self):
+        """Release the MySQL connection, once an in-flight lookup is done (the collection was dropped)."""
+        with self._store_lock:
+            self._closed = True
+            self._close_store()
+
+    def memory_bytes(self) -> int:
+        """Estimated resident size of this collection's indexes."""
+        return self._memory_bytes
+
+    def _estimate_memory_bytes(self) -> int:
+        vector_bytes = self.index.ntotal * self.index.d * 4 if self.index is not None else 0
+        lexical_bytes = self.bm25.nbytes() if self.bm25 is not None else 0
+        sparse_bytes = self.sparse_index.nbytes() if self.sparse_index is not None else 0
+        token_bytes = self.token_store.nbytes() if self.token_store is not None else 0
+        return vector_bytes + lexical_bytes + sparse_bytes + token_bytes
     
-    def search(self, query_vector: np.ndarray, query_text: str, target_document: Optional[str] = None):
-        if not self.index or not self.bm25:
+    def _search_vectors(self, requests):
+        """
+        One batched FAISS search for a micro-batch of (query vector, k) requests;
+        every request gets its own (distances, indices) row pair, cut to its k.
+        """
+        queries = np.vstack([vector for vector, _ in requests]).astype(np.float32)
+        distances, indices = self.index.search(queries, max(k for _, k in requests))
+        return [(distances[i:i + 1, :k], indices[i:i + 1, :k]) for i, (_, k) in enumerate(requests)]
+
+    def _fuse(self, vector_ids: List[np.ndarray], vector_distances: List[np.ndarray],
+              lexical_ids: List[np.ndarray], lexical_scores: List[np.ndarray]):
+        """(fused candidate ids, fused scores) of one or more vector and lexical lists, best first."""
+        if settings.fusion_method == "weighted":
+            w = settings.fusion_vector_weight
+            # Each channel keeps its share however many query variants it ranked
+            weights = [w / len(vector_ids)] * len(vector_ids) + [(1.0 - w) / len(lexical_ids)] * len(lexical_ids)
+            # L2 distance: smaller is better, so negate it into a similarity
+            return weighted_score_fusion(
+                vector_ids + lexical_ids, [-d for d in vector_distances] + lexical_scores, weights
+            )
+        return reciprocal_rank_fusion(vector_ids + lexical_ids, k=self.rrf_k)
+
+    def _assemble_candidates(self, ranked_ids: np.ndarray, ranked_scores: np.ndarray,
+                             target_document: Optional[str]):
+        """
+        (rows, fused scores) of the ranked ids in rank order;
+        ids without a row (or outside target_document) drop out.
+        """
+        with self._metadata() as store:
+            rows = store.fetch_by_vector_ids(
+                ranked_ids.tolist(), self.collection, document_name=target_document
+            )
+        if not rows:
+            return [], np.zeros(0)
+
+        row_ids = np.fromiter((r['vector_id'] for r in rows), dtype=np.int64, count=len(rows))
+        by_id = np.argsort(row_ids)
+        pos = np.searchsorted(row_ids, ranked_ids, sorter=by_id).clip(max=len(rows) - 1)
+        found = row_ids[by_id[pos]] == ranked_ids
+        return [rows[i] for i in by_id[pos[found]]], ranked_scores[found]
+
+    def _candidate_embeddings(self, vector_ids: np.ndarray) -> np.ndarray:
+        """Stored (normalized) embeddings of the candidates, read back from the flat FAISS index."""
+        try:
+            return self.index.reconstruct_batch(vector_ids)
+        except AttributeError:
+            return np.vstack([self.index.reconstruct(int(vid)) for vid in vector_ids])
+
+    def _diversify(self, candidates: List[Dict], fused_scores: np.ndarray):
+        """Drop near-duplicate candidates and spread the rest across documents (order is kept)."""
+        if not settings.diversify_candidates or len(candidates) < 2:
+            return candidates, fused_scores
+        vector_ids = np.fromiter((c['vector_id'] for c in candidates), dtype=np.int64, count=len(candidates))
+        positions = diversify(
+            self._candidate_embeddings(vector_ids),
+            fused_scores,
+            [c['document_name'] for c in candidates],
+            dedup_threshold=settings.dedup_threshold,
+            max_candidates=settings.mmr_max_candidates,
+            lambda_=settings.mmr_lambda,
+            doc_penalty=settings.mmr_doc_penalty
+        )
+        return [candidates[i] for i in positions], fused_scores[positions]
+
+    def search(self, query_vector: np.ndarray, query_text: str, target_document: Optional[str] = None,
+               query_sparse: Optional[Dict[int, float]] = None):
+        if not self.index or (not self.bm25 and not self.sparse_index):
             return []
 
-        # --- LATENCY FIX ---
-        # Reduced from 150 to 50. 
-        # This makes the Reranker run 3x faster.
-        k_retrieve = 50 
-        k_retrieve = min(k_retrieve, self.index.ntotal)
+        # Candidates per channel (50 keeps the reranker fast; see settings.k_retrieve)
+        k_retrieve = min(self.k_retrieve, self.index.ntotal)
         
         if k_retrieve == 0: return []
 
         # Vector Search
-        distances, indices = self.index.search(query_vector, k_retrieve)
-        vector_ranks = {int(idx): rank for rank, idx in enumerate(indices[0], start=1) if idx != -1}
+        distances, indices = self.vector_batcher.submit((query_vector, k_retrieve))
+        valid = indices[0] != -1
+        vector_ids = indices[0][valid].astype(np.int64)
+        vector_distances = distances[0][valid]
         
-        # BM25 Search
-        query_tokens = query_text.lower().split()
-        bm25_scores = self.bm25.get_scores(query_tokens)
-        bm25_top_indices = np.argsort(bm25_scores)[::-1][:k_retrieve]
-        bm25_ranks = {self.vector_ids[idx]: rank for rank, idx in enumerate(bm25_top_indices, start=1)}
+        # Lexical Search: bge-m3 learned weights when available, else BM25
+        # (either way only the postings of the query terms are scored)
+        if self.sparse_index is not None and query_sparse is not None:
+            lexical_ids, lexical_scores = self.sparse_index.top_k(query_sparse, k_retrieve, with_scores=True)
+        elif self.bm25:
+            lexical_ids, lexical_scores = self.bm25.top_k(query_text, k_retrieve, with_scores=True)
+        else:
+            lexical_ids, lexical_scores = np.zeros(0, dtype=np.int64), np.zeros(0)
         
         # Fusion
-        ranked_vector_ids = self._reciprocal_rank_fusion(vector_ranks, bm25_ranks)
-        
-        # Fetch Content
-        results = self.metadata_store.fetch_by_vector_ids(ranked_vector_ids)
-        results_dict = {r['vector_id']: r for r in results}
-        
-        # Filter Candidates
-        candidates = []
-        for vid in ranked_vector_ids:
-            if vid in results_dict:
-                chunk = results_dict[vid]
-                if target_document and chunk['document_name'] != target_document:
-                    continue
-                candidates.append(chunk)
+        ranked_ids, ranked_scores = self._fuse([vector_ids], [vector_distances], [lexical_ids], [lexical_scores])
+        return self._rerank(query_text, ranked_ids, ranked_scores, target_document)
+
+    def search_multi(self, query_vectors: np.ndarray, query_texts: List[str], target_document: Optional[str] = None,
+                     query_sparse: Optional[List[Optional[Dict[int, float]]]] = None,
+                     rerank_query: Optional[str] = None):
+        """
+        Multi-query retrieval: every query variant (one row of query_vectors per text)
+        is searched in one batched FAISS call and one vectorized lexical pass, and all
+        the ranked lists are fused together. Reranking uses rerank_query (default: the first text).
+        """
+        if not self.index or (not self.bm25 and not self.sparse_index):
+            return []
+        k_retrieve = min(self.k_retrieve, self.index.ntotal)
+        if k_retrieve == 0: return []
+
+        distances, indices = self.index.search(np.asarray(query_vectors, dtype=np.float32), k_retrieve)
+        valid = indices != -1
+        vector_ids = [row[mask].astype(np.int64) for row, mask in zip(indices, valid)]
+        vector_distances = [row[mask] for row, mask in zip(distances, valid)]
+
+        if self.sparse_index is not None and query_sparse is not None and all(w is not None for w in query_sparse):
+            lexical = self.sparse_index.top_k_many(query_sparse, k_retrieve)
+        elif self.bm25:
+            lexical = self.bm25.top_k_many(query_texts, k_retrieve)
+        else:
+            lexical = [(np.zeros(0, dtype=np.int64), np.zeros(0))]
+
+        ranked_ids, ranked_scores = self._fuse(
+            vector_ids, vector_distances, [ids for ids, _ in lexical], [scores for _, scores in lexical]
+        )
+        return self._rerank(rerank_query or query_texts[0], ranked_ids, ranked_scores, target_document)
+
+    def _rerank(self, query_text: str, ranked_ids: np.ndarray, ranked_scores: np.ndarray,
+                target_document: Optional[str]):
+        """Fused ids -> the top_k reranked chunk rows (with 'score')."""
+        # Fetch Content & Filter Candidates
+        candidates, fused_scores = self._assemble_candidates(ranked_ids, ranked_scores, target_document)
 
         if not candidates:
             return []
 
-        # 2. RERANKING (GPU Accelerated)
-        rerank_pairs = [[query_text, c['chunk_text']] for c in candidates]
-        
-        # Predict scores
-        scores = self.reranker.predict(rerank_pairs, batch_size=32, show_progress_bar=False)
+        # Near-copies would be scored separately and crowd each other into the top-k
+        candidates, fused_scores = self._diversify(candidates, fused_scores)
+
+        # 2. RERANKING: cheap first stage prunes, the full reranker scores the survivors
+        token_ids = self.token_store.rows([c['vector_id'] for c in candidates]) if self.token_store else None
+        positions, scores = self.cascade.rerank(query_text, candidates, fused_scores, token_ids)
         
-        for i, chunk in enumerate(candidates):
+        # Best top_k by reranker score (stable for ties)
+        results = []
+        for i in top_k_order(scores, self.top_k):
+            chunk = candidates[positions[i]]
             chunk['score'] = scores[i]
-            
-        # Sort by Reranker Score
-        reranked_results = sorted(candidates, key=lambda x: x['score'], reverse=True)
+            results.append(chunk)
         
-        return reranked_results[:self.top_k]
\ No newline at end of file
+        return results
@@ -0,0 +1,545 @@
+# retrieval/lexical_index.py
+
+import json
+import math
+import os
+from collections import Counter
+from pathlib import Path
+from typing import Dict, List, Sequence
+
+import numpy as np
+
+
+def tokenize(text: str) -> List[str]:
+    """Tokenizer shared by indexing and querying."""
+    return text.lower().split()
+
+
+def _rank_top_k(docs: np.ndarray, scores: np.ndarray, k: int):
+    """Top-k (docs, scores) by score desc, ties by doc index desc."""
+    if len(docs) > k:
+        part = np.argpartition(-scores, k - 1)[:k]
+        # Keep every doc tied with the k-th score so tie-breaking stays exact
+        keep = scores >= scores[part].min()
+        docs, scores = docs[keep], scores[keep]
+    order = np.lexsort((-docs.astype(np.int64), -scores))[:k]
+    return docs[order], scores[order]
+
+
+def _rank_top_k_many(query_of_posting: np.ndarray, docs: np.ndarray, weights: np.ndarray,
+                     n_queries: int, n_docs: int, k: int):
+    """
+    Per-query top-k (docs, scores) of several queries' postings in one pass:
+    postings are keyed by (query, doc), summed with a single bincount and cut
+    per query. Only positively scored documents are returned.
+    """
+    if len(docs) == 0 or k <= 0:
+        empty = (np.zeros(0, dtype=np.int64), np.zeros(0))
+        return [empty for _ in range(n_queries)]
+    keys = query_of_posting.astype(np.int64) * n_docs + docs
+    matched, inverse = np.unique(keys, return_inverse=True)
+    # Within a key, bincount still sums in query term order
+    scores = np.bincount(inverse.ravel(), weights=weights, minlength=len(matched))
+    bounds = np.searchsorted(matched // n_docs, np.arange(n_queries + 1))
+    matched_docs = matched % n_docs
+
+    results = []
+    for start, end in zip(bounds[:-1], bounds[1:]):
+        q_docs, q_scores = matched_docs[start:end], scores[start:end]
+        positive = q_scores > 0
+        result, result_scores = _rank_top_k(q_docs[positive], q_scores[positive], k)
+        results.append((result.astype(np.int64), result_scores))
+    return results
+
+
+def _remap_removed(n_docs: int, doc_indices: Sequence[int]):
+    """Mask of removed docs and the new position of every surviving doc."""
+    removed = np.zeros(n_docs, dtype=bool)
+    removed[np.asarray(doc_indices, dtype=np.int64)] = True
+    return removed, np.cumsum(~removed) - 1
+
+
+class SparseBM25:
+    """
+    Okapi BM25 over a CSR term -> document matrix.
+
+    BM25 weights are precomputed per posting, so a query only touches the
+    postings of its own terms instead of looping over the whole corpus.
+    Scores are bit-identical to rank_bm25.BM25Okapi (same k1, b, epsilon
+    and the same order of floating point operations).
+    """
+
+    def __init__(self, tokenized_corpus: Sequence[Sequence[str]], k1: float = 1.5, b: float = 0.75,
+                 epsilon: float = 0.25):
+        self.k1 = k1
+        self.b = b
+        self.epsilon = epsilon
+        self._build(tokenized_corpus)
+        self._compute_weights()
+
+    @property
+    def corpus_size(self) -> int:
+        return len(self.doc_len)
+
+    def _build(self, tokenized_corpus: Sequence[Sequence[str]]):
+        # Term ids follow first appearance, like the document frequency dict of BM25Okapi
+        self.term_ids: Dict[str, int] = {}
+        rows, cols, tfs, doc_len = self._count_terms(tokenized_corpus, doc_offset=0)
+        self.doc_len = doc_len
+        self._set_postings(rows, cols, tfs)
+
+    def _count_terms(self, tokenized_docs: Sequence[Sequence[str]], doc_offset: int):
+        """COO triplets (term, doc, tf) for new documents; unseen terms get new ids."""
+        rows, cols, tfs, doc_len = [], [], [], []
+        for doc_idx, tokens in enumerate(tokenized_docs, start=doc_offset):
+            doc_len.append(len(tokens))
+            for term, tf in Counter(tokens).items():
+                term_id = self.term_ids.get(term)
+                if term_id is None:
+                    term_id = len(self.term_ids)
+                    self.term_ids[term] = term_id
+                rows.append(term_id)
+                cols.append(doc_idx)
+                tfs.append(tf)
+        return (np.asarray(rows, dtype=np.int64), np.asarray(cols, dtype=np.int32),
+                np.asarray(tfs, dtype=np.int32), np.asarray(doc_len, dtype=np.int64))
+
+    def _set_postings(self, rows: np.ndarray, cols: np.ndarray, tfs: np.ndarray):
+        order = np.lexsort((cols, rows))
+        self.postings_doc = cols[order]
+        self.postings_tf = tfs[order]
+        self.indptr = np.zeros(len(self.term_ids) + 1, dtype=np.int64)
+        np.cumsum(np.bincount(rows, minlength=len(self.term_ids)), out=self.indptr[1:])
+
+    def _posting_rows(self) -> np.ndarray:
+        return np.repeat(np.arange(len(self.term_ids), dtype=np.int64), np.diff(self.indptr))
+
+    def add_documents(self, tokenized_docs: Sequence[Sequence[str]]):
+        """Append documents; existing postings are merged, not re-tokenized."""
+        existing_rows = self._posting_rows()
+        rows, cols, tfs, doc_len = self._count_terms(tokenized_docs, doc_offset=self.corpus_size)
+        self.doc_len = np.concatenate([self.doc_len, doc_len])
+        self._set_postings(
+            np.concatenate([existing_rows, rows]),
+            np.concatenate([self.postings_doc, cols]),
+            np.concatenate([self.postings_tf, tfs])
+        )
+        self._compute_weights()
+
+    def remove_documents(self, doc_indices: Sequence[int]):
+        """Drop documents by position; later documents shift down to stay contiguous."""
+        removed, new_doc_idx = _remap_removed(self.corpus_size, doc_indices)
+        if not removed.any():
+            return
+
+        keep = ~removed[self.postings_doc]
+        rows = self._posting_rows()[keep]
+
+        # Forget terms that no longer occur anywhere, as a fresh build would
+        live_terms = np.bincount(rows, minlength=len(self.term_ids)) > 0
+        new_term_id = np.cumsum(live_terms) - 1
+        terms = list(self.term_ids)
+        self.term_ids = {terms[t]: i for i, t in enumerate(np.flatnonzero(live_terms).tolist())}
+
+        self.doc_len = self.doc_len[~removed]
+        self._set_postings(
+            new_term_id[rows],
+            new_doc_idx[self.postings_doc[keep]].astype(np.int32),
+            self.postings_tf[keep]
+        )
+        self._compute_weights()
+
+    def _compute_weights(self):
+        n_docs = self.corpus_size
+        if n_docs == 0:
+            self.avgdl = 0.0
+            self.idf = np.zeros(len(self.term_ids), dtype=np.float64)
+            self.postings_weight = np.zeros(0, dtype=np.float64)
+            return
+
+        # math.log keeps the idf values identical to BM25Okapi
+        doc_freqs = np.diff(self.indptr).tolist()
+        idf = [math.log(n_docs - df + 0.5) - math.log(df + 0.5) for df in doc_freqs]
+        average_idf = sum(idf) / len(idf) if idf else 0.0
+        eps = self.epsilon * average_idf
+        self.idf = np.asarray([eps if value < 0 else value for value in idf], dtype=np.float64)
+        self._compute_posting_weights()
+
+    def _compute_posting_weights(self):
+        self.avgdl = int(self.doc_len.sum()) / self.corpus_size if self.corpus_size else 0.0
+        term_of_posting = np.repeat(self.idf, np.diff(self.indptr))
+        tf = self.postings_tf.astype(np.float64)
+        dl = self.doc_len[self.postings_doc]
+        self.postings_weight = term_of_posting * (
+            tf * (self.k1 + 1) / (tf + self.k1 * (1 - self.b + self.b * dl / self.avgdl))
+        )
+
+    def _query_postings(self, query_tokens: Sequence[str]):
+        """Concatenated (doc, weight) postings of the query terms, in query order."""
+        slices = []
+        for token in query_tokens:
+            term_id = self.term_ids.get(token)
+            if term_id is not None:
+                slices.append((self.indptr[term_id], self.indptr[term_id + 1]))
+        if not slices:
+            return np.zeros(0, dtype=np.int32), np.zeros(0, dtype=np.float64)
+        docs = np.concatenate([self.postings_doc[s:e] for s, e in slices])
+        weights = np.concatenate([self.postings_weight[s:e] for s, e in slices])
+        return docs, weights
+
+    def score_matches(self, query_tokens: Sequence[str]):
+        """BM25 scores of the documents containing at least one query term."""
+        docs, weights = self._query_postings(query_tokens)
+        if len(docs) == 0:
+            return docs, weights
+        matched, inverse = np.unique(docs, return_inverse=True)
+        # bincount sums in posting order, i.e. in query term order like BM25Okapi
+        scores = np.bincount(inverse.ravel(), weights=weights, minlength=len(matched))
+        return matched, scores
+
+    def get_scores(self, query_tokens: Sequence[str]) -> np.ndarray:
+        """Dense score vector over the whole corpus (BM25Okapi.get_scores)."""
+        scores = np.zeros(self.corpus_size)
+        matched, matched_scores = self.score_matches(query_tokens)
+        scores[matched] = matched_scores
+        return scores
+
+    def top_k(self, query_tokens: Sequence[str], k: int, with_scores: bool = False):
+        """
+        Indices of the k best documents (and their scores if with_scores).
+        Same result as np.argsort(get_scores(q), kind="stable")[::-1][:k],
+        including the zero-score documents that pad short result lists.
+        """
+        k = min(k, self.corpus_size)
+        if k <= 0:
+            empty = np.zeros(0, dtype=np.int64)
+            return (empty, np.zeros(0)) if with_scores else empty
+
+        matched, scores = self.score_matches(query_tokens)
+        positive = scores > 0
+        negative = scores < 0
+
+        result, result_scores = _rank_top_k(matched[positive], scores[positive], k)
+        if len(result) < k:
+            # Zero-score documents, highest index first
+            nonzero = matched[positive | negative]
+            needed = k - len(result)
+            stop = max(-1, self.corpus_size - 1 - needed - len(nonzero))
+            zeros = np.arange(self.corpus_size - 1, stop, -1)
+            zeros = zeros[~np.isin(zeros, nonzero)][:needed]
+            result = np.concatenate([result, zeros])
+            result_scores = np.concatenate([result_scores, np.zeros(len(zeros))])
+        if len(result) < k:
+            tail, tail_scores = _rank_top_k(matched[negative], scores[negative], k - len(result))
+            result = np.concatenate([result, tail])
+            result_scores = np.concatenate([result_scores, tail_scores])
+        result = result.astype(np.int64)
+        return (result, result_scores) if with_scores else result
+
+    def top_k_many(self, queries_tokens: Sequence[Sequence[str]], k: int):
+        """
+        [(docs, scores)] of the k best positively scored documents of each query,
+        scored together in one vectorized pass (multi-query retrieval).
+        """
+        postings = [self._query_postings(tokens) for tokens in queries_tokens]
+        docs = np.concatenate([d for d, _ in postings]) if postings else np.zeros(0, dtype=np.int32)
+        weights = np.concatenate([w for _, w in postings]) if postings else np.zeros(0)
+        query_of_posting = np.repeat(np.arange(len(postings)), [len(d) for d, _ in postings])
+        return _rank_top_k_many(query_of_posting, docs, weights, len(postings), self.corpus_size, k)
+
+    def nbytes(self) -> int:
+        """Approximate resident size (arrays plus vocabulary)."""
+        arrays = (self.indptr, self.postings_doc, self.postings_tf, self.postings_weight, self.idf, self.doc_len)
+        vocab = sum(len(term) + 80 for term in self.term_ids)
+        return sum(a.nbytes for a in arrays) + vocab
+
+    def to_arrays(self) -> Dict[str, np.ndarray]:
+        # Tokens never contain whitespace, so the vocabulary is stored as one newline-joined blob
+        vocab = "\n".join(self.term_ids).encode("utf-8")
+        return {
+            "bm25_params": np.array([self.k1, self.b, self.epsilon], dtype=np.float64),
+            "vocab": np.frombuffer(vocab, dtype=np.uint8),
+            "indptr": self.indptr,
+            "postings_doc": self.postings_doc,
+            "postings_tf": self.postings_tf,
+            "doc_len": self.doc_len,
+            "idf": self.idf,
+        }
+
+    @classmethod
+    def empty(cls) -> "SparseBM25":
+        return cls([])
+
+    @classmethod
+    def from_arrays(cls, arrays) -> "SparseBM25":
+        bm25 = cls.__new__(cls)
+        bm25.k1, bm25.b, bm25.epsilon = (float(v) for v in arrays["bm25_params"])
+        vocab = arrays["vocab"].tobytes().decode("utf-8")
+        terms = vocab.split("\n") if vocab else []
+        bm25.term_ids = {term: i for i, term in enumerate(terms)}
+        bm25.indptr = arrays["indptr"]
+        bm25.postings_doc = arrays["postings_doc"]
+        bm25.postings_tf = arrays["postings_tf"]
+        bm25.doc_len = arrays["doc_len"]
+        bm25.idf = arrays["idf"]
+        bm25._compute_posting_weights()
+        return bm25
+
+
+class SparseWeightIndex:
+    """
+    Inverted index of learned lexical weights (bge-m3 sparse output).
+    Rows are tokenizer ids, so no separate vocabulary is needed; the
+    score of a document is the dot product of query and document weights.
+    """
+
+    def __init__(self):
+        self.indptr = np.zeros(1, dtype=np.int64)
+        self.postings_doc = np.zeros(0, dtype=np.int32)
+        self.postings_weight = np.zeros(0, dtype=np.float32)
+        self.n_docs = 0
+
+    @property
+    def corpus_size(self) -> int:
+        return self.n_docs
+
+    @classmethod
+    def empty(cls) -> "SparseWeightIndex":
+        return cls()
+
+    def _posting_rows(self) -> np.ndarray:
+        return np.repeat(np.arange(len(self.indptr) - 1, dtype=np.int64), np.diff(self.indptr))
+
+    def _set_postings(self, rows: np.ndarray, cols: np.ndarray, weights: np.ndarray):
+        n_rows = max(len(self.indptr) - 1, int(rows.max()) + 1 if len(rows) else 0)
+        order = np.lexsort((cols, rows))
+        self.postings_doc = cols[order]
+        self.postings_weight = weights[order]
+        self.indptr = np.zeros(n_rows + 1, dtype=np.int64)
+        np.cumsum(np.bincount(rows, minlength=n_rows), out=self.indptr[1:])
+
+    def add_documents(self, weight_dicts: Sequence[Dict[int, float]]):
+        rows, cols, weights = [], [], []
+        for doc_idx, token_weights in enumerate(weight_dicts, start=self.n_docs):
+            rows.extend(token_weights.keys())
+            cols.extend([doc_idx] * len(token_weights))
+            weights.extend(token_weights.values())
+        self.n_docs += len(weight_dicts)
+        self._set_postings(
+            np.concatenate([self._posting_rows(), np.asarray(rows, dtype=np.int64)]),
+            np.concatenate([self.postings_doc, np.asarray(cols, dtype=np.int32)]),
+            np.concatenate([self.postings_weight, np.asarray(weights, dtype=np.float32)])
+        )
+
+    def remove_documents(self, doc_indices: Sequence[int]):
+        removed, new_doc_idx = _remap_removed(self.n_docs, doc_indices)
+        if not removed.any():
+            return
+        keep = ~removed[self.postings_doc]
+        rows = self._posting_rows()[keep]
+        self.n_docs = int((~removed).sum())
+        self._set_postings(
+            rows,
+            new_doc_idx[self.postings_doc[keep]].astype(np.int32),
+            self.postings_weight[keep]
+        )
+
+    def _query_postings(self, query_weights: Dict[int, float]):
+        """Concatenated (doc, query weight * doc weight) postings of the query tokens."""
+        n_rows = len(self.indptr) - 1
+        slices, q_weights = [], []
+        for token_id, weight in query_weights.items():
+            if 0 <= token_id < n_rows and self.indptr[token_id] < self.indptr[token_id + 1]:
+                slices.append((self.indptr[token_id], self.indptr[token_id + 1]))
+                q_weights.append(weight)
+        if not slices:
+            return np.zeros(0, dtype=np.int32), np.zeros(0, dtype=np.float64)
+
+        docs = np.concatenate([self.postings_doc[s:e] for s, e in slices])
+        lengths = np.array([e - s for s, e in slices])
+        weights = np.concatenate([self.postings_weight[s:e] for s, e in slices]).astype(np.float64)
+        weights *= np.repeat(np.asarray(q_weights, dtype=np.float64), lengths)
+        return docs, weights
+
+    def top_k(self, query_weights: Dict[int, float], k: int, with_scores: bool = False):
+        """Positions of the k documents with the highest weight dot product (and the products)."""
+        docs, weights = self._query_postings(query_weights)
+        if len(docs) == 0 or k <= 0:
+            empty = np.zeros(0, dtype=np.int64)
+            return (empty, np.zeros(0)) if with_scores else empty
+
+        matched, inverse = np.unique(docs, return_inverse=True)
+        scores = np.bincount(inverse.ravel(), weights=weights, minlength=len(matched))
+        positive = scores > 0
+        result, result_scores = _rank_top_k(matched[positive], scores[positive], k)
+        result = result.astype(np.int64)
+        return (result, result_scores) if with_scores else result
+
+    def top_k_many(self, queries_weights: Sequence[Dict[int, float]], k: int):
+        """[(docs, scores)] of each query's k best dot-product matches, scored in one pass."""
+        postings = [self._query_postings(weights) for weights in queries_weights]
+        docs = np.concatenate([d for d, _ in postings]) if postings else np.zeros(0, dtype=np.int32)
+        weights = np.concatenate([w for _, w in postings]) if postings else np.zeros(0)
+        query_of_posting = np.repeat(np.arange(len(postings)), [len(d) for d, _ in postings])
+        return _rank_top_k_many(query_of_posting, docs, weights, len(postings), self.corpus_size, k)
+
+    def nbytes(self) -> int:
+        return self.indptr.nbytes + self.postings_doc.nbytes + self.postings_weight.nbytes
+
+    def to_arrays(self) -> Dict[str, np.ndarray]:
+        return {
+            "indptr": self.indptr,
+            "postings_doc": self.postings_doc,
+            "postings_weight": self.postings_weight,
+            "n_docs": np.array([self.n_docs], dtype=np.int64),
+        }
+
+    @classmethod
+    def from_arrays(cls, arrays) -> "SparseWeightIndex":
+        index = cls()
+        index.indptr = arrays["indptr"]
+        index.postings_doc = arrays["postings_doc"]
+        index.postings_weight = arrays["postings_weight"]
+        index.n_docs = int(arrays["n_docs"][0])
+        return index
+
+
+class _ChunkIndex:
+    """
+    Maps the rows of a lexical engine to FAISS vector ids and document
+    names, and handles persistence and per-document updates.
+    """
+
+    engine_cls = None
+
+    def __init__(self, engine, vector_ids: np.ndarray, document_names: List[str],
+                 doc_name_ids: np.ndarray):
+        self.engine = engine
+        self.vector_ids = vector_ids
+        self.document_names = document_names
+        self.doc_name_ids = doc_name_ids
+
+    @classmethod
+    def build(cls, chunks: Sequence[Dict]):
+        index = cls(cls.engine_cls.empty(), np.zeros(0, dtype=np.int64), [], np.zeros(0, dtype=np.int32))
+        index.add_chunks(chunks)
+        return index
+
+    def __len__(self) -> int:
+        return len(self.vector_ids)
+
+    def _engine_documents(self, chunks: Sequence[Dict]) -> list:
+        raise NotImplementedError
+
+    def _name_ids(self, chunks: Sequence[Dict]) -> np.ndarray:
+        lookup = {name: i for i, name in enumerate(self.document_names)}
+        ids = []
+        for chunk in chunks:
+            name = chunk["document_name"]
+            if name not in lookup:
+                lookup[name] = len(self.document_names)
+                self.document_names.append(name)
+            ids.append(lookup[name])
+        return np.asarray(ids, dtype=np.int32)
+
+    def add_chunks(self, chunks: Sequence[Dict]):
+        if not chunks:
+            return
+        self.doc_name_ids = np.concatenate([self.doc_name_ids, self._name_ids(chunks)])
+        self.vector_ids = np.concatenate([
+            self.vector_ids, np.asarray([c["vector_id"] for c in chunks], dtype=np.int64)
+        ])
+        self.engine.add_documents(self._engine_documents(chunks))
+
+    def remove_document(self, document_name: str) -> int:
+        """Remove every chunk of a document. Returns the number of chunks removed."""
+        if document_name not in self.document_names:
+            return 0
+        name_id = self.document_names.index(document_name)
+        positions = np.flatnonzero(self.doc_name_ids == name_id)
+        if len(positions):
+            keep = np.ones(len(self.vector_ids), dtype=bool)
+            keep[positions] = False
+            self.vector_ids = self.vector_ids[keep]
+            self.doc_name_ids = self.doc_name_ids[keep]
+            self.engine.remove_documents(positions)
+        return len(positions)
+
+    def nbytes(self) -> int:
+        return self.engine.nbytes() + self.vector_ids.nbytes + self.doc_name_ids.nbytes
+
+    def save(self, path: str):
+        """Write atomically so a serving process never reads a half-written file."""
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        names = json.dumps(self.document_names, ensure_ascii=False).encode("utf-8")
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "wb") as f:
+            np.savez(
+                f,
+                vector_ids=self.vector_ids,
+                doc_name_ids=self.doc_name_ids,
+                document_names=np.frombuffer(names, dtype=np.uint8),
+                **self.engine.to_arrays()
+            )
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path: str):
+        with np.load(path) as arrays:
+            names = json.loads(arrays["document_names"].tobytes().decode("utf-8"))
+            return cls(
+                cls.engine_cls.from_arrays(arrays),
+                arrays["vector_ids"],
+                names,
+                arrays["doc_name_ids"]
+            )
+
+
+class LexicalIndex(_ChunkIndex):
+    """
+    BM25 index of one collection, keyed by FAISS vector id.
+    Built at indexing time, saved next to the FAISS index and updated
+    in place when documents are added or removed, so serving never has
+    to pull the corpus out of MySQL.
+    """
+
+    engine_cls = SparseBM25
+
+    def _engine_documents(self, chunks: Sequence[Dict]) -> list:
+        return [tokenize(c["chunk_text"]) for c in chunks]
+
+    def top_k(self, query_text: str, k: int, with_scores: bool = False):
+        """Vector ids of the k best BM25 matches (plus their BM25 scores if with_scores)."""
+        if with_scores:
+            positions, scores = self.engine.top_k(tokenize(query_text), k, with_scores=True)
+            return self.vector_ids[positions], scores
+        return self.vector_ids[self.engine.top_k(tokenize(query_text), k)]
+
+    def top_k_many(self, query_texts: Sequence[str], k: int):
+        """[(vector ids, BM25 scores)] of each query's k best positive matches, scored in one pass."""
+        results = self.engine.top_k_many([tokenize(text) for text in query_texts], k)
+        return [(self.vector_ids[positions], scores) for positions, scores in results]
+
+
+class LearnedSparseIndex(_ChunkIndex):
+    """
+    bge-m3 lexical weights of one collection, keyed by FAISS vector id.
+    Chunks carry their weights under "sparse_weights" ({token_id: weight}).
+    """
+
+    engine_cls = SparseWeightIndex
+
+    def _engine_documents(self, chunks: Sequence[Dict]) -> list:
+        return [c["sparse_weights"] for c in chunks]
+
+    def top_k(self, query_weights: Dict[int, float], k: int, with_scores: bool = False):
+        """Vector ids of the k best weight dot-product matches (plus the products if with_scores)."""
+        if with_scores:
+            positions, scores = self.engine.top_k(query_weights, k, with_scores=True)
+            return self.vector_ids[positions], scores
+        return self.vector_ids[self.engine.top_k(query_weights, k)]
+
+    def top_k_many(self, queries_weights: Sequence[Dict[int, float]], k: int):
+        """[(vector ids, dot products)] of each query's k best matches, scored in one pass."""
+        results = self.engine.top_k_many(queries_weights, k)
+        return [(self.vector_ids[positions], scores) for positions, scores in results]
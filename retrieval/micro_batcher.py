@@ -0,0 +1,105 @@
+# retrieval/micro_batcher.py
+
+import threading
+import time
+from concurrent.futures import Future
+from typing import Any, Callable, Dict, List, Optional, Sequence
+
+
+class _Batch:
+    def __init__(self):
+        self.items: List[Any] = []
+        self.futures: List[Future] = []
+        self.full = threading.Event()
+
+
+class MicroBatcher:
+    """
+    Collects items submitted by concurrent request threads within a short
+    window (or until max_batch_size arrive) and runs them through one call
+    of batch_fn, which must return one result per item, in order.
+
+    The first thread to open a batch is its leader: it waits out the window,
+    runs the batch and hands every caller its own result. No background
+    thread is involved, so an idle batcher costs nothing and needs no shutdown.
+    A window of 0 or a max_batch_size of 1 disables batching.
+    """
+
+    def __init__(self, batch_fn: Callable[[Sequence[Any]], Sequence[Any]],
+                 max_batch_size: int = 16, window_ms: float = 2.0):
+        self.batch_fn = batch_fn
+        self.max_batch_size = max(1, int(max_batch_size))
+        self.window_ms = max(0.0, float(window_ms))
+
+        self._lock = threading.Lock()
+        self._open: Optional[_Batch] = None
+        self._histogram: Dict[int, int] = {}
+        self._items = 0
+        self._wait_seconds_total = 0.0
+
+    @property
+    def enabled(self) -> bool:
+        return self.window_ms > 0 and self.max_batch_size > 1
+
+    def submit(self, item: Any) -> Any:
+        """Result of batch_fn for this item (blocks for at most the window plus the batch run)."""
+        if not self.enabled:
+            self._record(1, 0.0)
+            return self.batch_fn([item])[0]
+
+        future: Future = Future()
+        with self._lock:
+            batch = self._open
+            leader = batch is None
+            if leader:
+                batch = self._open = _Batch()
+            batch.items.append(item)
+            batch.futures.append(future)
+            if len(batch.items) >= self.max_batch_size:
+                # Closed: the next caller opens a fresh batch
+                self._open = None
+                batch.full.set()
+
+        if leader:
+            start = time.perf_counter()
+            batch.full.wait(self.window_ms / 1000)
+            with self._lock:
+                if self._open is batch:
+                    self._open = None
+            self._record(len(batch.items), time.perf_counter() - start)
+            self._run(batch)
+
+        return future.result()
+
+    def _run(self, batch: _Batch):
+        try:
+            results = self.batch_fn(batch.items)
+            if len(results) != len(batch.items):
+                raise RuntimeError(f"Batch function returned {len(results)} results for {len(batch.items)} items")
+        except BaseException as e:
+            for future in batch.futures:
+                future.set_exception(e)
+            return
+        for future, result in zip(batch.futures, results):
+            future.set_result(result)
+
+    def _record(self, size: int, wait_seconds: float):
+        with self._lock:
+            self._histogram[size] = self._histogram.get(size, 0) + 1
+            self._items += size
+            self._wait_seconds_total += wait_seconds
+
+    def stats(self) -> dict:
+        with self._lock:
+            batches = sum(self._histogram.values())
+            return {
+                "enabled": self.enabled,
+                "window_ms": self.window_ms,
+                "max_batch_size": self.max_batch_size,
+                "batches": batches,
+                "items": self._items,
+                "mean_batch_size": self._items / batches if batches else 0.0,
+                "mean_window_wait_ms": self._wait_seconds_total * 1000 / batches if batches else 0.0,
+                # Batch size -> number of batches of that size
+                "histogram": {str(size): self._histogram[size] for size in sorted(self._histogram)},
+            }
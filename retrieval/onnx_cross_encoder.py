@@ -0,0 +1,72 @@
+# retrieval/onnx_cross_encoder.py
+
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+
+from indexing.onnx_utils import create_session, ensure_onnx_model, export_onnx
+
+
+def export_cross_encoder(model_name: str, path: Path):
+    """Export the sequence-classification head (raw logits) of a cross-encoder."""
+    from transformers import AutoModelForSequenceClassification, AutoTokenizer
+
+    tokenizer = AutoTokenizer.from_pretrained(model_name)
+    model = AutoModelForSequenceClassification.from_pretrained(model_name).eval()
+    dummy = tokenizer(["query"], ["passage"], return_tensors="pt")
+    export_onnx(
+        model,
+        {"input_ids": dummy["input_ids"], "attention_mask": dummy["attention_mask"]},
+        ["logits"],
+        path,
+        dynamic_axes={
+            "input_ids": {0: "batch", 1: "sequence"},
+            "attention_mask": {0: "batch", 1: "sequence"},
+            "logits": {0: "batch"},
+        }
+    )
+
+
+class OnnxCrossEncoder:
+    """
+    ONNX Runtime drop-in for sentence_transformers.CrossEncoder.predict,
+    optionally int8-quantized. Like CrossEncoder with a single label (and no
+    activation configured), scores are the sigmoid of the logit, in [0, 1].
+    """
+
+    def __init__(self, model_name: str, quantize: bool = False, max_length: Optional[int] = None):
+        from transformers import AutoTokenizer
+
+        self.model_name = model_name
+        self.tokenizer = AutoTokenizer.from_pretrained(model_name)
+        self.max_length = max_length
+
+        path = ensure_onnx_model(model_name, quantize, lambda p: export_cross_encoder(model_name, p))
+        self.session = create_session(path)
+        self.input_names = {i.name for i in self.session.get_inputs()}
+        print(f"⚡ Reranker using ONNX Runtime ({'int8' if quantize else 'fp32'})")
+
+    def forward(self, features: Dict[str, np.ndarray]) -> np.ndarray:
+        """Scores (sigmoid of the logits) of one tokenized, padded batch."""
+        feeds = {name: array for name, array in features.items() if name in self.input_names}
+        logits = self.session.run(["logits"], feeds)[0][:, 0].astype(np.float64)
+        return 1.0 / (1.0 + np.exp(-logits))
+
+    def predict(self, sentences: Sequence[List[str]], batch_size: int = 32,
+                show_progress_bar: bool = False) -> np.ndarray:
+        scores = []
+        for start in range(0, len(sentences), batch_size):
+            batch = sentences[start:start + batch_size]
+            features = self.tokenizer(
+                [pair[0] for pair in batch],
+                [pair[1] for pair in batch],
+                padding=True,
+                truncation="longest_first",
+                max_length=self.max_length,
+                return_tensors="np"
+            )
+            scores.append(self.forward({name: array.astype(np.int64) for name, array in features.items()}))
+        if not scores:
+            return np.zeros(0, dtype=np.float32)
+        return np.concatenate(scores).astype(np.float32)
@@ -1,13 +1,152 @@
 # retrieval/query_embedder.py
 
+import json
+import os
+from pathlib import Path
+from typing import List, Optional
+
+from config.settings import settings
 from indexing.embedding_device import EmbeddingService
+from retrieval.lru_cache import LRUCache
+from retrieval.micro_batcher import MicroBatcher
+from retrieval.query_normalization import normalize_query
 import numpy as np
 
 class QueryEmbedder:
-    def __init__(self, model_name="BAAI/bge-m3"):
+    """
+    Query-side embeddings with an LRU cache keyed by (model, normalized query),
+    so repeated and trivially different questions skip the bge-m3 forward pass.
+    Cache misses from concurrent requests are micro-batched into one forward pass.
+    """
+
+    def __init__(self, model_name="BAAI/bge-m3",
+                 cache_entries: Optional[int] = None, cache_path: Optional[str] = None):
         self.embedder = EmbeddingService(model_name)
+        self.model_name = model_name
+
+        cache_entries = settings.query_embedding_cache_entries if cache_entries is None else cache_entries
+        self.cache = LRUCache(cache_entries) if cache_entries > 0 else None
+        self.cache_path = cache_path if cache_path is not None else settings.query_embedding_cache_path
+        self._unsaved = 0
+        if self.cache is not None and self.cache_path:
+            self._load_cache()
+
+        self.batcher = MicroBatcher(
+            self._compute_batch,
+            max_batch_size=settings.query_batch_max_size,
+            window_ms=settings.query_batch_window_ms
+        )
+
+    @property
+    def use_sparse(self) -> bool:
+        return self.embedder.use_sparse
+
+    def _cache_key(self, query: str):
+        # Sparse-enabled entries also carry lexical weights, so keep them apart
+        return (self.embedder.model_id, self.use_sparse, normalize_query(query))
+
+    def _compute_batch(self, queries):
+        """[(vector (1, dim) float32, lexical weights or None)] for a micro-batch of queries."""
+        unique = list(dict.fromkeys(queries))
+        if not self.use_sparse:
+            vectors, sparse = self.embedder.embed_queries(unique), [None] * len(unique)
+        else:
+            vectors, sparse = self.embedder.embed_queries_with_sparse(unique)
+        vectors = np.asarray(vectors, dtype=np.float32)
+        results = {query: (vectors[i:i + 1], sparse[i]) for i, query in enumerate(unique)}
+        return [results[query] for query in queries]
+
+    def _compute(self, query: str):
+        return self.batcher.submit(query)
+
+    def _lookup(self, query: str):
+        if self.cache is None:
+            return self._compute(query)
+        key = self._cache_key(query)
+        cached = self.cache.get(key)
+        if cached is None:
+            cached = self._compute(query)
+            self.cache.put(key, cached)
+            self._unsaved += 1
+        return cached
 
     def embed(self, query: str) -> np.ndarray:
         """Embed query (expansion handled by query_processor)"""
-        vec = self.embedder.embed_query(query)
-        return np.array([vec]).astype("float32")
\ No newline at end of file
+        return self._lookup(query)[0]
+
+    def embed_for_search(self, query: str):
+        """
+        (query vector, lexical weights) for HybridRetriever.search.
+        Lexical weights are None unless the bge-m3 sparse channel is enabled.
+        """
+        return self._lookup(query)
+
+    def embed_many_for_search(self, queries: List[str]):
+        """
+        (query vectors (n, dim), [lexical weights or None]) of several query variants;
+        cache misses share one forward pass.
+        """
+        results: List[Optional[tuple]] = [None] * len(queries)
+        missing = []
+        for i, query in enumerate(queries):
+            cached = self.cache.get(self._cache_key(query)) if self.cache is not None else None
+            if cached is None:
+                missing.append(i)
+            else:
+                results[i] = cached
+        if missing:
+            for i, computed in zip(missing, self._compute_batch([queries[i] for i in missing])):
+                results[i] = computed
+                if self.cache is not None:
+                    self.cache.put(self._cache_key(queries[i]), computed)
+                    self._unsaved += 1
+        return np.vstack([vec for vec, _ in results]), [sparse for _, sparse in results]
+
+    def batching_stats(self) -> dict:
+        return self.batcher.stats()
+
+    def cache_stats(self) -> dict:
+        if self.cache is None:
+            return {"enabled": False}
+        return {"enabled": True, "path": self.cache_path, **self.cache.stats()}
+
+    def _load_cache(self):
+        if not os.path.exists(self.cache_path):
+            return
+        try:
+            with np.load(self.cache_path) as arrays:
+                keys = json.loads(arrays["keys"].tobytes().decode("utf-8"))
+                sparse = json.loads(arrays["sparse"].tobytes().decode("utf-8"))
+                vectors = arrays["vectors"]
+        except (OSError, ValueError, KeyError) as e:
+            print(f"⚠️ Ignoring unreadable query embedding cache {self.cache_path}: {e}")
+            return
+        for (model_name, use_sparse, query), vec, weights in zip(keys, vectors, sparse):
+            if weights is not None:
+                weights = {int(token_id): weight for token_id, weight in weights.items()}
+            self.cache.put((model_name, use_sparse, query), (vec[None, :], weights))
+        print(f"✅ Query embedding cache loaded with {len(self.cache)} queries")
+
+    def save_cache(self):
+        """Snapshot the cache to disk (least recently used first) if new queries were embedded."""
+        if self.cache is None or not self.cache_path or self._unsaved == 0:
+            return
+        items = self.cache.items()
+        if not items:
+            return
+        keys = json.dumps([list(key) for key, _ in items], ensure_ascii=False).encode("utf-8")
+        sparse = json.dumps([weights for _, (_, weights) in items]).encode("utf-8")
+        vectors = np.vstack([vec for _, (vec, _) in items]).astype(np.float32)
+
+        Path(self.cache_path).parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = f"{self.cache_path}.tmp"
+        with open(tmp_path, "wb") as f:
+            np.savez(
+                f,
+                keys=np.frombuffer(keys, dtype=np.uint8),
+                sparse=np.frombuffer(sparse, dtype=np.uint8),
+                vectors=vectors
+            )
+        os.replace(tmp_path, self.cache_path)
+        self._unsaved = 0
+        print(f"💾 Query embedding cache saved ({len(items)} queries)")
@@ -0,0 +1,18 @@
+# retrieval/query_normalization.py
+
+import re
+import unicodedata
+
+_WHITESPACE = re.compile(r"\s+")
+_EDGE_PUNCTUATION = "?!.,;:。？！、 "
+
+
+def normalize_query(query: str) -> str:
+    """
+    Canonical form used as a cache key, so trivially different spellings of
+    the same question share entries: NFKC (full-width -> ASCII), case-folded,
+    whitespace collapsed, surrounding punctuation dropped.
+    """
+    text = unicodedata.normalize("NFKC", query).casefold()
+    text = _WHITESPACE.sub(" ", text)
+    return text.strip(_EDGE_PUNCTUATION)
@@ -0,0 +1,139 @@
+# retrieval/rerank_cascade.py
+
+import threading
+import time
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from config.settings import settings
+from retrieval.fusion import top_k_order
+from retrieval.reranker import Reranker
+
+FIRST_STAGES = ("none", "fusion", "cross_encoder")
+
+
+def cascade_cutoff(sorted_scores: np.ndarray, min_keep: int, max_keep: int,
+                   margin: float, gap: float) -> int:
+    """
+    How many of the best-first first-stage scores go on to the full reranker.
+    Scores are min-max normalized over the list; we keep those within `margin`
+    of the best one, stop early at the first drop of at least `gap`, and clamp
+    the result to [min_keep, max_keep].
+    """
+    n = len(sorted_scores)
+    if n <= min_keep:
+        return n
+    limit = min(n, max_keep)
+    span = sorted_scores[0] - sorted_scores[-1]
+    if span <= 0:
+        # No signal to prune on
+        return limit
+
+    norm = (sorted_scores[:limit] - sorted_scores[-1]) / span
+    keep = int(np.count_nonzero(norm >= 1.0 - margin))
+
+    # drops[i] is the fall after position i, i.e. cutting there keeps i + 1 candidates;
+    # cuts that would keep fewer than min_keep are not considered
+    drops = norm[:-1] - norm[1:]
+    start = max(min_keep - 1, 0)
+    big = np.nonzero(drops[start:] >= gap)[0]
+    if len(big):
+        keep = min(keep, start + int(big[0]) + 1)
+
+    return max(min_keep, min(limit, keep))
+
+
+class RerankCascade:
+    """
+    Two-stage reranking: a cheap first stage (the fusion scores themselves, or
+    a small cross-encoder) orders and prunes the fused candidates, and only the
+    survivors go through the full reranker. Clear-cut queries rerank close to
+    min_candidates; ambiguous ones up to max_candidates.
+    """
+
+    def __init__(self, reranker: Reranker, first_stage: Optional[str] = None,
+                 first_stage_model: Optional[Reranker] = None,
+                 min_candidates: Optional[int] = None, max_candidates: Optional[int] = None,
+                 margin: Optional[float] = None, gap: Optional[float] = None):
+        self.reranker = reranker
+        self.first_stage = first_stage or settings.rerank_first_stage
+        if self.first_stage not in FIRST_STAGES:
+            raise ValueError(f"Unknown rerank first stage: {self.first_stage!r} (expected one of {FIRST_STAGES})")
+        self.min_candidates = settings.rerank_min_candidates if min_candidates is None else min_candidates
+        self.max_candidates = settings.rerank_max_candidates if max_candidates is None else max_candidates
+        if self.min_candidates < 1:
+            raise ValueError(f"rerank_min_candidates must be at least 1, got {self.min_candidates}")
+        self.margin = settings.rerank_cascade_margin if margin is None else margin
+        self.gap = settings.rerank_cascade_gap if gap is None else gap
+
+        self.first_stage_model = first_stage_model
+        if self.first_stage == "cross_encoder" and self.first_stage_model is None:
+            # Its own score file (saved by save_cache), and the full reranker's worker thread
+            self.first_stage_model = Reranker(
+                model_name=settings.rerank_first_stage_model,
+                cache_path=settings.rerank_first_stage_cache_path,
+                scheduler=reranker.scheduler
+            )
+
+        self._lock = threading.Lock()
+        self._stats = {
+            "queries": 0,
+            "candidates": 0,
+            "reranked": 0,
+            "first_stage_seconds_total": 0.0,
+            "rerank_seconds_total": 0.0,
+        }
+
+    def _first_stage(self, query: str, candidates: List[Dict], fused_scores: np.ndarray) -> np.ndarray:
+        """Candidate positions that survive the first stage, best first."""
+        n = len(candidates)
+        if self.first_stage == "none":
+            return np.arange(n)
+
+        if self.first_stage == "fusion":
+            # Candidates already arrive in fused order
+            order = np.arange(n)
+            stage_scores = np.asarray(fused_scores, dtype=np.float64)
+        else:
+            stage_scores = self.first_stage_model.score(query, [c['chunk_text'] for c in candidates])
+            order = top_k_order(stage_scores, n)
+            stage_scores = stage_scores[order]
+
+        keep = cascade_cutoff(stage_scores, self.min_candidates, self.max_candidates, self.margin, self.gap)
+        return order[:keep]
+
+    def rerank(self, query: str, candidates: List[Dict], fused_scores: np.ndarray,
+               token_ids: Optional[List[Optional[np.ndarray]]] = None) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        (positions of the reranked candidates, their full reranker scores).
+        token_ids are the full reranker's pre-tokenized chunk ids, aligned with candidates.
+        """
+        start = time.perf_counter()
+        positions = self._first_stage(query, candidates, fused_scores)
+        first_stage_seconds = time.perf_counter() - start
+
+        start = time.perf_counter()
+        scores = self.reranker.score(
+            query,
+            [candidates[i]['chunk_text'] for i in positions],
+            [token_ids[i] for i in positions] if token_ids is not None else None
+        )
+        rerank_seconds = time.perf_counter() - start
+
+        with self._lock:
+            self._stats["queries"] += 1
+            self._stats["candidates"] += len(candidates)
+            self._stats["reranked"] += len(positions)
+            self._stats["first_stage_seconds_total"] += first_stage_seconds
+            self._stats["rerank_seconds_total"] += rerank_seconds
+        return positions, scores
+
+    def stats(self) -> dict:
+        with self._lock:
+            stats = dict(self._stats)
+        queries = stats["queries"]
+        stats["first_stage"] = self.first_stage
+        stats["reranked_avg"] = stats["reranked"] / queries if queries else 0.0
+        stats["reranked_fraction"] = stats["reranked"] / stats["candidates"] if stats["candidates"] else 0.0
+        return stats
@@ -0,0 +1,214 @@
+# retrieval/rerank_scheduler.py
+
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from typing import Callable, Dict, List
+
+import numpy as np
+
+
+class _Job:
+    """The tokenized pairs of one rerank request, consumed shortest first."""
+
+    def __init__(self, features: Dict[str, list], forward: Callable, pad: Callable):
+        self.features = features
+        self.forward = forward
+        self.pad = pad
+        self.lengths = np.fromiter((len(ids) for ids in features["input_ids"]), dtype=np.int64,
+                                   count=len(features["input_ids"]))
+        self.order = np.argsort(self.lengths, kind="stable")
+        self.cursor = 0
+        self.scores = np.zeros(len(self.lengths), dtype=np.float32)
+        self.future: Future = Future()
+        self.submitted = time.perf_counter()
+        self.started = None
+
+    @property
+    def remaining(self) -> int:
+        return len(self.order) - self.cursor
+
+    def take(self, n: int) -> np.ndarray:
+        picked = self.order[self.cursor:self.cursor + n]
+        self.cursor += len(picked)
+        return picked
+
+
+class RerankScheduler:
+    """
+    Runs every cross-encoder forward pass on one worker thread and fills each
+    batch with pairs from all waiting requests, instead of letting concurrent
+    requests run their own small predict() calls and fight over CPU threads.
+
+    Fairness: every active request gets an equal share of each batch (spare
+    room goes to the oldest requests first), so a request that arrives behind
+    a large one starts being scored in the very next batch.
+
+    Requests bring their model's forward and pad functions, so the full reranker
+    and the cascade's first-stage model share this one thread instead of running
+    forward passes against each other. A batch holds pairs of one model only:
+    that of the oldest waiting request.
+    """
+
+    def __init__(self, batch_size: int, window_ms: float = 2.0):
+        self.batch_size = max(1, int(batch_size))
+        self.window_ms = max(0.0, float(window_ms))
+
+        self._queue: "queue.Queue[_Job]" = queue.Queue()
+        self._active: List[_Job] = []
+        self._thread = None
+        self._start_lock = threading.Lock()
+
+        self._stats_lock = threading.Lock()
+        self._stats = {
+            "requests": 0,
+            "pairs": 0,
+            "batches": 0,
+            "shared_batches": 0,
+            "real_tokens": 0,
+            "padded_tokens": 0,
+            "queue_seconds_total": 0.0,
+            "queue_seconds_max": 0.0,
+        }
+
+    def submit(self, features: Dict[str, list], forward: Callable[[Dict[str, np.ndarray]], np.ndarray],
+               pad: Callable) -> np.ndarray:
+        """
+        Scores of the tokenized pairs, in input order (blocks until all are scored).
+        forward scores one padded batch; pad is the model tokenizer's pad().
+        """
+        job = _Job(features, forward, pad)
+        if job.remaining == 0:
+            return job.scores
+        self._ensure_worker()
+        self._queue.put(job)
+        return job.future.result()
+
+    def _ensure_worker(self):
+        with self._start_lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name="rerank-scheduler", daemon=True)
+                self._thread.start()
+
+    def _collect(self):
+        """Move queued requests to the active set; block only when there is nothing to do."""
+        idle = not self._active
+        if idle:
+            self._active.append(self._queue.get())
+        while True:
+            try:
+                self._active.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+        if not idle:
+            return
+
+        # Coming out of idle, a short window lets requests that arrive together share their first batch
+        deadline = time.perf_counter() + self.window_ms / 1000
+        while sum(job.remaining for job in self._active) < self.batch_size:
+            remaining_wait = deadline - time.perf_counter()
+            if remaining_wait <= 0:
+                return
+            try:
+                self._active.append(self._queue.get(timeout=remaining_wait))
+            except queue.Empty:
+                return
+
+    def _plan_batch(self):
+        """[(job, pair positions)] for the next batch: equal shares, then spare room oldest first."""
+        forward = self._active[0].forward
+        jobs = [job for job in self._active if job.forward == forward]
+        room = self.batch_size
+        share = max(1, room // len(jobs))
+        plan = {}
+        for job in jobs:
+            if room == 0:
+                break
+            picked = job.take(min(share, room))
+            plan[id(job)] = (job, [picked])
+            room -= len(picked)
+        for job in jobs:
+            if room == 0:
+                break
+            if job.remaining:
+                picked = job.take(room)
+                plan[id(job)][1].append(picked)
+                room -= len(picked)
+        return [(job, np.concatenate(parts)) for job, parts in plan.values() if sum(map(len, parts))]
+
+    def _run(self):
+        while True:
+            plan = []
+            try:
+                self._collect()
+                plan = self._plan_batch()
+                self._run_batch(plan)
+            except Exception as e:
+                # Fail the requests in this batch (all active ones if planning failed) but keep the worker
+                self._fail([job for job, _ in plan] if plan else list(self._active), e)
+
+    def _run_batch(self, plan):
+        now = time.perf_counter()
+        for job, _ in plan:
+            if job.started is None:
+                job.started = now
+                self._record_queue_wait(now - job.submitted)
+
+        model = plan[0][0]
+        names = model.features.keys()
+        # Shares of several requests are each length-sorted; sort the mix so padding stays tight
+        rows = sorted(
+            ((job, i) for job, positions in plan for i in positions.tolist()),
+            key=lambda row: row[0].lengths[row[1]]
+        )
+        padded = model.pad(
+            {name: [job.features[name][i] for job, i in rows] for name in names},
+            padding=True,
+            return_tensors="np"
+        )
+        scores = model.forward({name: array.astype(np.int64) for name, array in padded.items()})
+
+        for (job, i), score in zip(rows, scores.tolist()):
+            job.scores[i] = score
+        self._record_batch(plan, rows, padded["input_ids"].shape[1])
+
+        for job, _ in plan:
+            if job.remaining == 0:
+                self._active.remove(job)
+                job.future.set_result(job.scores)
+
+    def _fail(self, jobs: List[_Job], error: Exception):
+        for job in jobs:
+            if job in self._active:
+                self._active.remove(job)
+            if not job.future.done():
+                job.future.set_exception(error)
+
+    def _record_queue_wait(self, seconds: float):
+        with self._stats_lock:
+            self._stats["requests"] += 1
+            self._stats["queue_seconds_total"] += seconds
+            self._stats["queue_seconds_max"] = max(self._stats["queue_seconds_max"], seconds)
+
+    def _record_batch(self, plan, rows, padded_length: int):
+        real = sum(int(job.lengths[i]) for job, i in rows)
+        with self._stats_lock:
+            stats = self._stats
+            stats["pairs"] += len(rows)
+            stats["batches"] += 1
+            stats["shared_batches"] += int(len(plan) > 1)
+            stats["real_tokens"] += real
+            stats["padded_tokens"] += padded_length * len(rows)
+
+    def stats(self) -> dict:
+        with self._stats_lock:
+            stats = dict(self._stats)
+        batches, requests = stats["batches"], stats["requests"]
+        stats["batch_size"] = self.batch_size
+        stats["window_ms"] = self.window_ms
+        stats["mean_batch_fill"] = stats["pairs"] / (batches * self.batch_size) if batches else 0.0
+        stats["padding_waste"] = 1 - stats["real_tokens"] / stats["padded_tokens"] if stats["padded_tokens"] else 0.0
+        stats["queue_seconds_avg"] = stats["queue_seconds_total"] / requests if requests else 0.0
+        stats["queue_depth"] = self._queue.qsize()
+        return stats
@@ -0,0 +1,281 @@
+# retrieval/reranker.py
+
+import hashlib
+import json
+import os
+import threading
+from pathlib import Path
+
+import numpy as np
+import torch
+from sentence_transformers import CrossEncoder
+from typing import Dict, List, Optional, Sequence
+
+from config.settings import settings
+from retrieval.lru_cache import LRUCache
+from retrieval.query_normalization import normalize_query
+from retrieval.rerank_scheduler import RerankScheduler
+
+DEFAULT_RERANKER_MODEL = "BAAI/bge-reranker-v2-m3"
+RERANKER_BACKENDS = ("torch", "onnx", "onnx_int8")
+
+
+def content_hash(text: str) -> str:
+    return hashlib.blake2b(text.encode("utf-8"), digest_size=16).hexdigest()
+
+
+def _truncate_pair(len_first: int, len_second: int, budget: int):
+    """Tokens kept from each sequence under transformers' "longest_first" truncation."""
+    to_remove = len_first + len_second - budget
+    if to_remove <= 0:
+        return len_first, len_second
+    # Trim the longer sequence down to the shorter one, then split the rest evenly
+    first_pass = min(abs(len_first - len_second), to_remove)
+    second_pass = to_remove - first_pass
+    if len_first > len_second:
+        remove_first, remove_second = first_pass + second_pass // 2, second_pass - second_pass // 2
+    else:
+        remove_first, remove_second = second_pass // 2, first_pass + second_pass - second_pass // 2
+    return max(0, len_first - remove_first), max(0, len_second - remove_second)
+
+
+class Reranker:
+    """
+    Cross-encoder reranker.
+    Loaded once and shared by every collection's retriever.
+    Scores are cached by (normalized query, chunk content hash, model), so
+    only pairs the model has not seen before are sent to predict().
+    The backend is PyTorch, or ONNX Runtime in fp32 / dynamic int8 (reranker_backend).
+    With rerank_scheduler on, pairs of concurrent requests are merged into shared
+    batches on one worker thread (see retrieval/rerank_scheduler.py); a second
+    model (the cascade's first stage) is given the first one's scheduler.
+    """
+
+    def __init__(self, model_name: str = DEFAULT_RERANKER_MODEL,
+                 cache_entries: Optional[int] = None, cache_path: Optional[str] = None,
+                 backend: Optional[str] = None, max_length: Optional[int] = None,
+                 scheduler: Optional[RerankScheduler] = None):
+        self.model_name = model_name
+        self.backend = backend or settings.reranker_backend
+        if self.backend not in RERANKER_BACKENDS:
+            raise ValueError(f"Unknown reranker backend: {self.backend!r} (expected one of {RERANKER_BACKENDS})")
+        self.max_length = settings.rerank_max_length if max_length is None else max_length
+        self.batch_size = settings.rerank_batch_size
+        # Backend and truncation both change scores, so they are part of the cache key;
+        # so is the scale, so logit scores cached by earlier versions are never mixed in
+        backend_tag = "" if self.backend == "torch" else f"@{self.backend}"
+        self.model_id = f"{model_name}{backend_tag}:{self.max_length}:sigmoid"
+
+        print("🧠 Loading Reranker Model...")
+        if self.backend == "torch":
+            # --- OPTIMIZATION: USE MPS (GPU) ---
+            self.device = "cpu"
+            if torch.backends.mps.is_available():
+                self.device = "mps"
+                print("⚡ Reranker using MPS (Mac GPU) acceleration")
+            elif torch.cuda.is_available():
+                self.device = "cuda"
+            self.model = CrossEncoder(model_name, default_activation_function=None,
+                                      max_length=self.max_length, device=self.device)
+        else:
+            from retrieval.onnx_cross_encoder import OnnxCrossEncoder
+            self.model = OnnxCrossEncoder(model_name, quantize=self.backend == "onnx_int8",
+                                          max_length=self.max_length)
+        self.tokenizer = self.model.tokenizer
+
+        self.scheduler = scheduler
+        if self.scheduler is None and settings.rerank_scheduler:
+            self.scheduler = RerankScheduler(self.batch_size, window_ms=settings.rerank_scheduler_window_ms)
+
+        self._batch_lock = threading.Lock()
+        self._batch_stats = {
+            "pairs": 0,
+            "batches": 0,
+            "truncated_pairs": 0,
+            "real_tokens": 0,
+            "padded_tokens": 0,
+            "unsorted_padded_tokens": 0,
+        }
+
+        cache_entries = settings.rerank_cache_entries if cache_entries is None else cache_entries
+        self.cache = LRUCache(cache_entries) if cache_entries > 0 else None
+        self.cache_path = cache_path if cache_path is not None else settings.rerank_cache_path
+        self._unsaved = 0
+        if self.cache is not None and self.cache_path:
+            self._load_cache()
+
+    def _forward(self, features: Dict[str, np.ndarray]) -> np.ndarray:
+        """
+        Relevance scores of one padded batch: the sigmoid of the logit, in [0, 1],
+        as CrossEncoder.predict returns them (and as the ONNX backend does).
+        """
+        if self.backend != "torch":
+            return self.model.forward(features)
+        inputs = {name: torch.from_numpy(array).to(self.device) for name, array in features.items()}
+        with torch.no_grad():
+            logits = self.model.model(**inputs, return_dict=True).logits
+        return torch.sigmoid(logits[:, 0].float()).cpu().numpy()
+
+    def _pair_features(self, query: str, texts: List[str],
+                       token_ids: Sequence[Optional[np.ndarray]]) -> Dict[str, list]:
+        """
+        Pair inputs from pre-tokenized chunk ids (see retrieval/token_store.py):
+        only the query (and chunks missing from the store) are tokenized here.
+        Truncation follows the tokenizer's "longest_first" strategy.
+        """
+        query_ids = self.tokenizer(query, add_special_tokens=False)["input_ids"]
+        rows = list(token_ids)
+        missing = [i for i, ids in enumerate(rows) if ids is None]
+        if missing:
+            encoded = self.tokenizer([texts[i] for i in missing], add_special_tokens=False)["input_ids"]
+            for i, ids in zip(missing, encoded):
+                rows[i] = ids
+
+        budget = self.max_length - self.tokenizer.num_special_tokens_to_add(pair=True)
+        with_type_ids = "token_type_ids" in self.tokenizer.model_input_names
+        features = {"input_ids": [], "attention_mask": []}
+        if with_type_ids:
+            features["token_type_ids"] = []
+        for chunk_ids in rows:
+            keep_query, keep_chunk = _truncate_pair(len(query_ids), len(chunk_ids), budget)
+            first, second = query_ids[:keep_query], list(chunk_ids[:keep_chunk])
+            input_ids = self.tokenizer.build_inputs_with_special_tokens(first, second)
+            features["input_ids"].append(input_ids)
+            features["attention_mask"].append([1] * len(input_ids))
+            if with_type_ids:
+                features["token_type_ids"].append(self.tokenizer.create_token_type_ids_from_sequences(first, second))
+        return features
+
+    def _predict(self, query: str, texts: List[str],
+                 token_ids: Optional[Sequence[Optional[np.ndarray]]] = None) -> np.ndarray:
+        """
+        Tokenize every pair once (truncated to max_length), then batch pairs of
+        similar length together so a batch is only padded to its own longest
+        pair. Scores come back in input order.
+        """
+        if token_ids is not None:
+            features = self._pair_features(query, texts, token_ids)
+        else:
+            features = self.tokenizer(
+                [query] * len(texts), texts,
+                truncation="longest_first",
+                max_length=self.max_length
+            )
+        lengths = np.fromiter((len(ids) for ids in features["input_ids"]), dtype=np.int64, count=len(texts))
+        # Per-request view of the padding; with the scheduler, actual batches are in scheduler_stats()
+        self._record_batching(lengths)
+        if self.scheduler is not None:
+            return self.scheduler.submit(features, self._forward, self.tokenizer.pad)
+
+        order = np.argsort(lengths, kind="stable")
+
+        scores = np.zeros(len(texts), dtype=np.float32)
+        for start in range(0, len(texts), self.batch_size):
+            batch = order[start:start + self.batch_size]
+            padded = self.tokenizer.pad(
+                {name: [values[i] for i in batch] for name, values in features.items()},
+                padding=True,
+                return_tensors="np"
+            )
+            scores[batch] = self._forward({name: array.astype(np.int64) for name, array in padded.items()})
+        return scores
+
+    def _record_batching(self, lengths: np.ndarray):
+        """Padding with length-sorted batches vs. what input-order batches would have cost."""
+        size = self.batch_size
+        sorted_lengths = np.sort(lengths)
+        padded = sum(int(sorted_lengths[i:i + size].max()) * len(sorted_lengths[i:i + size])
+                     for i in range(0, len(lengths), size))
+        unsorted = sum(int(lengths[i:i + size].max()) * len(lengths[i:i + size])
+                       for i in range(0, len(lengths), size))
+        with self._batch_lock:
+            stats = self._batch_stats
+            stats["pairs"] += len(lengths)
+            stats["batches"] += (len(lengths) + size - 1) // size
+            stats["truncated_pairs"] += int(np.count_nonzero(lengths >= self.max_length))
+            stats["real_tokens"] += int(lengths.sum())
+            stats["padded_tokens"] += padded
+            stats["unsorted_padded_tokens"] += unsorted
+
+    def batching_stats(self) -> dict:
+        with self._batch_lock:
+            stats = dict(self._batch_stats)
+        padded, unsorted = stats["padded_tokens"], stats["unsorted_padded_tokens"]
+        stats["max_length"] = self.max_length
+        stats["batch_size"] = self.batch_size
+        stats["padding_waste"] = 1 - stats["real_tokens"] / padded if padded else 0.0
+        stats["unsorted_padding_waste"] = 1 - stats["real_tokens"] / unsorted if unsorted else 0.0
+        stats["tokens_saved"] = unsorted - padded
+        return stats
+
+    def scheduler_stats(self) -> dict:
+        if self.scheduler is None:
+            return {"enabled": False}
+        return {"enabled": True, **self.scheduler.stats()}
+
+    def score(self, query: str, texts: List[str],
+              token_ids: Optional[Sequence[Optional[np.ndarray]]] = None) -> np.ndarray:
+        """
+        Relevance score (in [0, 1]) of every (query, text) pair, in input order.
+        token_ids optionally holds the pre-tokenized ids of each text (None where unknown).
+        """
+        if not texts:
+            return np.zeros(0, dtype=np.float32)
+        if self.cache is None:
+            return self._predict(query, texts, token_ids)
+
+        query_key = normalize_query(query)
+        keys = [(query_key, content_hash(text), self.model_id) for text in texts]
+
+        scores = np.zeros(len(texts), dtype=np.float32)
+        missing = []
+        for i, key in enumerate(keys):
+            cached = self.cache.get(key)
+            if cached is None:
+                missing.append(i)
+            else:
+                scores[i] = cached
+
+        if missing:
+            fresh = self._predict(
+                query,
+                [texts[i] for i in missing],
+                [token_ids[i] for i in missing] if token_ids is not None else None
+            )
+            scores[missing] = fresh
+            for i, value in zip(missing, fresh.tolist()):
+                self.cache.put(keys[i], value)
+            self._unsaved += len(missing)
+
+        return scores
+
+    def cache_stats(self) -> dict:
+        if self.cache is None:
+            return {"enabled": False}
+        return {"enabled": True, "path": self.cache_path, **self.cache.stats()}
+
+    def _load_cache(self):
+        if not os.path.exists(self.cache_path):
+            return
+        try:
+            with open(self.cache_path, "r", encoding="utf-8") as f:
+                entries = json.load(f)
+        except (OSError, ValueError) as e:
+            print(f"⚠️ Ignoring unreadable rerank cache {self.cache_path}: {e}")
+            return
+        for query_key, chunk_hash, model_name, value in entries:
+            self.cache.put((query_key, chunk_hash, model_name), value)
+        print(f"✅ Rerank cache loaded with {len(self.cache)} scores")
+
+    def save_cache(self):
+        """Write the cache to disk (least recently used first) if anything new was scored."""
+        if self.cache is None or not self.cache_path or self._unsaved == 0:
+            return
+        entries = [[*key, value] for key, value in self.cache.items()]
+        Path(self.cache_path).parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = f"{self.cache_path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(entries, f, ensure_ascii=False)
+        os.replace(tmp_path, self.cache_path)
+        self._unsaved = 0
+        print(f"💾 Rerank cache saved ({len(entries)} scores)")
@@ -1,39 +1,79 @@
 # retrieval/retrieval_pipeline.py
 
+from config.collections import DEFAULT_COLLECTION
+from config.settings import settings
 from retrieval.query_embedder import QueryEmbedder
-from retrieval.hybrid_retriever import HybridRetriever
+from retrieval.collection_manager import CollectionManager
 from generation.query_processor import QueryProcessor # <--- NEW
 
 class RetrievalPipeline:
-    def __init__(self, 
-                 faiss_index_path="data/faiss_index.bin",
+    def __init__(self,
+                 faiss_index_path=None,
                  top_k=10):
+        # faiss_index_path is kept for compatibility; indexes are now resolved per collection
         self.embedder = QueryEmbedder()
-        self.retriever = HybridRetriever(
-            faiss_index_path=faiss_index_path,
-            top_k=top_k
-        )
+        self.collections = CollectionManager(top_k=top_k)
         self.query_processor = QueryProcessor() # <--- NEW
 
-    def run(self, query: str, target_document: str = None):
+    @property
+    def retriever(self):
+        """Retriever of the default collection."""
+        return self.collections.get(DEFAULT_COLLECTION)
+
+    def get_retriever(self, collection: str = DEFAULT_COLLECTION):
+        return self.collections.get(collection)
+
+    def run(self, query: str, target_document: str = None, collection: str = DEFAULT_COLLECTION,
+            multi_query: bool = None):
         """
         Full retrieval flow: Expand -> Embed -> Search -> Rerank
         """
+        retriever = self.get_retriever(collection)
+        if multi_query is None:
+            multi_query = settings.multi_query
+        if multi_query:
+            return self._run_multi_query(retriever, query, target_document)
+
         # 1. Expand Query (Add synonyms/keywords)
         expanded_query = self.query_processor.expand_query(query)
-        
-        # 2. Embed the EXPANDED query
-        query_vec = self.embedder.embed(expanded_query)
+
+        # 2. Embed the EXPANDED query (plus lexical weights if the sparse channel is on)
+        query_vec, query_sparse = self.embedder.embed_for_search(expanded_query)
 
         # 3. Search using the EXPANDED query text (for BM25) and vector
-        retrieved_chunks = self.retriever.search(
-            query_vec, 
-            expanded_query, 
-            target_document=target_document
+        retrieved_chunks = retriever.search(
+            query_vec,
+            expanded_query,
+            target_document=target_document,
+            query_sparse=query_sparse
         )
 
         return {
             "retrieved_chunks": retrieved_chunks,
             "original_query": query,
             "expanded_query": expanded_query
-        }
\ No newline at end of file
+        }
+
+    def _run_multi_query(self, retriever, query: str, target_document: str = None):
+        """
+        Original, expanded and translated variants searched side by side and fused,
+        instead of one query diluted by appended expansion terms.
+        """
+        variants = self.query_processor.query_variants(query)
+
+        # One forward pass for all variants, one batched FAISS + lexical search, RRF over every list
+        query_vecs, query_sparse = self.embedder.embed_many_for_search(variants)
+        retrieved_chunks = retriever.search_multi(
+            query_vecs,
+            variants,
+            target_document=target_document,
+            query_sparse=query_sparse,
+            rerank_query=query
+        )
+
+        return {
+            "retrieved_chunks": retrieved_chunks,
+            "original_query": query,
+            "expanded_query": variants[1] if len(variants) > 1 else query,
+            "query_variants": variants
+        }
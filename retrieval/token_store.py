@@ -0,0 +1,122 @@
+# retrieval/token_store.py
+
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+
+from retrieval.lexical_index import _ChunkIndex, _remap_removed
+
+
+def load_reranker_tokenizer(model_name: str):
+    from transformers import AutoTokenizer
+    return AutoTokenizer.from_pretrained(model_name)
+
+
+def tokenize_chunks(tokenizer, chunks: Sequence[Dict], batch_size: int = 256):
+    """Attach the reranker token ids (no special tokens) to every chunk as "rerank_token_ids"."""
+    for start in range(0, len(chunks), batch_size):
+        batch = chunks[start:start + batch_size]
+        encoded = tokenizer([c["chunk_text"] for c in batch], add_special_tokens=False)["input_ids"]
+        for chunk, ids in zip(batch, encoded):
+            chunk["rerank_token_ids"] = ids
+
+
+class TokenArrays:
+    """Variable-length token id rows in one flat int32 array (CSR layout)."""
+
+    def __init__(self):
+        self.indptr = np.zeros(1, dtype=np.int64)
+        self.tokens = np.zeros(0, dtype=np.int32)
+        self.tokenizer_name = ""
+
+    @classmethod
+    def empty(cls) -> "TokenArrays":
+        return cls()
+
+    def __len__(self) -> int:
+        return len(self.indptr) - 1
+
+    def row(self, position: int) -> np.ndarray:
+        return self.tokens[self.indptr[position]:self.indptr[position + 1]]
+
+    def add_documents(self, token_rows: Sequence[Sequence[int]]):
+        lengths = np.fromiter((len(r) for r in token_rows), dtype=np.int64, count=len(token_rows))
+        new_tokens = np.fromiter((t for r in token_rows for t in r), dtype=np.int32, count=int(lengths.sum()))
+        self.indptr = np.concatenate([self.indptr, self.indptr[-1] + np.cumsum(lengths)])
+        self.tokens = np.concatenate([self.tokens, new_tokens])
+
+    def remove_documents(self, doc_indices: Sequence[int]):
+        removed, _ = _remap_removed(len(self), doc_indices)
+        if not removed.any():
+            return
+        lengths = np.diff(self.indptr)
+        self.tokens = self.tokens[np.repeat(~removed, lengths)]
+        self.indptr = np.concatenate([[0], np.cumsum(lengths[~removed])]).astype(np.int64)
+
+    def nbytes(self) -> int:
+        return self.indptr.nbytes + self.tokens.nbytes
+
+    def to_arrays(self) -> Dict[str, np.ndarray]:
+        return {
+            "indptr": self.indptr,
+            "tokens": self.tokens,
+            "tokenizer_name": np.frombuffer(self.tokenizer_name.encode("utf-8"), dtype=np.uint8),
+        }
+
+    @classmethod
+    def from_arrays(cls, arrays) -> "TokenArrays":
+        store = cls()
+        store.indptr = arrays["indptr"]
+        store.tokens = arrays["tokens"]
+        store.tokenizer_name = arrays["tokenizer_name"].tobytes().decode("utf-8")
+        return store
+
+
+class RerankTokenStore(_ChunkIndex):
+    """
+    Reranker token ids of every chunk of a collection, keyed by FAISS vector id.
+    Chunk text only changes at indexing time, so the reranker only has to
+    tokenize the query per request. Chunks carry their ids under
+    "rerank_token_ids" (see tokenize_chunks).
+    """
+
+    engine_cls = TokenArrays
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._sorted_ids: Optional[np.ndarray] = None
+
+    @classmethod
+    def build(cls, chunks: Sequence[Dict], tokenizer_name: str = ""):
+        store = super().build(chunks)
+        store.engine.tokenizer_name = tokenizer_name
+        return store
+
+    @property
+    def tokenizer_name(self) -> str:
+        return self.engine.tokenizer_name
+
+    def _engine_documents(self, chunks: Sequence[Dict]) -> list:
+        return [c["rerank_token_ids"] for c in chunks]
+
+    def add_chunks(self, chunks: Sequence[Dict]):
+        super().add_chunks(chunks)
+        self._sorted_ids = None
+
+    def remove_document(self, document_name: str) -> int:
+        removed = super().remove_document(document_name)
+        self._sorted_ids = None
+        return removed
+
+    def rows(self, vector_ids: Sequence[int]) -> List[Optional[np.ndarray]]:
+        """Token ids of each vector id (None when the chunk is not in the store)."""
+        if self._sorted_ids is None:
+            self._sorted_ids = np.argsort(self.vector_ids)
+        if len(self.vector_ids) == 0:
+            return [None] * len(vector_ids)
+
+        wanted = np.asarray(vector_ids, dtype=np.int64)
+        pos = np.searchsorted(self.vector_ids, wanted, sorter=self._sorted_ids).clip(max=len(self.vector_ids) - 1)
+        positions = self._sorted_ids[pos]
+        found = self.vector_ids[positions] == wanted
+        return [self.engine.row(p) if ok else None for p, ok in zip(positions.tolist(), found.tolist())]
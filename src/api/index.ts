@@ -1,4 +1,4 @@
-import { SystemStatus, UploadResponse, ChatSession, Message } from '../types';
+import { SystemStatus, UploadResponse, ChatSession, Message, Source } from '../types';
 
 const API_BASE = 'http://localhost:8000/api';
 
@@ -60,6 +60,63 @@ export const api = {
     return res.json();
   },
 
+  // Streaming query (Server-Sent Events over a POST response)
+  queryStream: async (
+    query: string,
+    model: string,
+    sessionId: string,
+    targetDocument: string | undefined,
+    handlers: {
+      onSources: (sources: Source[]) => void;
+      onToken: (text: string) => void;
+      onDone: (result: {
+        answer: string;
+        sources: Source[];
+        generation_time: number;
+        extractive?: boolean;
+        highlight?: [number, number];
+        confidence?: number;
+        model?: string;
+      }) => void;
+    },
+    // false skips the extractive fast path ("generate full answer")
+    extractive?: boolean
+  ): Promise<void> => {
+    const res = await fetch(`${API_BASE}/query/stream`, {
+      method: 'POST',
+      headers: { 'Content-Type': 'application/json' },
+      body: JSON.stringify({ query, model, session_id: sessionId, target_document: targetDocument, extractive }),
+    });
+    if (!res.ok || !res.body) throw new Error('Failed to fetch answer');
+
+    const reader = res.body.getReader();
+    const decoder = new TextDecoder();
+    let buffer = '';
+    while (true) {
+      const { done, value } = await reader.read();
+      if (done) break;
+      buffer += decoder.decode(value, { stream: true });
+
+      // Events are separated by a blank line
+      let boundary: number;
+      while ((boundary = buffer.indexOf('\n\n')) !== -1) {
+        const raw = buffer.slice(0, boundary);
+        buffer = buffer.slice(boundary + 2);
+        let event = 'message';
+        let data = '';
+        for (const line of raw.split('\n')) {
+          if (line.startsWith('event: ')) event = line.slice(7);
+          else if (line.startsWith('data: ')) data += line.slice(6);
+        }
+        const payload = data ? JSON.parse(data) : {};
+        if (event === 'sources') handlers.onSources(payload.sources);
+        else if (event === 'token') handlers.onToken(payload.text);
+        else if (event === 'done') handlers.onDone(payload);
+        else if (event === 'error') throw new Error(payload.detail || 'Streaming failed');
+      }
+    }
+  },
+
   upload: async (formData: FormData): Promise<UploadResponse> => {
     const res = await fetch(`${API_BASE}/upload`, { method: 'POST', body: formData });
     if (!res.ok) throw new Error('Upload failed');
@@ -1,13 +1,16 @@
 import React from 'react';
-import { User, Bot, BookOpen, Clock } from 'lucide-react';
+import { User, Bot, BookOpen, Clock, Zap, Sparkles } from 'lucide-react';
 import { Message } from '../types';
 
 interface ChatMessageProps {
   message: Message;
+  // Shown on extractive answers: ask the same question again with the LLM
+  onGenerateFull?: () => void;
 }
 
-const ChatMessage: React.FC<ChatMessageProps> = ({ message }) => {
+const ChatMessage: React.FC<ChatMessageProps> = ({ message, onGenerateFull }) => {
   const isUser = message.role === 'user';
+  const [start, end] = message.highlight || [0, 0];
 
   return (
     <div className={`flex ${isUser ? 'justify-end' : 'justify-start'}`}>
@@ -22,15 +25,44 @@ const ChatMessage: React.FC<ChatMessageProps> = ({ message }) => {
             <span>{message.role}</span>
           </div>
           
-          {!isUser && message.generation_time && (
-            <div className="flex items-center space-x-1 text-emerald-600">
-              <Clock size={12} />
-              <span>{message.generation_time}s</span>
-            </div>
-          )}
+          <div className="flex items-center space-x-3">
+            {!isUser && message.model && (
+              <span className="normal-case tracking-normal">{message.model}</span>
+            )}
+            {!isUser && message.extractive && (
+              <div className="flex items-center space-x-1 text-amber-600" title="Quoted from the top source without the LLM">
+                <Zap size={12} />
+                <span>Extractive</span>
+              </div>
+            )}
+            {!isUser && message.generation_time && (
+              <div className="flex items-center space-x-1 text-emerald-600">
+                <Clock size={12} />
+                <span>{message.generation_time}s</span>
+              </div>
+            )}
+          </div>
         </div>
         
-        <div className="whitespace-pre-wrap text-sm leading-relaxed">{message.content}</div>
+        <div className="whitespace-pre-wrap text-sm leading-relaxed">
+          {end > start ? (
+            <>
+              {message.content.slice(0, start)}
+              <mark className="bg-amber-100 rounded px-0.5">{message.content.slice(start, end)}</mark>
+              {message.content.slice(end)}
+            </>
+          ) : message.content}
+        </div>
+
+        {onGenerateFull && (
+          <button
+            onClick={onGenerateFull}
+            className="mt-3 flex items-center space-x-1 text-xs font-medium text-gray-600 hover:text-black bg-white px-2 py-1 rounded border border-gray-200 shadow-sm"
+          >
+            <Sparkles size={12} />
+            <span>Generate full answer</span>
+          </button>
+        )}
         
         {message.sources && message.sources.length > 0 && (
           <div className="mt-4 pt-3 border-t border-gray-200/50">
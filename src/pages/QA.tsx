@@ -124,9 +124,11 @@ const QA = () => {
     setIsRenaming(false);
   };
 
-  const handleSearch = async (e?: React.FormEvent) => {
+  // text/extractive are set when re-asking a question ("generate full answer" sends extractive=false)
+  const handleSearch = async (e?: React.FormEvent, text: string = query, extractive?: boolean) => {
     if (e) e.preventDefault();
-    if (!query.trim()) return;
+    if (!text.trim()) return;
+    const fromInput = text === query;
 
     let activeId = currentSessionId;
     let isNew = false;
@@ -135,7 +137,7 @@ const QA = () => {
     if (!activeId) {
       const newSession = generateSession();
       // Set title immediately to the query
-      newSession.title = query.slice(0, 30);
+      newSession.title = text.slice(0, 30);
       activeId = newSession.id;
       isNew = true;
 
@@ -152,36 +154,64 @@ const QA = () => {
       }
     }
 
-    const userMsg: Message = { role: 'user', content: query };
+    const userMsg: Message = { role: 'user', content: text };
     
     // 2. Optimistic UI Update
     setMessages(prev => [...prev, userMsg]);
-    setQuery('');
+    if (fromInput) setQuery('');
     setIsLoading(true);
 
     // Update title if it's the first message of an existing generic chat
     if (!isNew && messages.length === 0) {
-      const newTitle = query.slice(0, 30);
+      const newTitle = text.slice(0, 30);
       api.renameSession(activeId, newTitle);
       setSessions(prev => prev.map(s => s.id === activeId ? { ...s, title: newTitle } : s));
     }
 
-    // 3. Send Query
+    // 3. Send Query (streamed: sources first, then the answer token by token)
+    // Replace the last message, i.e. the assistant message being streamed
+    const updateBotMsg = (update: (msg: Message) => Message) =>
+      setMessages(prev => [...prev.slice(0, -1), update(prev[prev.length - 1])]);
+
     try {
-      const data = await api.query(
+      let started = false;
+      const startBotMsg = () => {
+        if (started) return;
+        started = true;
+        setIsLoading(false);
+        setMessages(prev => [...prev, { role: 'assistant', content: '' }]);
+      };
+
+      await api.queryStream(
         userMsg.content, 
         selectedModel, 
         activeId, 
-        selectedDoc || undefined
+        selectedDoc || undefined,
+        {
+          onSources: (sources) => {
+            startBotMsg();
+            updateBotMsg(msg => ({ ...msg, sources }));
+          },
+          onToken: (text) => {
+            startBotMsg();
+            updateBotMsg(msg => ({ ...msg, content: msg.content + text }));
+          },
+          onDone: (data) => {
+            startBotMsg();
+            updateBotMsg(msg => ({
+              ...msg,
+              content: data.answer,
+              sources: data.sources,
+              generation_time: data.generation_time,
+              extractive: data.extractive,
+              highlight: data.highlight,
+              confidence: data.confidence,
+              model: data.model
+            }));
+          }
+        },
+        extractive
       );
-      
-      const botMsg: Message = { 
-        role: 'assistant', 
-        content: data.answer,
-        sources: data.sources,
-        generation_time: data.generation_time
-      };
-      setMessages(prev => [...prev, botMsg]);
     } catch (error) {
       console.error(error);
       const errorMsg: Message = { role: 'assistant', content: "Error: Could not connect to the backend. Please check if the Python server is running." };
@@ -297,7 +327,9 @@ const QA = () => {
                 onChange={(e) => setSelectedModel(e.target.value)}
                 className="bg-transparent text-xs font-medium text-gray-700 focus:outline-none cursor-pointer"
               >
+                <option value="auto">Auto (0.5B / 3B)</option>
                 <option value="qwen2.5:3b">Qwen 2.5 (3B)</option>
+                <option value="qwen2.5:0.5b">Qwen 2.5 (0.5B)</option>
                 <option value="llama3.1:8b">Llama 3.1 (8B)</option>
               </select>
             </div>
@@ -313,7 +345,15 @@ const QA = () => {
             </div>
           ) : (
             messages.map((msg, idx) => (
-              <ChatMessage key={idx} message={msg} />
+              <ChatMessage
+                key={idx}
+                message={msg}
+                onGenerateFull={
+                  msg.extractive && idx > 0 && !isLoading
+                    ? () => handleSearch(undefined, messages[idx - 1].content, false)
+                    : undefined
+                }
+              />
             ))
           )}
           {isLoading && (
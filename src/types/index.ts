@@ -9,6 +9,11 @@ export interface Message {
   content: string;
   sources?: Source[];
   generation_time?: number;
+  // Quoted from the top source without the LLM; highlight is the answering sentence [start, end)
+  extractive?: boolean;
+  highlight?: [number, number];
+  confidence?: number;
+  model?: string; // the model that answered (the chosen one when "auto")
 }
 
 export interface ChatSession {